@@ -0,0 +1,265 @@
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, Optional, Tuple
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import Float, and_, cast, select, tuple_
+from sqlalchemy.orm import Session
+from app import grading, mark_versions, refdata
+from app.models import Result, Student
+from app.ranking import member_class, recorded
+from app.schemas import TermResponse
+
+# Marks at or above this count as a pass
+PASS_MARK = float(os.getenv("ANALYTICS_PASS_MARK", "50"))
+
+# Width of each histogram bin over the 0-100 range
+HISTOGRAM_BIN_WIDTH = float(os.getenv("ANALYTICS_HISTOGRAM_BIN_WIDTH", "10"))
+
+# Computed slices kept per worker
+CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "1000"))
+
+
+@dataclass(frozen=True)
+class Slice:
+    """The marks an analytics request covers; also the cache key"""
+    term_id: int
+    class_ids: Tuple[int, ...]
+    subject_id: Optional[int] = None
+    # Teacher scope: only these (class_id, subject_id) cells
+    pairs: Optional[FrozenSet[Tuple[int, int]]] = None
+
+
+def resolve_scope(
+    db: Session,
+    term_id: Optional[int],
+    class_id: Optional[int],
+    level: Optional[int],
+    subject_id: Optional[int]
+) -> Tuple[TermResponse, Tuple[int, ...], dict]:
+    """Resolve request filters into the term, the classes covered and a description for the response"""
+    if class_id is not None and level is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Filter by class_id or by level, not both"
+        )
+
+    term = refdata.get_term(db, term_id) if term_id else refdata.get_active_term(db)
+    if not term:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Term with ID {term_id} not found" if term_id else "No active term found"
+        )
+
+    subject = refdata.get_subject(db, subject_id) if subject_id is not None else None
+    if subject_id is not None and not subject:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Subject with ID {subject_id} not found"
+        )
+
+    class_obj = None
+    if class_id is not None:
+        class_obj = refdata.get_class(db, class_id)
+        if not class_obj:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Class with ID {class_id} not found"
+            )
+        class_ids = (class_id,)
+    else:
+        class_ids = tuple(item.id for item in refdata.list_classes(db) if level is None or item.level == level)
+        if level is not None and not class_ids:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"No classes at level {level}"
+            )
+
+    description = {
+        "term_id": term.id,
+        "term_name": term.name,
+        "class_id": class_id,
+        "class_name": class_obj.name if class_obj else None,
+        "level": class_obj.level if class_obj else level,
+        "subject_id": subject_id,
+        "subject_name": subject.name if subject else None
+    }
+    return term, class_ids, description
+
+
+def slice_marks_query(slice_: Slice):
+    """Student, class, subject and marks of every result in the slice, in one query"""
+    # Floats straight from the driver; converting Decimals would cost more than the statistics.
+    # Marks count under the class the student is ranked in for the term, as the standings do
+    query = (
+        select(Result.student_id, member_class, Result.subject_id, cast(Result.marks, Float))
+        .join(Student, Student.id == Result.student_id)
+        .outerjoin(recorded, and_(recorded.student_id == Result.student_id, recorded.term_id == Result.term_id))
+        .where(Result.term_id == slice_.term_id, member_class.in_(slice_.class_ids))
+    )
+    if slice_.subject_id is not None:
+        query = query.where(Result.subject_id == slice_.subject_id)
+    if slice_.pairs is not None:
+        query = query.where(tuple_(member_class, Result.subject_id).in_(sorted(slice_.pairs)))
+    return query
+
+
+def grade_marks(db: Session, class_ids: np.ndarray, subject_ids: np.ndarray, marks: np.ndarray) -> Tuple[dict, list]:
+    """Grade counts for marks from any mix of levels and subjects, and the names of the schemes used"""
+    if marks.size == 0:
+        return {}, []
+
+    # Resolve a scheme once per distinct (class, subject) pair, then grade each scheme's marks in one call
+    base = int(subject_ids.max()) + 1
+    pairs, pair_of_mark = np.unique(class_ids * base + subject_ids, return_inverse=True)
+    schemes = []
+    scheme_of_pair = np.empty(len(pairs), dtype=np.int64)
+    for index, pair in enumerate(pairs.tolist()):
+        class_obj = refdata.get_class(db, pair // base)
+        scheme = refdata.get_grading_scheme(db, class_obj.level if class_obj else None, pair % base)
+        if scheme not in schemes:
+            schemes.append(scheme)
+        scheme_of_pair[index] = schemes.index(scheme)
+
+    counts = grading.count_grades(scheme_of_pair[pair_of_mark.ravel()], schemes, marks)
+    return counts, [scheme.name for scheme in schemes]
+
+
+def describe_marks(student_ids: np.ndarray, marks: np.ndarray, grades: dict, schemes: list) -> dict:
+    """Summary statistics, pass rate, histogram and the given grade counts of a mark array"""
+    edges = np.arange(0, 100 + HISTOGRAM_BIN_WIDTH, HISTOGRAM_BIN_WIDTH)
+    edges[-1] = min(edges[-1], 100)
+    if marks.size == 0:
+        return {
+            "count": 0,
+            "students": 0,
+            "mean": None,
+            "median": None,
+            "std": None,
+            "min": None,
+            "max": None,
+            "pass_mark": PASS_MARK,
+            "pass_rate": None,
+            "grades": grades,
+            "grading_schemes": schemes,
+            "histogram": {"bin_edges": edges.tolist(), "counts": [0] * (len(edges) - 1)}
+        }
+
+    histogram, _ = np.histogram(marks, bins=edges)
+    return {
+        "count": int(marks.size),
+        "students": int(np.unique(student_ids).size),
+        "mean": round(float(marks.mean()), 2),
+        "median": round(float(np.median(marks)), 2),
+        "std": round(float(marks.std()), 2),
+        "min": float(marks.min()),
+        "max": float(marks.max()),
+        "pass_mark": PASS_MARK,
+        "pass_rate": round(float(np.count_nonzero(marks >= PASS_MARK)) / marks.size, 4),
+        "grades": grades,
+        "grading_schemes": schemes,
+        "histogram": {"bin_edges": edges.tolist(), "counts": histogram.tolist()}
+    }
+
+
+class AnalyticsCache:
+    """LRU of computed slices, each tagged with the mark versions of the classes it covers"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def versions(self, db: Session, slice_: Slice) -> tuple:
+        # Grades depend on the grading schemes, which change with the reference data version
+        return (refdata.cache.version,) + mark_versions.current(db, slice_.term_id, slice_.class_ids)
+
+    def get(self, db: Session, slice_: Slice) -> Optional[dict]:
+        versions = self.versions(db, slice_)
+        with self._lock:
+            entry = self._entries.get(slice_)
+            if entry is None or entry[0] != versions:
+                if entry is not None:
+                    del self._entries[slice_]
+                    self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(slice_)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, slice_: Slice, versions: tuple, stats: dict):
+        with self._lock:
+            self._entries[slice_] = (versions, stats)
+            self._entries.move_to_end(slice_)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Counters and size for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "max_size": self.max_size
+        }
+
+
+cache = AnalyticsCache(CACHE_SIZE)
+
+
+def get_slice_stats(db: Session, slice_: Slice) -> dict:
+    """Statistics for a slice, from the cache or computed from one query"""
+    stats = cache.get(db, slice_)
+    if stats is not None:
+        return stats
+
+    # Versions are taken before the marks are read, so a concurrent change leaves the entry stale rather than wrong
+    versions = cache.versions(db, slice_)
+    rows = db.execute(slice_marks_query(slice_)).all()
+    student_ids, class_ids, subject_ids, marks = zip(*rows) if rows else ((), (), (), ())
+    marks = np.array(marks, dtype=np.float64)
+    grades, schemes = grade_marks(
+        db, np.array(class_ids, dtype=np.int64), np.array(subject_ids, dtype=np.int64), marks
+    )
+    stats = describe_marks(np.array(student_ids, dtype=np.int64), marks, grades, schemes)
+    cache.put(slice_, versions, stats)
+    return stats
+
+
+def build_analytics(
+    db: Session,
+    term_id: int,
+    class_ids: Iterable[int],
+    subject_id: Optional[int],
+    description: dict,
+    pairs: Optional[Iterable[Tuple[int, int]]] = None
+) -> dict:
+    """Response for one slice: the resolved filters followed by the statistics"""
+    slice_ = Slice(
+        term_id=term_id,
+        class_ids=tuple(sorted(set(class_ids))),
+        subject_id=subject_id,
+        pairs=frozenset(pairs) if pairs is not None else None
+    )
+    return {**description, **get_slice_stats(db, slice_)}
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for this worker"""
+    return cache.stats()
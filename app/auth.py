@@ -1,13 +1,24 @@
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
 from jose import JWTError, jwt
 import bcrypt
 import hashlib
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, select
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User
+from app import querystats
+from app.bulk_results import dialect_insert
+from app.database import get_session, run_in_session
+from app.models import CacheVersion, Student, Teacher, User
 
 # Secret key for JWT - CHANGE THIS IN PRODUCTION!
 SECRET_KEY = "your-secret-key-change-in-production"
@@ -16,6 +27,121 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Resolved principals are cached briefly so authentication needs no database round trip.
+# Admin changes drop this worker's entry at once and bump the "principals" cache_versions row;
+# other workers clear their cache when they next check it, so a deleted account is refused
+# everywhere within PRINCIPAL_VERSION_CHECK_SECONDS rather than the whole TTL.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_VERSION_CHECK_SECONDS = float(os.getenv("PRINCIPAL_VERSION_CHECK_SECONDS", "5"))
+
+# Name of this cache's row in cache_versions
+PRINCIPAL_VERSION_KEY = "principals"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """The authenticated user together with the profile IDs the routers need"""
+    id: int
+    email: str
+    role: str
+    created_at: Optional[datetime] = None
+    teacher_id: Optional[int] = None
+    student_id: Optional[int] = None
+    class_id: Optional[int] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+
+
+class PrincipalCache:
+    """Thread-safe LRU cache of principals with a time-to-live, keyed by token subject"""
+    
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.version_clears = 0
+    
+    def get(self, subject: str) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return entry[1]
+    
+    def put(self, subject: str, principal: Principal):
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, principal)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, subject: str):
+        with self._lock:
+            if self._entries.pop(subject, None) is not None:
+                self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self._checked_at = 0.0
+    
+    def version_check_due(self) -> bool:
+        return time.monotonic() - self._checked_at >= PRINCIPAL_VERSION_CHECK_SECONDS
+    
+    def sync_version(self, db: Session):
+        """Clear every entry if another worker has changed an account since the last check"""
+        # Shared by every request in the worker, so no single request's budget is charged
+        with querystats.untracked():
+            version = db.scalar(
+                select(CacheVersion.version).where(CacheVersion.name == PRINCIPAL_VERSION_KEY)
+            ) or 0
+        # Hand the connection back, as load_principal does
+        db.rollback()
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self._entries.clear()
+                self.version_clears += 1
+            self._version = version
+            self._checked_at = time.monotonic()
+    
+    def check_now(self):
+        """Make the next request in this worker re-read the version"""
+        self._checked_at = 0.0
+    
+    def stats(self) -> dict:
+        """Counters and size for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "version_clears": self.version_clears,
+            "version": self._version,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
 
 def get_password_hash(password: str) -> str:
     """Hash a password for storing using bcrypt directly."""
@@ -38,6 +164,35 @@ def get_password_hash(password: str) -> str:
         raise ValueError(f"Password hashing failed: {str(e)}")
 
 
+# Process pool for hashing many passwords at once (bulk onboarding)
+if hasattr(os, "sched_getaffinity"):
+    _available_cpus = len(os.sched_getaffinity(0))
+else:
+    _available_cpus = os.cpu_count() or 1
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or _available_cpus
+_hash_pool: Optional[ProcessPoolExecutor] = None
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hash many passwords in parallel across a process pool, preserving order."""
+    global _hash_pool
+    
+    # Not worth starting processes for a handful of passwords
+    if len(passwords) < 2 or PASSWORD_HASH_WORKERS == 1:
+        return [get_password_hash(password) for password in passwords]
+    
+    if _hash_pool is None:
+        # forkserver avoids forking a process that already runs threads (not available on Windows)
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _hash_pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context(start_method)
+        )
+    
+    chunksize = max(1, len(passwords) // (PASSWORD_HASH_WORKERS * 4))
+    return list(_hash_pool.map(get_password_hash, passwords, chunksize=chunksize))
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a stored password against one provided by user."""
     try:
@@ -59,6 +214,62 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         raise ValueError(f"Password verification failed: {str(e)}")
 
 
+# bcrypt releases the GIL, so password checks run on their own small thread pool.
+# This keeps login bursts off the event loop and out of the shared request thread pool.
+PASSWORD_VERIFY_CONCURRENCY = int(os.getenv("PASSWORD_VERIFY_CONCURRENCY", "0")) or _available_cpus
+_verify_pool = ThreadPoolExecutor(max_workers=PASSWORD_VERIFY_CONCURRENCY, thread_name_prefix="password-verify")
+_verify_slots = asyncio.Semaphore(PASSWORD_VERIFY_CONCURRENCY)
+_verify_stats = {
+    "in_flight": 0,
+    "waiting": 0,
+    "max_waiting": 0,
+    "completed": 0,
+    "wait_seconds_total": 0.0,
+    "verify_seconds_total": 0.0
+}
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password without blocking the event loop, capping checks in flight."""
+    queued_at = time.perf_counter()
+    if _verify_slots.locked():
+        # Every slot is busy, so this check joins the queue
+        _verify_stats["waiting"] += 1
+        _verify_stats["max_waiting"] = max(_verify_stats["max_waiting"], _verify_stats["waiting"])
+        try:
+            await _verify_slots.acquire()
+        finally:
+            _verify_stats["waiting"] -= 1
+    else:
+        await _verify_slots.acquire()
+    
+    started = time.perf_counter()
+    _verify_stats["wait_seconds_total"] += started - queued_at
+    _verify_stats["in_flight"] += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_verify_pool, verify_password, plain_password, hashed_password)
+    finally:
+        _verify_stats["in_flight"] -= 1
+        _verify_stats["completed"] += 1
+        _verify_stats["verify_seconds_total"] += time.perf_counter() - started
+        _verify_slots.release()
+
+
+def password_check_stats() -> dict:
+    """Queue depth and timing of password checks in this worker"""
+    completed = _verify_stats["completed"]
+    return {
+        "concurrency": PASSWORD_VERIFY_CONCURRENCY,
+        "in_flight": _verify_stats["in_flight"],
+        "waiting": _verify_stats["waiting"],
+        "max_waiting": _verify_stats["max_waiting"],
+        "completed": completed,
+        "avg_wait_ms": round(_verify_stats["wait_seconds_total"] * 1000 / completed, 1) if completed else None,
+        "avg_verify_ms": round(_verify_stats["verify_seconds_total"] * 1000 / completed, 1) if completed else None
+    }
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -72,7 +283,80 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def principal_query(email: str):
+    """Select a user together with their teacher or student profile columns"""
+    return select(
+        User,
+        Teacher.id.label("teacher_id"),
+        Teacher.first_name.label("teacher_first_name"),
+        Teacher.last_name.label("teacher_last_name"),
+        Student.id.label("student_id"),
+        Student.class_id.label("class_id"),
+        Student.first_name.label("student_first_name"),
+        Student.last_name.label("student_last_name")
+    ).outerjoin(Teacher, Teacher.user_id == User.id).outerjoin(
+        Student, Student.user_id == User.id
+    ).where(User.email == email)
+
+
+def load_principal(db: Session, email: str) -> Optional[Principal]:
+    """Load a user and their teacher/student profile IDs in one query"""
+    row = db.execute(principal_query(email)).first()
+    principal = None if row is None else _to_principal(row)
+    # Hand the connection back now; otherwise the request holds it while the
+    # handler checks out another one, and a burst of requests can drain the pool
+    db.rollback()
+    return principal
+
+
+def _to_principal(row) -> Principal:
+    user = row.User
+    return Principal(
+        id=user.id,
+        email=user.email,
+        role=user.role,
+        created_at=user.created_at,
+        teacher_id=row.teacher_id,
+        student_id=row.student_id,
+        class_id=row.class_id,
+        first_name=row.teacher_first_name or row.student_first_name,
+        last_name=row.teacher_last_name or row.student_last_name
+    )
+
+
+def invalidate_principal(db: Session, email: Optional[str]):
+    """Mark a principal as changed in the caller's transaction (call before commit)"""
+    if not email:
+        return
+    
+    _, insert = dialect_insert(db)
+    db.execute(insert(CacheVersion).values(name=PRINCIPAL_VERSION_KEY, version=1).on_conflict_do_update(
+        index_elements=[CacheVersion.name],
+        set_={"version": CacheVersion.version + 1}
+    ))
+    
+    # This worker drops the entry as soon as the change is committed
+    db.info.setdefault("principals_stale", set()).add(email)
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_principals_after_commit(session: Session):
+    """Drop changed principals once the transaction that changed them has committed"""
+    emails = session.info.pop("principals_stale", None)
+    if emails:
+        for email in emails:
+            principal_cache.invalidate(email)
+        # The version moved, so the next check clears the rest of this worker's cache too
+        principal_cache.check_now()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_principals_after_rollback(session: Session):
+    """A rolled back change leaves the cached principals valid"""
+    session.info.pop("principals_stale", None)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_session)):
     """Get the current user from the JWT token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -91,14 +375,22 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
+    if principal_cache.version_check_due():
+        # Another worker may have changed or deleted an account since the last check
+        await run_in_session(db, principal_cache.sync_version)
+    
+    principal = principal_cache.get(email)
+    if principal is None:
+        # Only a cache miss touches the database, and it does so without blocking the event loop
+        principal = await run_in_session(db, load_principal, email)
+        if principal is None:
+            raise credentials_exception
+        principal_cache.put(email, principal)
     
-    return user
+    return principal
 
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     """Check if the current user is active."""
     return current_user
 
@@ -106,7 +398,7 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
 
 def require_role(required_role: str):
     """Dependency to check if user has required role."""
-    def role_checker(current_user: User = Depends(get_current_user)):
+    async def role_checker(current_user: Principal = Depends(get_current_user)):
         if current_user.role != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -116,7 +408,7 @@ def require_role(required_role: str):
     return role_checker
 
 
-def require_admin(current_user: User = Depends(get_current_user)):
+async def require_admin(current_user: Principal = Depends(get_current_user)):
     """Dependency to check if user is admin."""
     if current_user.role != "admin":
         raise HTTPException(
@@ -0,0 +1,118 @@
+from typing import Dict, List, Tuple
+from sqlalchemy import literal_column, select
+from sqlalchemy.orm import Session
+from app.models import Result, Student
+
+# Rows per INSERT ... ON CONFLICT statement, well under the bind parameter
+# limits of both PostgreSQL and SQLite
+UPSERT_BATCH_SIZE = 1000
+
+
+def validate_bulk_items(items: List[dict]) -> Tuple[Dict[int, float], List[str]]:
+    """Validate raw {student_id, marks} items in memory, returning marks by student and errors"""
+    marks_by_student = {}
+    errors = []
+
+    for index, item in enumerate(items, start=1):
+        student_id = item.get("student_id") if isinstance(item, dict) else None
+        marks = item.get("marks") if isinstance(item, dict) else None
+
+        if not student_id or marks is None:
+            errors.append(f"Row {index}: Missing student_id or marks in result item")
+            continue
+
+        if isinstance(student_id, bool) or not isinstance(student_id, int):
+            errors.append(f"Row {index}: student_id must be an integer")
+            continue
+
+        if isinstance(marks, bool) or not isinstance(marks, (int, float)):
+            errors.append(f"Student {student_id}: Marks must be a number")
+            continue
+
+        if marks < 0 or marks > 100:
+            errors.append(f"Student {student_id}: Marks must be between 0 and 100")
+            continue
+
+        if student_id in marks_by_student:
+            errors.append(f"Student {student_id}: Appears more than once in this upload")
+            continue
+
+        marks_by_student[student_id] = marks
+
+    return marks_by_student, errors
+
+
+def filter_class_members(db: Session, class_id: int, student_ids) -> set:
+    """Return the subset of student IDs that belong to the class, using one query"""
+    if not student_ids:
+        return set()
+    return set(db.scalars(
+        select(Student.id).where(Student.id.in_(list(student_ids)), Student.class_id == class_id)
+    ))
+
+
+def dialect_insert(db: Session):
+    """Return the insert() construct that supports ON CONFLICT for the bound database"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Bulk upsert is not supported on {dialect}")
+    return dialect, insert
+
+
+def upsert_results(
+    db: Session,
+    subject_id: int,
+    term_id: int,
+    teacher_id: int,
+    marks_by_student: Dict[int, float]
+) -> Dict[int, str]:
+    """Upsert results in INSERT ... ON CONFLICT batches, returning "created" or "updated" per student"""
+    if not marks_by_student:
+        return {}
+
+    dialect, insert = dialect_insert(db)
+    student_ids = list(marks_by_student)
+
+    # PostgreSQL reports inserts vs updates through xmax; elsewhere look the rows up first
+    existing = set()
+    if dialect != "postgresql":
+        existing = set(db.scalars(
+            select(Result.student_id).where(
+                Result.subject_id == subject_id,
+                Result.term_id == term_id,
+                Result.student_id.in_(student_ids)
+            )
+        ))
+
+    statuses = {}
+    for start in range(0, len(student_ids), UPSERT_BATCH_SIZE):
+        batch = student_ids[start:start + UPSERT_BATCH_SIZE]
+        stmt = insert(Result).values([
+            {
+                "student_id": student_id,
+                "subject_id": subject_id,
+                "term_id": term_id,
+                "marks": marks_by_student[student_id],
+                "teacher_id": teacher_id
+            }
+            for student_id in batch
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Result.student_id, Result.subject_id, Result.term_id],
+            set_={"marks": stmt.excluded.marks, "teacher_id": stmt.excluded.teacher_id}
+        )
+
+        if dialect == "postgresql":
+            stmt = stmt.returning(Result.student_id, literal_column("(xmax = 0)").label("created"))
+            for row in db.execute(stmt):
+                statuses[row.student_id] = "created" if row.created else "updated"
+        else:
+            db.execute(stmt)
+            for student_id in batch:
+                statuses[student_id] = "updated" if student_id in existing else "created"
+
+    return statuses
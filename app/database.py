@@ -1,7 +1,16 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from uuid import uuid4
+import asyncio
+import itertools
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,8 +19,77 @@ load_dotenv()
 # Get database URL from .env
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# "sync" runs queries on the request thread pool, "async" runs the ported read
+# endpoints on the event loop through asyncpg (or aiosqlite for SQLite)
+DATABASE_MODE = os.getenv("DATABASE_MODE", "sync").lower()
+if DATABASE_MODE not in ("sync", "async"):
+    raise ValueError(f"DATABASE_MODE must be 'sync' or 'async', not '{DATABASE_MODE}'")
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Connections opened at startup so the first requests after a deploy skip the connect cost
+DB_POOL_WARM = int(os.getenv("DB_POOL_WARM", str(DB_POOL_SIZE)))
+# Set when connecting through PgBouncer in transaction pooling mode
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+
+class _CheckoutStatsMixin:
+    """Records how long callers wait to get a connection out of the pool"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+class InstrumentedQueuePool(_CheckoutStatsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutStatsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_options(url: str, pool_class) -> dict:
+    """Keyword arguments for create_engine built from the DB_POOL_* settings"""
+    parsed = make_url(url)
+    # In-memory SQLite keeps a single connection per thread and takes no pool settings
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING
+    }
+
+
 # Create database engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL, InstrumentedQueuePool))
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -25,4 +103,252 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def to_async_url(url: str) -> str:
+    """Swap the sync driver in a database URL for its asyncio counterpart"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    raise ValueError(f"No async driver configured for '{backend}' databases")
+
+
+def build_async_engine(url: str):
+    """Create an asyncio engine with the pool settings (and PgBouncer options if enabled)"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    options = pool_options(url, InstrumentedAsyncQueuePool)
+    if DB_PGBOUNCER and make_url(url).get_backend_name() == "postgresql":
+        # PgBouncer hands each transaction to any server connection, so asyncpg must not
+        # cache prepared statements or reuse their names across transactions
+        options["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__"
+        }
+    return create_async_engine(url, **options)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DATABASE_MODE == "async":
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+    async_engine = build_async_engine(ASYNC_DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Dependency for endpoints that work in either mode. In sync mode it is get_db
+# itself, so a request still shares one session with the auth dependency.
+get_session = get_async_db if DATABASE_MODE == "async" else get_db
+
+
+# ============= READ REPLICAS =============
+
+# Comma-separated replica URLs; read-only endpoints are spread across them
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# A replica further behind the primary than this is skipped until it catches up
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+
+# Seconds since the last replayed transaction, or 0 when the replica has replayed everything it received
+POSTGRES_LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class Replica:
+    """One read replica with its engines and last health check"""
+
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_engine(url, **pool_options(url, InstrumentedQueuePool))
+        self.async_engine = build_async_engine(to_async_url(url)) if DATABASE_MODE == "async" else None
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self.reads = 0
+        event.listen(self.engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        """Stop routing to a replica as soon as its connections start failing"""
+        if context.is_disconnect:
+            self.healthy = False
+            self.error = str(context.original_exception)
+
+    @property
+    def usable(self) -> bool:
+        return self.healthy and self.lag_seconds is not None and self.lag_seconds <= REPLICA_MAX_LAG_SECONDS
+
+    def check(self):
+        """Ping the replica and measure how far it is behind the primary"""
+        try:
+            with self.engine.connect() as connection:
+                if self.engine.dialect.name == "postgresql":
+                    self.lag_seconds = float(connection.scalar(POSTGRES_LAG_QUERY))
+                else:
+                    connection.execute(text("SELECT 1"))
+                    self.lag_seconds = 0.0
+            self.healthy = True
+            self.error = None
+        except Exception as e:
+            self.healthy = False
+            self.error = str(e)
+        self.checked_at = time.time()
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "usable": self.usable,
+            "lag_seconds": self.lag_seconds,
+            "checked_at": self.checked_at,
+            "error": self.error,
+            "reads": self.reads,
+            "pool": pool_stats(self.engine)
+        }
+
+
+class ReplicaRouter:
+    """Round-robin over replicas that are healthy and caught up, else the primary"""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._counter = itertools.count()
+        self.primary_fallbacks = 0
+
+    def choose(self) -> Optional[Replica]:
+        if not self.replicas:
+            return None
+        usable = [replica for replica in self.replicas if replica.usable]
+        if not usable:
+            self.primary_fallbacks += 1
+            return None
+        replica = usable[next(self._counter) % len(usable)]
+        replica.reads += 1
+        return replica
+
+    def check_all(self):
+        for replica in self.replicas:
+            replica.check()
+
+    def stats(self) -> dict:
+        return {
+            "max_lag_seconds": REPLICA_MAX_LAG_SECONDS,
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": [replica.stats() for replica in self.replicas]
+        }
+
+
+replicas = ReplicaRouter(DATABASE_REPLICA_URLS)
+
+
+async def monitor_replicas():
+    """Re-check replica health and lag in the background for as long as the app runs"""
+    while True:
+        await run_in_threadpool(replicas.check_all)
+        await asyncio.sleep(REPLICA_CHECK_SECONDS)
+
+
+def get_read_db():
+    """Session for read-only handlers: a caught-up replica if one is available, else the primary"""
+    replica = replicas.choose()
+    db = SessionLocal(bind=replica.engine) if replica else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db():
+    replica = replicas.choose()
+    async with (AsyncSessionLocal(bind=replica.async_engine) if replica else AsyncSessionLocal()) as db:
+        yield db
+
+
+# Read-only counterpart of get_session. Writes, and reads that must see a write the
+# same request just made, keep using get_db/get_session on the primary.
+get_read_session = get_async_read_db if DATABASE_MODE == "async" else get_read_db
+
+
+async def run_in_session(db, fn, *args, **kwargs):
+    """Call fn(session, *args) without blocking the event loop, whichever mode db comes from"""
+    if isinstance(db, Session):
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    # AsyncSession hands fn a regular Session whose queries are awaited on the loop
+    return await db.run_sync(fn, *args, **kwargs)
+
+
+def fetch_all(db: Session, statement) -> list:
+    """Execute a statement and return every row (for use with run_in_session)"""
+    return db.execute(statement).all()
+
+
+def pool_stats(target_engine) -> dict:
+    """Pool usage counters read from memory; never opens a connection"""
+    pool = target_engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": DB_MAX_OVERFLOW,
+            "timeout_seconds": DB_POOL_TIMEOUT
+        })
+    if isinstance(pool, _CheckoutStatsMixin):
+        stats.update({
+            "checkouts": pool.checkouts,
+            "checkout_timeouts": pool.timeouts,
+            "avg_wait_ms": round(pool.wait_seconds_total * 1000 / pool.checkouts, 2) if pool.checkouts else None,
+            "max_wait_ms": round(pool.wait_seconds_max * 1000, 2)
+        })
+    return stats
+
+
+def warm_pool(count: int = DB_POOL_WARM):
+    """Open up to count pooled connections at once, then return them to the pool"""
+    # Anything beyond pool_size would be overflow, which is closed again on return
+    count = min(count, DB_POOL_SIZE)
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+
+async def warm_async_pool(count: int = DB_POOL_WARM):
+    """Async mode counterpart of warm_pool"""
+    count = min(count, DB_POOL_SIZE)
+    connections = []
+    try:
+        for _ in range(count):
+            connection = await async_engine.connect()
+            connections.append(connection)
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            await connection.close()
+    return len(connections)
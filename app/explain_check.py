@@ -0,0 +1,129 @@
+import argparse
+import json
+import sys
+from typing import Dict, List
+from sqlalchemy import select, text
+from app.analytics import Slice, slice_marks_query
+from app.auth import principal_query
+from app.gradebook import class_marks_query
+from app.models import ClassStanding, Result, Student, TeacherAssignment, User
+from app.projections import result_projection_query
+from app.ranking import class_ranking_query, term_ranking_query
+from app.summaries import class_sheet_query
+from app.transcript import transcript_query
+
+# Tables that grow with the number of students; a sequential scan of any of
+# them on a request path is a regression. classes, subjects and terms stay
+# small and are served from the reference-data cache anyway.
+LARGE_TABLES = {"users", "students", "teachers", "results", "teacher_assignments", "class_standings"}
+
+
+def key_queries(
+    student_id: int = 1, teacher_id: int = 1, class_id: int = 1, subject_id: int = 1, term_id: int = 1
+) -> Dict[str, object]:
+    """The statements behind the hottest endpoints, built with the same helpers the routers use"""
+    return {
+        "auth: load principal by email": principal_query("someone@example.com"),
+        "student: results for a term": result_projection_query().where(
+            Result.student_id == student_id, Result.term_id == term_id
+        ),
+        "student: transcript": transcript_query(student_id),
+        "teacher: assignments for a term": select(TeacherAssignment).where(
+            TeacherAssignment.teacher_id == teacher_id, TeacherAssignment.term_id == term_id
+        ),
+        "teacher: uploaded results": result_projection_query().where(
+            Result.teacher_id == teacher_id, Result.term_id == term_id
+        ),
+        "teacher: class student list": select(Student).where(Student.class_id == class_id),
+        "teacher: class gradebook marks": class_marks_query(class_id, term_id),
+        "teacher: analytics marks for a class subject": slice_marks_query(
+            Slice(term_id=term_id, class_ids=(class_id,), pairs=frozenset({(class_id, subject_id)}))
+        ),
+        "admin: users by role, first page": select(User).where(User.role == "student").order_by(User.id).limit(50),
+        "standings: class ranking": class_ranking_query(class_id, term_id),
+        "standings: term ranking": term_ranking_query(term_id),
+        "standings: class table": select(ClassStanding).where(
+            ClassStanding.class_id == class_id, ClassStanding.term_id == term_id
+        ),
+        "summaries: class sheet load": class_sheet_query(class_id, term_id),
+        "admin: analytics marks for a term": slice_marks_query(Slice(term_id=term_id, class_ids=(class_id,))),
+    }
+
+
+def _postgres_seq_scans(plan: dict) -> List[str]:
+    """Walk an EXPLAIN (FORMAT JSON) plan and list sequentially scanned large tables"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in LARGE_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(_postgres_seq_scans(child))
+    return found
+
+
+def _sqlite_seq_scans(rows) -> List[str]:
+    """Pick full table scans of large tables out of EXPLAIN QUERY PLAN rows"""
+    found = []
+    for row in rows:
+        detail = row[-1]
+        if not detail.startswith("SCAN ") or "INDEX" in detail:
+            continue
+        table = detail.split()[1]
+        if table in LARGE_TABLES:
+            found.append(table)
+    return found
+
+
+def explain(connection, statement) -> List[str]:
+    """Return the large tables a statement would read with a sequential scan"""
+    compiled = str(statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    if connection.dialect.name == "postgresql":
+        plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return _postgres_seq_scans(plan[0]["Plan"])
+    if connection.dialect.name == "sqlite":
+        return _sqlite_seq_scans(connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all())
+    raise NotImplementedError(f"EXPLAIN check is not supported on {connection.dialect.name}")
+
+
+def run_check(engine, planner_costs: bool = False) -> List[dict]:
+    """EXPLAIN every key query and return the ones that fall back to sequential scans"""
+    failures = []
+    with engine.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            if not planner_costs:
+                # Judge whether a usable index exists, not whether the planner prefers it
+                # on a database too small for the index to pay off
+                connection.execute(text("SET LOCAL enable_seqscan = off"))
+            connection.execute(text("ANALYZE " + ", ".join(sorted(LARGE_TABLES))))
+        for name, statement in key_queries().items():
+            tables = explain(connection, statement)
+            status = "SEQ SCAN " + ", ".join(sorted(set(tables))) if tables else "ok"
+            print(f"{status:<40} {name}")
+            if tables:
+                failures.append({"query": name, "tables": sorted(set(tables))})
+        connection.rollback()
+    return failures
+
+
+def main(argv=None):
+    """Command line entry point: python -m app.explain_check"""
+    parser = argparse.ArgumentParser(
+        description="Fail if any hot query would scan a large table sequentially (run against a seeded database)"
+    )
+    parser.add_argument(
+        "--planner-costs",
+        action="store_true",
+        help="PostgreSQL only: keep sequential scans enabled and trust the planner's choice (use on production-sized data)"
+    )
+    args = parser.parse_args(argv)
+
+    from app.database import engine
+
+    failures = run_check(engine, planner_costs=args.planner_costs)
+    print(f"{len(failures)} of {len(key_queries())} key queries use sequential scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
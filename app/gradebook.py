@@ -0,0 +1,258 @@
+import math
+from typing import List, Optional, Tuple
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from app import refdata
+from app.grading import CompiledScheme
+from app.models import Result, Student, TeacherAssignment
+from app.ranking import class_candidates, member_class, recorded, resolve_tie_policy
+from app.schemas import ClassResponse, TermResponse
+
+# "columnar": parallel arrays plus a dense marks matrix (compact, for grids)
+# "records":  one object per student and per subject
+LAYOUTS = ("columnar", "records")
+
+SUBJECT_STATS = ("mean", "median", "min", "max", "std")
+
+
+def check_layout(layout: str):
+    """Reject unknown layouts before any query runs"""
+    if layout not in LAYOUTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown layout '{layout}'. Expected one of: {', '.join(LAYOUTS)}"
+        )
+
+
+def resolve_class_and_term(db: Session, class_id: int, term_id: Optional[int]) -> Tuple[ClassResponse, TermResponse]:
+    """Look up the class and the requested term (the active one by default) from the cache"""
+    class_obj = refdata.get_class(db, class_id)
+    if not class_obj:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Class with ID {class_id} not found"
+        )
+
+    term = refdata.get_term(db, term_id) if term_id else refdata.get_active_term(db)
+    if not term:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Term with ID {term_id} not found" if term_id else "No active term found"
+        )
+    return class_obj, term
+
+
+def class_assignments(db: Session, class_id: int, term_id: int) -> list:
+    """(subject_id, teacher_id) of every assignment for a class in a term"""
+    return db.execute(
+        select(TeacherAssignment.subject_id, TeacherAssignment.teacher_id).where(
+            TeacherAssignment.class_id == class_id,
+            TeacherAssignment.term_id == term_id
+        )
+    ).all()
+
+
+def class_marks_query(class_id: int, term_id: int):
+    """Every student of a class with their marks for a term: one row per mark, one bare row per unmarked student"""
+    # Membership follows the class each student is ranked in for the term, as the standings do
+    return (
+        select(
+            Student.id.label("student_id"),
+            Student.first_name,
+            Student.last_name,
+            Student.admission_number,
+            Result.subject_id,
+            Result.marks,
+        )
+        .outerjoin(recorded, and_(recorded.student_id == Student.id, recorded.term_id == term_id))
+        .outerjoin(Result, and_(Result.student_id == Student.id, Result.term_id == term_id))
+        .where(Student.id.in_(class_candidates(class_id, term_id)), member_class == class_id)
+        .order_by(Student.last_name, Student.first_name, Student.id)
+    )
+
+
+def rank_totals(totals: np.ndarray, student_ids: np.ndarray, tie_policy: str) -> np.ndarray:
+    """Class positions for the given totals, matching the SQL window functions in app.ranking"""
+    # Totals are sums of 2-decimal marks; rounding undoes float error so equal totals tie
+    scores = -np.round(totals, 2)
+    if tie_policy == "row":
+        order = np.lexsort((student_ids, scores))
+        positions = np.empty(len(scores), dtype=np.int64)
+        positions[order] = np.arange(1, len(scores) + 1)
+        return positions
+    if tie_policy == "dense":
+        return np.searchsorted(np.unique(scores), scores) + 1
+    return np.searchsorted(np.sort(scores), scores, side="left") + 1
+
+
+class Gradebook:
+    """Dense students x subjects marks matrix for one class and term, with row and column statistics"""
+
+    def __init__(
+        self,
+        class_obj,
+        term,
+        subjects: list,
+        schemes: List[CompiledScheme],
+        students: list,
+        marks: np.ndarray,
+        tie_policy: Optional[str] = None
+    ):
+        self.class_obj = class_obj
+        self.term = term
+        self.subjects = subjects
+        self.schemes = schemes
+        self.students = students
+        self.marks = marks
+        self.tie_policy = resolve_tie_policy(tie_policy)
+
+        graded = ~np.isnan(marks)
+
+        # Each column is graded in one searchsorted call by its subject's scheme
+        self.grades = np.full(marks.shape, None, dtype=object)
+        for column, scheme in enumerate(schemes):
+            rows = graded[:, column]
+            self.grades[rows, column] = scheme.grade_array(marks[rows, column])
+
+        self.subject_counts = np.count_nonzero(graded, axis=1)
+        self.totals = np.round(np.where(graded, marks, 0.0).sum(axis=1), 2)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.averages = np.round(self.totals / self.subject_counts, 2)
+
+        # Students without marks are left unranked, as in class_standings
+        ranked = self.subject_counts > 0
+        self.ranked_students = int(np.count_nonzero(ranked))
+        self.positions = np.zeros(len(students), dtype=np.int64)
+        student_ids = np.array([student.student_id for student in students], dtype=np.int64)
+        self.positions[ranked] = rank_totals(self.totals[ranked], student_ids[ranked], self.tie_policy)
+
+        self.mark_counts = np.count_nonzero(graded, axis=0)
+        self.subject_stats = {name: np.full(len(subjects), np.nan) for name in SUBJECT_STATS}
+        marked = self.mark_counts > 0
+        if marked.any():
+            columns = marks[:, marked]
+            self.subject_stats["mean"][marked] = np.nanmean(columns, axis=0)
+            self.subject_stats["median"][marked] = np.nanmedian(columns, axis=0)
+            self.subject_stats["min"][marked] = np.nanmin(columns, axis=0)
+            self.subject_stats["max"][marked] = np.nanmax(columns, axis=0)
+            self.subject_stats["std"][marked] = np.nanstd(columns, axis=0)
+        for name in SUBJECT_STATS:
+            self.subject_stats[name] = np.round(self.subject_stats[name], 2)
+
+    def _header(self, layout: str) -> dict:
+        return {
+            "class_id": self.class_obj.id,
+            "class_name": self.class_obj.name,
+            "term_id": self.term.id,
+            "term_name": self.term.name,
+            "tie_policy": self.tie_policy,
+            "ranked_students": self.ranked_students,
+            "layout": layout
+        }
+
+    def columnar(self) -> dict:
+        """Parallel arrays and a row-per-student marks matrix (missing marks are NaN, which orjson writes as null)"""
+        return {
+            **self._header("columnar"),
+            "subjects": {
+                "ids": [subject.id for subject in self.subjects],
+                "names": [subject.name for subject in self.subjects],
+                "codes": [subject.code for subject in self.subjects],
+                "grading_schemes": [scheme.name for scheme in self.schemes]
+            },
+            "students": {
+                "ids": [student.student_id for student in self.students],
+                "names": [f"{student.first_name} {student.last_name}" for student in self.students],
+                "admission_numbers": [student.admission_number for student in self.students]
+            },
+            "marks": self.marks.tolist(),
+            "grades": self.grades.tolist(),
+            "totals": self.totals.tolist(),
+            "averages": self.averages.tolist(),
+            "subject_counts": self.subject_counts.tolist(),
+            "positions": [position or None for position in self.positions.tolist()],
+            "subject_stats": {
+                "count": self.mark_counts.tolist(),
+                **{name: values.tolist() for name, values in self.subject_stats.items()}
+            }
+        }
+
+    def records(self) -> dict:
+        """One object per student (with one entry per mark) and one per subject"""
+        subject_ids = [subject.id for subject in self.subjects]
+        stats = {name: values.tolist() for name, values in self.subject_stats.items()}
+        mark_counts = self.mark_counts.tolist()
+        subjects = [
+            {
+                "subject_id": subject.id,
+                "subject_name": subject.name,
+                "code": subject.code,
+                "grading_scheme": self.schemes[index].name,
+                "count": mark_counts[index],
+                **{name: stats[name][index] for name in SUBJECT_STATS}
+            }
+            for index, subject in enumerate(self.subjects)
+        ]
+
+        students = []
+        for student, row, grades, total, average, count, position in zip(
+            self.students,
+            self.marks.tolist(),
+            self.grades.tolist(),
+            self.totals.tolist(),
+            self.averages.tolist(),
+            self.subject_counts.tolist(),
+            self.positions.tolist()
+        ):
+            students.append({
+                "student_id": student.student_id,
+                "student_name": f"{student.first_name} {student.last_name}",
+                "admission_number": student.admission_number,
+                "marks": [
+                    {"subject_id": subject_id, "marks": marks, "grade": grade}
+                    for subject_id, marks, grade in zip(subject_ids, row, grades)
+                    if not math.isnan(marks)
+                ],
+                "total_marks": total,
+                "average_marks": average,
+                "subject_count": count,
+                "position": position or None
+            })
+
+        return {**self._header("records"), "subjects": subjects, "students": students}
+
+    def encode(self, layout: str) -> dict:
+        return self.columnar() if layout == "columnar" else self.records()
+
+
+def build_gradebook(db: Session, class_obj, term, subject_ids, tie_policy: Optional[str] = None) -> Gradebook:
+    """Load a class's marks for a term with one query and pivot them into a Gradebook"""
+    rows = db.execute(class_marks_query(class_obj.id, term.id)).all()
+
+    # Columns: the subjects taught to the class, plus any a student was marked in elsewhere
+    subject_ids = set(subject_ids)
+    subject_ids.update(row.subject_id for row in rows if row.subject_id is not None)
+    subjects = [refdata.get_subject(db, subject_id) for subject_id in subject_ids]
+    subjects = sorted((subject for subject in subjects if subject), key=lambda subject: (subject.name, subject.id))
+    column_of = {subject.id: index for index, subject in enumerate(subjects)}
+
+    students: List = []
+    row_of = {}
+    cell_rows, cell_columns, cell_marks = [], [], []
+    for row in rows:
+        index = row_of.get(row.student_id)
+        if index is None:
+            index = row_of[row.student_id] = len(students)
+            students.append(row)
+        column = column_of.get(row.subject_id)
+        if column is not None:
+            cell_rows.append(index)
+            cell_columns.append(column)
+            cell_marks.append(float(row.marks))
+
+    marks = np.full((len(students), len(subjects)), np.nan)
+    marks[cell_rows, cell_columns] = cell_marks
+    schemes = [refdata.get_grading_scheme(db, class_obj.level, subject.id) for subject in subjects]
+    return Gradebook(class_obj, term, subjects, schemes, students, marks, tie_policy)
@@ -0,0 +1,88 @@
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+
+class CompiledScheme:
+    """A grading scheme's boundaries as sorted arrays, ready for bisect and searchsorted"""
+
+    def __init__(self, scheme_id: Optional[int], name: str, boundaries: Iterable[Tuple[float, str]]):
+        ordered = sorted(boundaries)
+        self.id = scheme_id
+        self.name = name
+        self.bounds = [float(min_marks) for min_marks, _ in ordered]
+        self.grades = [grade for _, grade in ordered]
+        self._bound_array = np.array(self.bounds, dtype=np.float64)
+        self._grade_array = np.array(self.grades, dtype=object)
+
+    @property
+    def labels(self) -> List[str]:
+        """Grades from best to worst"""
+        return self.grades[::-1]
+
+    def grade(self, marks: float) -> str:
+        """Grade for a single mark"""
+        return self.grades[max(bisect.bisect_right(self.bounds, marks) - 1, 0)]
+
+    def grade_indexes(self, marks: np.ndarray) -> np.ndarray:
+        """Position in self.grades of each mark's grade (marks must not be NaN)"""
+        return np.maximum(np.searchsorted(self._bound_array, marks, side="right") - 1, 0)
+
+    def grade_array(self, marks: np.ndarray) -> np.ndarray:
+        """Grades for a whole array of marks at once"""
+        return self._grade_array[self.grade_indexes(marks)]
+
+
+# Used wherever no scheme is configured
+DEFAULT_SCHEME = CompiledScheme(None, "Default", [(0, "F"), (50, "D"), (60, "C"), (70, "B"), (80, "A")])
+
+
+def check_boundaries(boundaries: List[Tuple[float, str]]):
+    """Raise ValueError unless the boundaries form a usable scale starting at 0"""
+    if not boundaries:
+        raise ValueError("A grading scheme needs at least one boundary")
+    min_marks = [float(value) for value, _ in boundaries]
+    grades = [grade.strip() for _, grade in boundaries]
+    if 0 not in min_marks:
+        raise ValueError("One boundary must start at 0 marks")
+    if len(set(min_marks)) != len(min_marks):
+        raise ValueError("Boundaries must have different min_marks")
+    if len(set(grades)) != len(grades):
+        raise ValueError("Each grade may appear only once in a scheme")
+
+
+def compile_schemes(schemes) -> Dict[Tuple[Optional[int], Optional[int]], CompiledScheme]:
+    """Compile GradingScheme rows (with boundaries loaded) keyed by (level, subject_id)"""
+    return {
+        (scheme.level, scheme.subject_id): CompiledScheme(
+            scheme.id,
+            scheme.name,
+            [(boundary.min_marks, boundary.grade) for boundary in scheme.boundaries]
+        )
+        for scheme in schemes
+        if scheme.boundaries
+    }
+
+
+def resolve_scheme(
+    schemes: Dict[Tuple[Optional[int], Optional[int]], CompiledScheme],
+    level: Optional[int],
+    subject_id: Optional[int]
+) -> CompiledScheme:
+    """The scheme for a subject at a class level: level and subject, level, subject, school-wide, then the default"""
+    for key in ((level, subject_id), (level, None), (None, subject_id), (None, None)):
+        scheme = schemes.get(key)
+        if scheme is not None:
+            return scheme
+    return DEFAULT_SCHEME
+
+
+def count_grades(schemes_by_mark: np.ndarray, schemes: List[CompiledScheme], marks: np.ndarray) -> Dict[str, int]:
+    """Grade counts for marks graded by different schemes; schemes_by_mark indexes into schemes"""
+    counts: Dict[str, int] = {}
+    for index, scheme in enumerate(schemes):
+        selected = marks[schemes_by_mark == index]
+        per_grade = np.bincount(scheme.grade_indexes(selected), minlength=len(scheme.grades))
+        for grade, count in zip(scheme.labels, per_grade[::-1].tolist()):
+            counts[grade] = counts.get(grade, 0) + count
+    return counts
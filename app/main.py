@@ -1,12 +1,65 @@
+from contextlib import asynccontextmanager
+import asyncio
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from starlette.concurrency import run_in_threadpool
+from app import database, metrics, profiling, querystats, refdata
+from app.compression import CompressionMiddleware
+from app.responses import FastJSONResponse
 from app.routers import auth, admin, teachers, students
 
+logger = logging.getLogger(__name__)
+
+
+def warm_up():
+    """Fill the connection pool, check the replicas and load the reference-data cache"""
+    opened = database.warm_pool()
+    database.replicas.check_all()
+    db = database.SessionLocal()
+    try:
+        refdata.cache.ensure_fresh(db)
+    finally:
+        db.close()
+    return opened
+
+
+async def try_warm_up(app: FastAPI):
+    """Warm up, recording the outcome for /ready instead of failing startup"""
+    try:
+        opened = await run_in_threadpool(warm_up)
+        if database.async_engine is not None:
+            await database.warm_async_pool()
+        app.state.warm = True
+        logger.info("Database pool warmed with %d connections", opened)
+    except Exception as e:
+        app.state.warm = False
+        logger.warning("Database warm-up failed: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await try_warm_up(app)
+    monitor = asyncio.create_task(database.monitor_replicas()) if database.replicas.replicas else None
+    metrics_refresher = asyncio.create_task(metrics.monitor_metrics())
+    yield
+    metrics_refresher.cancel()
+    metrics.mark_process_dead()
+    if monitor is not None:
+        monitor.cancel()
+    database.engine.dispose()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="School Management System API",
     description="API for managing students, teachers, and results",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS (so frontend can connect)
@@ -16,8 +69,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Statements", "X-DB-Time-Ms", "X-DB-Budget", "X-DB-N-Plus-One"],
 )
 
+# Brotli/gzip for responses above COMPRESSION_MIN_BYTES (admin lists and exports over school Wi-Fi)
+app.add_middleware(CompressionMiddleware)
+
+# Per-request SQL statement counts, query budgets and N+1 detection (debug and test runs)
+if querystats.SQL_STATS or querystats.SQL_STATS_STRICT:
+    querystats.instrument_all()
+    app.middleware("http")(querystats.middleware)
+
+# On-demand profiling of matching requests (see /api/admin/profiling); a flag check while off
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Request latency and in-flight metrics; added last so it also times the other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
 #include routers
 app.include_router(auth.router)
 app.include_router(admin.router)
@@ -35,9 +103,35 @@ def read_root():
 
 # Health check endpoint
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "healthy"}
 
+# Readiness endpoint: pool statistics come from memory, so polling it opens no connections
+@app.get("/ready")
+async def readiness_check():
+    if not getattr(app.state, "warm", False):
+        # Startup could not reach the database; try again before reporting
+        await try_warm_up(app)
+    
+    pools = {"sync": database.pool_stats(database.engine)}
+    if database.async_engine is not None:
+        pools["async"] = database.pool_stats(database.async_engine)
+    
+    body = {
+        "status": "ready" if app.state.warm else "unavailable",
+        "database_mode": database.DATABASE_MODE,
+        "pgbouncer": database.DB_PGBOUNCER,
+        "pools": pools,
+        "replicas": database.replicas.stats()
+    }
+    return FastJSONResponse(body, status_code=200 if app.state.warm else 503)
+
+# Prometheus metrics: route latency, in-flight requests, threadpool, DB pools, caches, bcrypt queue
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
 # Test database connection endpoint
 @app.get("/test-db")
 def test_database():
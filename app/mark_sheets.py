@@ -0,0 +1,175 @@
+import codecs
+import csv
+import math
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.bulk_results import upsert_results
+from app.models import Student
+
+try:
+    from openpyxl import load_workbook
+except ImportError:  # XLSX support is optional
+    load_workbook = None
+
+# Valid rows written per upsert batch while the sheet is being read
+IMPORT_CHUNK_SIZE = 500
+
+ADMISSION_HEADERS = {"admission_number", "admission_no", "admission"}
+MARKS_HEADERS = {"marks", "mark", "score"}
+
+
+class MarkSheetError(ValueError):
+    """Raised when a mark sheet cannot be read at all"""
+
+
+def _normalize_header(value) -> str:
+    """Lower-case a header cell and turn spaces into underscores"""
+    return str(value or "").strip().lower().replace(" ", "_")
+
+
+def _find_columns(header) -> Tuple[int, int]:
+    """Locate the admission number and marks columns in a header row"""
+    names = [_normalize_header(value) for value in header]
+    admission_index = next((i for i, name in enumerate(names) if name in ADMISSION_HEADERS), None)
+    marks_index = next((i for i, name in enumerate(names) if name in MARKS_HEADERS), None)
+    if admission_index is None or marks_index is None:
+        raise MarkSheetError("Mark sheet must have 'admission_number' and 'marks' columns")
+    return admission_index, marks_index
+
+
+def _iter_columns(rows: Iterator) -> Iterator[Tuple[int, object, object]]:
+    """Yield (row number, admission number, marks) from an iterator of raw rows"""
+    header = next(rows, None)
+    if header is None:
+        raise MarkSheetError("Mark sheet is empty")
+    admission_index, marks_index = _find_columns(header)
+
+    for row_number, row in enumerate(rows, start=2):
+        row = list(row or [])
+        # Skip blank lines and trailing empty spreadsheet rows
+        if not any(value not in (None, "") for value in row):
+            continue
+        admission = row[admission_index] if admission_index < len(row) else None
+        marks = row[marks_index] if marks_index < len(row) else None
+        yield row_number, admission, marks
+
+
+def iter_csv_rows(stream: BinaryIO) -> Iterator[Tuple[int, object, object]]:
+    """Stream rows from a CSV file object one line at a time"""
+    lines = codecs.iterdecode(stream, "utf-8-sig")
+    try:
+        yield from _iter_columns(csv.reader(lines))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise MarkSheetError(f"Could not read CSV file: {str(e)}")
+
+
+def iter_xlsx_rows(stream: BinaryIO) -> Iterator[Tuple[int, object, object]]:
+    """Stream rows from the first worksheet of an XLSX file"""
+    if load_workbook is None:
+        raise MarkSheetError("XLSX import requires the 'openpyxl' package; upload a CSV file instead")
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise MarkSheetError(f"Could not read XLSX file: {str(e)}")
+    try:
+        yield from _iter_columns(workbook.active.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def iter_mark_sheet_rows(filename: Optional[str], stream: BinaryIO) -> Iterator[Tuple[int, object, object]]:
+    """Pick a reader based on the uploaded file's extension"""
+    name = (filename or "").lower()
+    if name.endswith(".xlsx"):
+        return iter_xlsx_rows(stream)
+    if name.endswith(".csv") or not name:
+        return iter_csv_rows(stream)
+    raise MarkSheetError("Unsupported file type. Upload a .csv or .xlsx mark sheet")
+
+
+def _parse_marks(value) -> float:
+    """Parse a marks cell from either a CSV string or a spreadsheet number"""
+    if isinstance(value, bool):
+        raise ValueError
+    marks = float(value) if isinstance(value, (int, float)) else float(str(value).strip())
+    if not math.isfinite(marks):
+        raise ValueError
+    return marks
+
+
+def import_mark_sheet(
+    db: Session,
+    rows: Iterator[Tuple[int, object, object]],
+    class_id: int,
+    subject_id: int,
+    term_id: int,
+    teacher_id: int
+) -> dict:
+    """Validate mark sheet rows and upsert them in chunks, collecting row-level errors (does not commit)"""
+    # Resolve admission numbers for the whole class with one query
+    student_ids = {
+        admission_number.strip().upper(): student_id
+        for student_id, admission_number in db.execute(
+            select(Student.id, Student.admission_number).where(Student.class_id == class_id)
+        )
+    }
+
+    errors: List[dict] = []
+    statuses: Dict[int, str] = {}
+    seen = {}
+    chunk = {}
+    rows_read = 0
+
+    def flush_chunk():
+        statuses.update(upsert_results(db, subject_id, term_id, teacher_id, chunk))
+        chunk.clear()
+
+    for row_number, admission, raw_marks in rows:
+        rows_read += 1
+        admission = str(admission).strip() if admission is not None else ""
+
+        if not admission:
+            errors.append({"row": row_number, "admission_number": None, "error": "Missing admission number"})
+            continue
+
+        student_id = student_ids.get(admission.upper())
+        if student_id is None:
+            errors.append({"row": row_number, "admission_number": admission, "error": "No student with this admission number in this class"})
+            continue
+
+        if raw_marks is None or raw_marks == "":
+            errors.append({"row": row_number, "admission_number": admission, "error": "Missing marks"})
+            continue
+
+        try:
+            marks = _parse_marks(raw_marks)
+        except ValueError:
+            errors.append({"row": row_number, "admission_number": admission, "error": f"Marks '{raw_marks}' is not a number"})
+            continue
+
+        if marks < 0 or marks > 100:
+            errors.append({"row": row_number, "admission_number": admission, "error": "Marks must be between 0 and 100"})
+            continue
+
+        if student_id in seen:
+            errors.append({"row": row_number, "admission_number": admission, "error": f"Duplicate of row {seen[student_id]}"})
+            continue
+
+        seen[student_id] = row_number
+        chunk[student_id] = marks
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            flush_chunk()
+
+    if chunk:
+        flush_chunk()
+
+    created_count = sum(1 for result_status in statuses.values() if result_status == "created")
+
+    return {
+        "rows_read": rows_read,
+        "created": created_count,
+        "updated": len(statuses) - created_count,
+        "errors": errors,
+        "student_ids": list(statuses)
+    }
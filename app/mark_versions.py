@@ -0,0 +1,84 @@
+import os
+import time
+from typing import Iterable
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app import querystats
+from app.bulk_results import dialect_insert
+from app.models import CacheVersion
+
+# How often each worker checks whether another worker changed marks
+VERSION_CHECK_SECONDS = float(os.getenv("MARK_VERSION_CHECK_SECONDS", "5"))
+
+# cache_versions rows are named marks:<term_id>:<class_id>
+VERSION_PREFIX = "marks:"
+
+
+def version_key(term_id: int, class_id: int) -> str:
+    return f"{VERSION_PREFIX}{term_id}:{class_id}"
+
+
+class MarkVersions:
+    """This worker's copy of every class's mark version per term, for tagging cached mark data"""
+
+    def __init__(self):
+        self._versions = {}
+        self._checked_at = 0.0
+
+    def refresh(self, db: Session):
+        """Re-read every class's mark version at most every VERSION_CHECK_SECONDS"""
+        if time.monotonic() - self._checked_at < VERSION_CHECK_SECONDS:
+            return
+        # Shared by every request in the worker, so no single request's budget is charged
+        with querystats.untracked():
+            self._versions = dict(db.execute(
+                select(CacheVersion.name, CacheVersion.version).where(CacheVersion.name.startswith(VERSION_PREFIX))
+            ).all())
+        self._checked_at = time.monotonic()
+
+    def get(self, db: Session, term_id: int, class_ids: Iterable[int]) -> tuple:
+        """Current versions of these classes' marks for the term"""
+        self.refresh(db)
+        return tuple(self._versions.get(version_key(term_id, class_id), 0) for class_id in class_ids)
+
+    def check_now(self):
+        """Make the next lookup in this worker re-read the versions"""
+        self._checked_at = 0.0
+
+
+versions = MarkVersions()
+
+
+def current(db: Session, term_id: int, class_ids: Iterable[int]) -> tuple:
+    """Versions to tag data computed from these classes' marks with (take them before reading the marks)"""
+    return versions.get(db, term_id, class_ids)
+
+
+def invalidate(db: Session, term_id: int, class_ids: Iterable[int]):
+    """Mark everything cached from these classes' marks for the term as stale (call before commit)"""
+    names = sorted({version_key(term_id, class_id) for class_id in class_ids if class_id is not None})
+    if not names:
+        return
+
+    _, insert = dialect_insert(db)
+    stmt = insert(CacheVersion).values([{"name": name, "version": 1} for name in names])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[CacheVersion.name],
+        set_={"version": CacheVersion.version + 1}
+    ))
+
+    # This worker re-reads the versions as soon as the change is committed
+    db.info["marks_stale"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _check_versions_after_commit(session: Session):
+    """Re-read versions once marks written in this worker have committed"""
+    if session.info.pop("marks_stale", False):
+        versions.check_now()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_invalidation_after_rollback(session: Session):
+    """Rolled back marks leave cached data valid"""
+    session.info.pop("marks_stale", None)
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import time
+from anyio import to_thread
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+# With several uvicorn workers, point this at an empty directory shared by all of them
+# (cleared before each start) so /metrics reports every worker, not just the one scraped
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# How often each worker copies pool, threadpool, cache and password-check state into its gauges
+METRICS_REFRESH_SECONDS = float(os.getenv("METRICS_REFRESH_SECONDS", "5"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to produce a response, by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+REQUESTS = Counter("http_requests", "Responses sent, by route template and status", ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being handled right now", multiprocess_mode="livesum")
+
+THREADPOOL_BUSY = Gauge("threadpool_busy_threads", "Worker threads running sync handlers and queries", multiprocess_mode="livesum")
+THREADPOOL_LIMIT = Gauge("threadpool_max_threads", "Size of the threadpool", multiprocess_mode="livesum")
+THREADPOOL_WAITING = Gauge("threadpool_waiting_tasks", "Calls queued for a free worker thread", multiprocess_mode="livesum")
+
+DB_POOL_SIZE = Gauge("db_pool_size", "Connections kept open by the pool", ["pool"], multiprocess_mode="livesum")
+DB_POOL_CHECKED_OUT = Gauge("db_pool_checked_out", "Connections in use", ["pool"], multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("db_pool_overflow", "Connections opened beyond the pool size", ["pool"], multiprocess_mode="livesum")
+DB_POOL_CHECKOUTS = Counter("db_pool_checkouts", "Connection checkouts", ["pool"])
+DB_POOL_TIMEOUTS = Counter("db_pool_checkout_timeouts", "Checkouts that gave up waiting", ["pool"])
+DB_POOL_MAX_WAIT = Gauge("db_pool_max_wait_seconds", "Longest wait for a connection", ["pool"], multiprocess_mode="livemax")
+
+CACHE_LOOKUPS = Counter("cache_lookups", "Cache lookups", ["cache", "result"])
+CACHE_ENTRIES = Gauge("cache_entries", "Entries held in the cache", ["cache"], multiprocess_mode="livemax")
+
+PASSWORD_IN_FLIGHT = Gauge("password_checks_in_flight", "bcrypt checks running", multiprocess_mode="livesum")
+PASSWORD_WAITING = Gauge("password_checks_waiting", "Logins queued for a bcrypt slot", multiprocess_mode="livesum")
+PASSWORD_MAX_WAITING = Gauge("password_checks_max_waiting", "Longest bcrypt queue seen", multiprocess_mode="livemax")
+
+
+def _route_name(scope) -> str:
+    # The route template keeps label cardinality bounded (/students/{student_id}, not /students/42)
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware timing every HTTP request (cheaper than BaseHTTPMiddleware)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            route = _route_name(scope)
+            REQUEST_LATENCY.labels(scope["method"], route).observe(elapsed)
+            REQUESTS.labels(scope["method"], route, str(status_code)).inc()
+
+
+# Last total copied into each counter, so a refresh only adds what happened since
+_last_totals = {}
+
+
+def _advance(counter, total: int):
+    """Bring a counter up to a running total kept elsewhere by adding the difference since the last refresh"""
+    previous = _last_totals.get(counter, 0)
+    # A total that went down was reset (a cleared cache): everything since then is new
+    counter.inc(total - previous if total >= previous else total)
+    _last_totals[counter] = total
+
+
+def _refresh_pool(name: str, engine):
+    from app.database import pool_stats
+
+    stats = pool_stats(engine)
+    if "size" in stats:
+        DB_POOL_SIZE.labels(name).set(stats["size"])
+        DB_POOL_CHECKED_OUT.labels(name).set(stats["checked_out"])
+        DB_POOL_OVERFLOW.labels(name).set(stats["overflow"])
+    if "checkouts" in stats:
+        _advance(DB_POOL_CHECKOUTS.labels(name), stats["checkouts"])
+        _advance(DB_POOL_TIMEOUTS.labels(name), stats["checkout_timeouts"])
+        DB_POOL_MAX_WAIT.labels(name).set(stats["max_wait_ms"] / 1000)
+
+
+def refresh():
+    """Copy this worker's in-memory state into the gauges and counters (must run on the event loop)"""
+    from app import analytics, database, refdata, summaries
+    from app.auth import password_check_stats, principal_cache
+
+    limiter = to_thread.current_default_thread_limiter()
+    THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+    THREADPOOL_LIMIT.set(limiter.total_tokens)
+    THREADPOOL_WAITING.set(limiter.statistics().tasks_waiting)
+
+    _refresh_pool("sync", database.engine)
+    if database.async_engine is not None:
+        _refresh_pool("async", database.async_engine.sync_engine)
+    for index, replica in enumerate(database.replicas.replicas):
+        _refresh_pool(f"replica{index}", replica.engine)
+
+    refdata_stats = refdata.cache.stats()
+    principal_stats = principal_cache.stats()
+    analytics_stats = analytics.cache_stats()
+    summary_stats = summaries.cache_stats()
+    for cache, stats in (
+        ("refdata", refdata_stats),
+        ("principals", principal_stats),
+        ("analytics", analytics_stats),
+        ("summaries", summary_stats)
+    ):
+        _advance(CACHE_LOOKUPS.labels(cache, "hit"), stats["hits"])
+        _advance(CACHE_LOOKUPS.labels(cache, "miss"), stats["misses"])
+    CACHE_ENTRIES.labels("refdata").set(refdata_stats["classes"] + refdata_stats["subjects"] + refdata_stats["terms"])
+    CACHE_ENTRIES.labels("principals").set(principal_stats["size"])
+    CACHE_ENTRIES.labels("analytics").set(analytics_stats["size"])
+    CACHE_ENTRIES.labels("summaries").set(summary_stats["size"])
+
+    password_stats = password_check_stats()
+    PASSWORD_IN_FLIGHT.set(password_stats["in_flight"])
+    PASSWORD_WAITING.set(password_stats["waiting"])
+    PASSWORD_MAX_WAITING.set(password_stats["max_waiting"])
+
+
+async def monitor_metrics():
+    """Refresh this worker's gauges in the background for as long as the app runs"""
+    while True:
+        refresh()
+        await asyncio.sleep(METRICS_REFRESH_SECONDS)
+
+
+def render() -> tuple:
+    """Prometheus text exposition for this worker, or for all workers in multiprocess mode"""
+    refresh()
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    """Drop this worker's live gauges when it shuts down"""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
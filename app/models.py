@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Date, Boolean, DECIMAL, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Date, Boolean, DECIMAL, ForeignKey, DateTime, UniqueConstraint, Index
+from sqlalchemy import func, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -15,13 +16,18 @@ class User(Base):
     
     teacher = relationship("Teacher", back_populates="user", uselist=False)
     student = relationship("Student", back_populates="user", uselist=False)
+    
+    __table_args__ = (
+        # Admin user list filtered by role, paged by id
+        Index('ix_users_role_id', 'role', 'id'),
+    )
 
 
 class Teacher(Base):
     __tablename__ = "teachers"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     phone = Column(String(20))
@@ -48,13 +54,13 @@ class Student(Base):
     __tablename__ = "students"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     admission_number = Column(String(50), unique=True, nullable=False)
     date_of_birth = Column(Date)
     gender = Column(String(10))
-    class_id = Column(Integer, ForeignKey("classes.id"))
+    class_id = Column(Integer, ForeignKey("classes.id"), index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     user = relationship("User", back_populates="student")
@@ -88,6 +94,17 @@ class Term(Base):
     
     assignments = relationship("TeacherAssignment", back_populates="term")
     results = relationship("Result", back_populates="term")
+    
+    __table_args__ = (
+        # At most one active term; also makes the active-term lookup an index probe
+        Index(
+            'uq_terms_single_active',
+            'is_active',
+            unique=True,
+            postgresql_where=text('is_active'),
+            sqlite_where=text('is_active')
+        ),
+    )
 
 
 class TeacherAssignment(Base):
@@ -106,6 +123,8 @@ class TeacherAssignment(Base):
     
     __table_args__ = (
         UniqueConstraint('teacher_id', 'subject_id', 'class_id', 'term_id'),
+        # A teacher's assignments for one term
+        Index('ix_teacher_assignments_teacher_term', 'teacher_id', 'term_id'),
     )
 
 
@@ -127,4 +146,79 @@ class Result(Base):
     
     __table_args__ = (
         UniqueConstraint('student_id', 'subject_id', 'term_id'),
-    )
\ No newline at end of file
+        # Term-wide ranking and standings rebuilds; PostgreSQL answers them from the index alone
+        Index('ix_results_term_student', 'term_id', 'student_id', postgresql_include=['subject_id', 'marks']),
+        # A teacher's uploaded results, optionally for one term
+        Index('ix_results_teacher_term', 'teacher_id', 'term_id'),
+    )
+
+
+class ClassStanding(Base):
+    """Read model of each student's totals and class position per term"""
+    __tablename__ = "class_standings"
+    
+    student_id = Column(Integer, ForeignKey("students.id", ondelete="CASCADE"), primary_key=True)
+    term_id = Column(Integer, ForeignKey("terms.id", ondelete="CASCADE"), primary_key=True)
+    class_id = Column(Integer, ForeignKey("classes.id", ondelete="CASCADE"), nullable=False)
+    total_marks = Column(DECIMAL(7, 2), nullable=False)
+    average_marks = Column(DECIMAL(5, 2), nullable=False)
+    subject_count = Column(Integer, nullable=False)
+    position = Column(Integer, nullable=False)
+    total_students = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index('ix_class_standings_class_term', 'class_id', 'term_id'),
+    )
+
+
+class GradingScheme(Base):
+    """Grade boundaries for a class level (or every level), optionally for one subject"""
+    __tablename__ = "grading_schemes"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    level = Column(Integer)
+    subject_id = Column(Integer, ForeignKey("subjects.id", ondelete="CASCADE"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    boundaries = relationship(
+        "GradeBoundary",
+        back_populates="scheme",
+        cascade="all, delete-orphan",
+        order_by="GradeBoundary.min_marks"
+    )
+    
+    __table_args__ = (
+        # One scheme per level and subject; null (every level / every subject) counts as a value
+        Index(
+            'ux_grading_schemes_scope',
+            func.coalesce(level, -1),
+            func.coalesce(subject_id, -1),
+            unique=True
+        ),
+    )
+
+
+class GradeBoundary(Base):
+    """Lowest mark that earns a grade within a scheme"""
+    __tablename__ = "grade_boundaries"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    scheme_id = Column(Integer, ForeignKey("grading_schemes.id", ondelete="CASCADE"), nullable=False)
+    min_marks = Column(DECIMAL(5, 2), nullable=False)
+    grade = Column(String(10), nullable=False)
+    
+    scheme = relationship("GradingScheme", back_populates="boundaries")
+    
+    __table_args__ = (
+        UniqueConstraint('scheme_id', 'min_marks'),
+    )
+
+
+class CacheVersion(Base):
+    """Version counters that tell every worker when a shared in-process cache is stale"""
+    __tablename__ = "cache_versions"
+    
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,97 @@
+import base64
+import binascii
+import json
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import Session
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort: str, key: list) -> str:
+    """Encode the sort name and last row's key values as an opaque cursor"""
+    raw = json.dumps({"s": sort, "k": key}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> list:
+    """Decode a cursor produced by encode_cursor for the same sort order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        key = data["k"]
+        cursor_sort = data["s"]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+    if cursor_sort != sort:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor was created for a different sort order"
+        )
+    return key
+
+
+def parse_sort(sort: str, allowed: Dict[str, object]) -> Tuple[object, bool]:
+    """Turn 'name' or '-name' into (column, descending), rejecting unknown fields"""
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot sort by '{field}'. Allowed: {', '.join(allowed)}"
+        )
+    return allowed[field], descending
+
+
+def paginate(
+    db: Session,
+    query,
+    sort: str,
+    allowed_sorts: Dict[str, object],
+    id_column,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    include_total: bool = False
+) -> Tuple[List, Optional[str], Optional[int]]:
+    """Apply keyset pagination to a select() and return (rows, next_cursor, total)"""
+    sort_column, descending = parse_sort(sort, allowed_sorts)
+
+    # Ties on the sort column are broken by id so the order is always stable
+    key_columns = [id_column] if sort_column is id_column else [sort_column, id_column]
+
+    total = None
+    if include_total:
+        total = db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+
+    if cursor:
+        key = decode_cursor(cursor, sort)
+        if len(key) != len(key_columns):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid pagination cursor"
+            )
+        if len(key_columns) == 1:
+            left, right = key_columns[0], key[0]
+        else:
+            left, right = tuple_(*key_columns), tuple_(*key)
+        query = query.where(left < right if descending else left > right)
+
+    # Select the key columns too so the next cursor can be built from the last row
+    key_labels = [f"_page_key_{index}" for index in range(len(key_columns))]
+    query = query.add_columns(*[column.label(label) for column, label in zip(key_columns, key_labels)])
+    order_by = [column.desc() if descending else column.asc() for column in key_columns]
+    rows = db.execute(query.order_by(*order_by).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, [last._mapping[label] for label in key_labels])
+
+    return rows, next_cursor, total
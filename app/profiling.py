@@ -0,0 +1,301 @@
+import asyncio
+import contextvars
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from fnmatch import fnmatchcase
+from typing import Dict, Optional
+from anyio import to_thread
+
+# Longest a profiling session may run before it switches itself off
+MAX_PROFILE_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "600"))
+
+# Distinct stacks kept per session; further new stacks are counted under one bucket
+MAX_STACKS = int(os.getenv("PROFILE_MAX_STACKS", "20000"))
+
+# Deepest stack recorded; anything below is cut off
+MAX_DEPTH = 128
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ID of the profiled request the current context belongs to; copied into worker threads
+# and child tasks along with the rest of the context
+_request_id: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar("profiled_request", default=None)
+
+# anyio's own run_sync, which Starlette and FastAPI use for every threadpool call
+_run_sync = to_thread.run_sync
+
+
+def _frame_label(frame) -> str:
+    filename = frame.f_code.co_filename
+    if "site-packages" + os.sep in filename:
+        filename = filename.split("site-packages" + os.sep, 1)[1]
+    elif filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{frame.f_code.co_qualname}"
+
+
+def _collapse(frames) -> str:
+    """Outermost-first frame labels joined with ';' (the collapsed-stack format flame graph tools read)"""
+    return ";".join(_frame_label(frame) for frame in frames)
+
+
+def _thread_frames(frame):
+    frames = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _awaiting_frames(task):
+    """Frames of a suspended task, following the await chain down to the innermost coroutine"""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None and len(frames) < MAX_DEPTH:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return frames
+
+
+def _request_label(scope) -> str:
+    # Route templates once routing has happened, so /students/1 and /students/2 aggregate together
+    route = scope.get("route")
+    return f"{scope['method']} {getattr(route, 'path', None) or scope['path']}"
+
+
+def _for_request(func, request_id: int):
+    """Wrap a threadpool job so the thread it runs on is charged to the request that submitted it"""
+    def run(*args, **kwargs):
+        thread_id = threading.get_ident()
+        profiler.worker_threads[thread_id] = request_id
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.worker_threads.pop(thread_id, None)
+    return run
+
+
+async def _profiled_run_sync(func, *args, **kwargs):
+    """to_thread.run_sync that hands the submitting request's profiling ID to the worker thread"""
+    request_id = _request_id.get()
+    if request_id is not None:
+        func = _for_request(func, request_id)
+    return await _run_sync(func, *args, **kwargs)
+
+
+def _install_threadpool_hook():
+    # The sampler cannot read another thread's context, so jobs announce their thread themselves
+    to_thread.run_sync = _profiled_run_sync
+
+
+def _loop_request_id(loop, frames) -> Optional[int]:
+    """The profiled request the event loop thread is running a task for"""
+    task = asyncio.current_task(loop)
+    if task is None:
+        return None
+    get_context = getattr(task, "get_context", None)
+    if get_context is not None:
+        return get_context().get(_request_id)
+    # Tasks only expose their context from Python 3.12; before that, find the middleware's frame
+    for frame in frames:
+        if frame.f_code is ProfilingMiddleware.__call__.__code__:
+            return frame.f_locals.get("request_id")
+    return None
+
+
+class Profiler:
+    """Stack-sampling profiler for requests whose path matches a pattern"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # The middleware reads only this while profiling is off
+        self.active = False
+        self.pattern = None
+        self.sample_rate = 1.0
+        self.interval = 0.005
+        self.started_at = None
+        self.stops_at = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.requests: Dict[int, tuple] = {}
+        # Threadpool threads currently running a job for a profiled request, by thread ID
+        self.worker_threads: Dict[int, int] = {}
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.sample_errors = 0
+        self.last_sample_error: Optional[str] = None
+        self.profiled_requests = 0
+        self.skipped_requests = 0
+        self._thread: Optional[threading.Thread] = None
+        # Set to wake the sampler out of its wait between samples when the session stops
+        self._stopped = threading.Event()
+
+    def start(self, pattern: str, sample_rate: float, interval_ms: float, seconds: float):
+        """Begin a new session, discarding the previous session's samples"""
+        self.stop()
+        _install_threadpool_hook()
+        with self._lock:
+            self.pattern = pattern
+            self.sample_rate = sample_rate
+            self.interval = interval_ms / 1000
+            self.loop = asyncio.get_running_loop()
+            self.loop_thread_id = threading.get_ident()
+            self.stacks = Counter()
+            self.samples = 0
+            self.sample_errors = 0
+            self.last_sample_error = None
+            self.profiled_requests = 0
+            self.skipped_requests = 0
+            self.requests = {}
+            self.started_at = time.time()
+            self.stops_at = time.monotonic() + min(seconds, MAX_PROFILE_SECONDS)
+            self.active = True
+            self._stopped = threading.Event()
+            self._thread = threading.Thread(
+                target=self._sample_loop, args=(self._stopped,), name="profiler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop sampling; collected stacks stay available for download"""
+        # The sampler wakes at once rather than finishing its sleep, so the join is at most one sample long
+        self.active = False
+        self._stopped.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+
+    def matches(self, path: str) -> bool:
+        if not fnmatchcase(path, self.pattern):
+            return False
+        if random.random() >= self.sample_rate:
+            self.skipped_requests += 1
+            return False
+        return True
+
+    def begin_request(self, scope) -> int:
+        request_id = next(self._ids)
+        self.requests[request_id] = (scope, asyncio.current_task())
+        self.profiled_requests += 1
+        return request_id
+
+    def end_request(self, request_id: int):
+        self.requests.pop(request_id, None)
+
+    def _record(self, label: str, stack: str):
+        key = f"{label};{stack}" if stack else label
+        if key not in self.stacks and len(self.stacks) >= MAX_STACKS:
+            key = f"{label};[stack limit reached]"
+        self.stacks[key] += 1
+
+    def _sample_once(self):
+        requests = dict(self.requests)
+        if not requests:
+            return
+        worker_threads = dict(self.worker_threads)
+        seen = set()
+        loop_thread_id = self.loop_thread_id
+        me = threading.get_ident()
+
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == me:
+                continue
+            frames = _thread_frames(frame)
+            if thread_id == loop_thread_id:
+                # Only charge the loop thread to a request while that request's task is the one running
+                request_id = _loop_request_id(self.loop, frames)
+            else:
+                request_id = worker_threads.get(thread_id)
+            if request_id not in requests:
+                continue
+            seen.add(request_id)
+            self._record(_request_label(requests[request_id][0]), _collapse(frames))
+
+        # Requests not running anywhere are suspended on an await (async I/O, a lock,
+        # a busy threadpool); record where they wait so wall time adds up
+        for request_id, (scope, task) in requests.items():
+            if request_id in seen or task is None or task.done():
+                continue
+            self._record(_request_label(scope), _collapse(_awaiting_frames(task)) + ";[await]")
+        self.samples += 1
+
+    def _sample_loop(self, stopped: threading.Event):
+        while not stopped.is_set():
+            if time.monotonic() >= self.stops_at:
+                self.active = False
+                break
+            try:
+                self._sample_once()
+            except Exception as exc:
+                # A request finishing mid-sample can invalidate a frame; skip that sample, but keep
+                # count so a sampler that fails every time shows up in the status
+                self.sample_errors += 1
+                self.last_sample_error = f"{type(exc).__name__}: {exc}"
+                if self.sample_errors == 1:
+                    logger.warning("Profiler sample failed; further failures are only counted", exc_info=True)
+            stopped.wait(self.interval)
+
+    def status(self) -> dict:
+        return {
+            "active": self.active,
+            "pid": os.getpid(),
+            "pattern": self.pattern,
+            "sample_rate": self.sample_rate,
+            "interval_ms": round(self.interval * 1000, 3),
+            "started_at": self.started_at,
+            "seconds_left": round(max(self.stops_at - time.monotonic(), 0), 1) if self.active else 0,
+            "profiled_requests": self.profiled_requests,
+            "skipped_requests": self.skipped_requests,
+            "in_flight": len(self.requests),
+            "samples": self.samples,
+            "sample_errors": self.sample_errors,
+            "last_sample_error": self.last_sample_error,
+            "distinct_stacks": len(self.stacks)
+        }
+
+    def collapsed(self) -> str:
+        """One 'frame;frame;frame count' line per distinct stack, for flamegraph.pl or speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def clear(self):
+        self.stacks = Counter()
+        self.samples = 0
+
+
+profiler = Profiler()
+
+
+class ProfilingMiddleware:
+    """Marks requests matching the profiler's pattern; a single attribute check while profiling is off"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not profiler.active or scope["type"] != "http" or not profiler.matches(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = profiler.begin_request(scope)
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_id.reset(token)
+            profiler.end_request(request_id)
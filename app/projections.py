@@ -0,0 +1,51 @@
+from sqlalchemy import select
+from app.models import Result, Student, Subject, Term
+from app.schemas import ResultResponse
+
+
+def result_projection_query():
+    """Select results joined with student, subject and term names in one statement"""
+    return (
+        select(
+            Result.id,
+            Result.student_id,
+            Result.subject_id,
+            Result.term_id,
+            Result.marks,
+            Result.teacher_id,
+            Result.uploaded_at,
+            Student.first_name,
+            Student.last_name,
+            Subject.name.label("subject_name"),
+            Term.name.label("term_name"),
+        )
+        .outerjoin(Student, Student.id == Result.student_id)
+        .outerjoin(Subject, Subject.id == Result.subject_id)
+        .outerjoin(Term, Term.id == Result.term_id)
+    )
+
+
+def result_row_dict(row) -> dict:
+    """Map a row from result_projection_query straight to ResultResponse's JSON shape"""
+    if row.first_name is not None:
+        student_name = f"{row.first_name} {row.last_name}"
+    else:
+        student_name = "Unknown"
+
+    return {
+        "student_id": row.student_id,
+        "subject_id": row.subject_id,
+        "term_id": row.term_id,
+        "marks": float(row.marks),
+        "id": row.id,
+        "teacher_id": row.teacher_id,
+        "student_name": student_name,
+        "subject_name": row.subject_name or "Unknown",
+        "term_name": row.term_name or "Unknown",
+        "uploaded_at": row.uploaded_at
+    }
+
+
+def to_result_response(row) -> ResultResponse:
+    """Map a row from result_projection_query to a ResultResponse"""
+    return ResultResponse(**result_row_dict(row))
@@ -0,0 +1,191 @@
+import contextvars
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Count statements per request, add X-DB-* response headers and log one line per request
+SQL_STATS = os.getenv("SQL_STATS", "false").lower() in ("1", "true", "yes")
+
+# Turn a request that exceeds its query budget or repeats a statement shape into a 500
+# (for test and CI runs, so query regressions fail loudly)
+SQL_STATS_STRICT = os.getenv("SQL_STATS_STRICT", "false").lower() in ("1", "true", "yes")
+
+# The same statement shape this many times in one request is reported as a suspected N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+# Bound parameters in every placeholder style SQLAlchemy's drivers use
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|\$\d+|:\w+)"
+_PLACEHOLDER_LIST = re.compile(r"\(\s*" + _PLACEHOLDER + r"(?:\s*,\s*" + _PLACEHOLDER + r")*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so the same query with different IN-list lengths compares equal"""
+    return _PLACEHOLDER_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Statements and database time for one tracked block, usually one request"""
+
+    def __init__(self, budget: Optional[int] = None, parent: Optional["QueryStats"] = None):
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes: Counter = Counter()
+        self.budget = budget
+        self.parent = parent
+
+    def record(self, statement: str, seconds: float):
+        shape = statement_shape(statement)
+        stats = self
+        # Nested trackers (a test around a request, say) all see the statement
+        while stats is not None:
+            stats.statements += 1
+            stats.seconds += seconds
+            stats.shapes[shape] += 1
+            stats = stats.parent
+
+    def suspected_n_plus_one(self) -> List[Tuple[str, int]]:
+        """Statement shapes repeated at least N_PLUS_ONE_THRESHOLD times, most repeated first"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= N_PLUS_ONE_THRESHOLD]
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.statements > self.budget
+
+    def problems(self) -> List[str]:
+        """Human-readable list of budget overruns and suspected N+1 shapes"""
+        found = []
+        if self.over_budget:
+            found.append(f"{self.statements} statements exceed the budget of {self.budget}")
+        for shape, count in self.suspected_n_plus_one():
+            found.append(f"suspected N+1: {count}x {shape[:200]}")
+        return found
+
+
+_current: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+
+def current() -> Optional[QueryStats]:
+    """Stats for the block being tracked in this context, if any"""
+    return _current.get()
+
+
+@contextmanager
+def track(budget: Optional[int] = None):
+    """Count the statements run inside the block, including ones run in the thread pool"""
+    stats = QueryStats(budget, parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def untracked():
+    """Leave the block's statements out of the current request (shared cache refills)"""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def assert_max_queries(budget: int):
+    """Fail a test when the block runs more than budget statements or repeats a statement shape"""
+    with track(budget) as stats:
+        yield stats
+    problems = stats.problems()
+    if problems:
+        raise QueryBudgetExceeded("; ".join(problems))
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        started = getattr(context, "_query_started", None)
+        stats.record(statement, time.perf_counter() - started if started else 0.0)
+
+
+def instrument(engine):
+    """Attach the counters to a sync engine (pass async_engine.sync_engine for async ones)"""
+    if not event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_all():
+    """Attach the counters to the primary, async and replica engines"""
+    from app import database
+
+    instrument(database.engine)
+    if database.async_engine is not None:
+        instrument(database.async_engine.sync_engine)
+    for replica in database.replicas.replicas:
+        instrument(replica.engine)
+        if replica.async_engine is not None:
+            instrument(replica.async_engine.sync_engine)
+
+
+def query_budget(max_statements: int):
+    """Route dependency declaring how many statements the endpoint may run per request"""
+    async def set_budget():
+        stats = _current.get()
+        if stats is not None:
+            stats.budget = max_statements
+    return set_budget
+
+
+async def middleware(request: Request, call_next):
+    """Track every request's statements; report them in headers and logs, and fail in strict mode"""
+    with track() as stats:
+        response = await call_next(request)
+
+    problems = stats.problems()
+    logger.log(
+        logging.WARNING if problems else logging.INFO,
+        json.dumps({
+            "event": "sql_stats",
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "statements": stats.statements,
+            "db_ms": round(stats.seconds * 1000, 2),
+            "budget": stats.budget,
+            "problems": problems
+        })
+    )
+
+    if problems and SQL_STATS_STRICT:
+        response = JSONResponse(
+            status_code=500,
+            content={"detail": "Query check failed", "problems": problems}
+        )
+
+    response.headers["X-DB-Statements"] = str(stats.statements)
+    response.headers["X-DB-Time-Ms"] = f"{stats.seconds * 1000:.2f}"
+    if stats.budget is not None:
+        response.headers["X-DB-Budget"] = str(stats.budget)
+    if stats.suspected_n_plus_one():
+        response.headers["X-DB-N-Plus-One"] = str(len(stats.suspected_n_plus_one()))
+    return response
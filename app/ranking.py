@@ -0,0 +1,115 @@
+import os
+from typing import List, Optional
+from sqlalchemy import and_, func, select, union
+from sqlalchemy.orm import Session, aliased
+from app.models import ClassStanding, Result, Student
+
+# Tie policies and the window function each one maps to:
+#   "rank"  -> 1, 1, 3  (standard competition ranking)
+#   "dense" -> 1, 1, 2
+#   "row"   -> 1, 2, 3  (ties broken by student ID)
+TIE_POLICIES = {
+    "rank": func.rank,
+    "dense": func.dense_rank,
+    "row": func.row_number,
+}
+
+# Default tie policy, overridable per deployment
+DEFAULT_TIE_POLICY = os.getenv("RANKING_TIE_POLICY", "rank")
+
+# A student is ranked in the class their standing for the term already records, so moving class
+# leaves earlier terms where they were; terms not ranked yet fall back to the current class
+recorded = aliased(ClassStanding, name="recorded")
+member_class = func.coalesce(recorded.class_id, Student.class_id)
+
+
+def resolve_tie_policy(tie_policy: Optional[str] = None) -> str:
+    """Return a valid tie policy name, falling back to the configured default"""
+    policy = tie_policy or DEFAULT_TIE_POLICY
+    if policy not in TIE_POLICIES:
+        raise ValueError(
+            f"Unknown tie policy '{policy}'. Expected one of: {', '.join(TIE_POLICIES)}"
+        )
+    return policy
+
+
+def term_ranking_query(term_id: int, tie_policy: Optional[str] = None):
+    """Build one aggregate query that totals and ranks every student of a term within their class"""
+    policy = resolve_tie_policy(tie_policy)
+    total = func.sum(Result.marks)
+
+    # Only the "row" policy breaks ties, so only it orders by student ID as well
+    order_by = [total.desc()]
+    if policy == "row":
+        order_by.append(Result.student_id)
+
+    return (
+        select(
+            Result.student_id.label("student_id"),
+            member_class.label("class_id"),
+            Result.term_id.label("term_id"),
+            total.label("total_marks"),
+            func.avg(Result.marks).label("average_marks"),
+            func.count(Result.id).label("subject_count"),
+            TIE_POLICIES[policy]().over(partition_by=member_class, order_by=order_by).label("position"),
+            func.count().over(partition_by=member_class).label("total_students"),
+        )
+        .join(Student, Student.id == Result.student_id)
+        .outerjoin(recorded, and_(recorded.student_id == Result.student_id, recorded.term_id == Result.term_id))
+        .where(Result.term_id == term_id, member_class.isnot(None))
+        .group_by(Result.student_id, member_class, Result.term_id)
+    )
+
+
+def class_candidates(class_id: int, term_id: int):
+    """Students recorded in or currently in a class, to narrow a member_class filter through an index"""
+    return union(
+        select(ClassStanding.student_id)
+        .where(ClassStanding.class_id == class_id, ClassStanding.term_id == term_id)
+        .correlate(None),
+        select(Student.id).where(Student.class_id == class_id).correlate(None)
+    )
+
+
+def class_ranking_query(class_id: int, term_id: int, tie_policy: Optional[str] = None):
+    """Build one aggregate query that totals and ranks every student in a class for a term"""
+    return term_ranking_query(term_id, tie_policy).where(
+        Result.student_id.in_(class_candidates(class_id, term_id)),
+        member_class == class_id
+    )
+
+
+def student_ranking_query(student_id: int, class_id: int, term_id: int, tie_policy: Optional[str] = None):
+    """Rank the whole class but return only the given student's row"""
+    ranked = class_ranking_query(class_id, term_id, tie_policy).subquery()
+    return select(ranked).where(ranked.c.student_id == student_id)
+
+
+def ranking_row_to_dict(row) -> dict:
+    """Convert a ranking row into plain Python values"""
+    return {
+        "student_id": row.student_id,
+        "total_marks": float(row.total_marks),
+        "average_marks": round(float(row.average_marks), 2),
+        "subject_count": row.subject_count,
+        "position": row.position,
+        "total_students": row.total_students,
+    }
+
+
+def get_class_rankings(db: Session, class_id: int, term_id: int, tie_policy: Optional[str] = None) -> List[dict]:
+    """Get totals, averages and positions for every ranked student in a class"""
+    query = class_ranking_query(class_id, term_id, tie_policy).order_by("position", "student_id")
+    return [ranking_row_to_dict(row) for row in db.execute(query)]
+
+
+def get_student_ranking(
+    db: Session,
+    student_id: int,
+    class_id: int,
+    term_id: int,
+    tie_policy: Optional[str] = None
+) -> Optional[dict]:
+    """Get a single student's ranking row, or None if they have no results for the term"""
+    row = db.execute(student_ranking_query(student_id, class_id, term_id, tie_policy)).first()
+    return ranking_row_to_dict(row) if row else None
@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, selectinload
+from app import grading, querystats
+from app.bulk_results import dialect_insert
+from app.models import CacheVersion, Class, GradingScheme, Subject, Term
+from app.schemas import ClassResponse, SubjectResponse, TermResponse
+
+# Name of this cache's row in cache_versions
+VERSION_KEY = "refdata"
+
+# How often each worker checks whether another worker changed the data
+VERSION_CHECK_SECONDS = float(os.getenv("REFDATA_VERSION_CHECK_SECONDS", "5"))
+
+
+class ReferenceDataCache:
+    """In-memory copy of the classes, subjects, terms and grading scheme tables"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._version = None
+        self._checked_at = 0.0
+        self.classes: Dict[int, ClassResponse] = {}
+        self.subjects: Dict[int, SubjectResponse] = {}
+        self.terms: Dict[int, TermResponse] = {}
+        self.active_term: Optional[TermResponse] = None
+        self.grading_schemes: Dict[Tuple[Optional[int], Optional[int]], grading.CompiledScheme] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _reload(self, db: Session, version: int):
+        """Load every table and swap them in"""
+        self.classes = {row.id: ClassResponse.model_validate(row) for row in db.scalars(select(Class))}
+        self.subjects = {row.id: SubjectResponse.model_validate(row) for row in db.scalars(select(Subject))}
+        self.terms = {row.id: TermResponse.model_validate(row) for row in db.scalars(select(Term))}
+        self.active_term = next((term for term in self.terms.values() if term.is_active), None)
+        self.grading_schemes = grading.compile_schemes(
+            db.scalars(select(GradingScheme).options(selectinload(GradingScheme.boundaries)))
+        )
+        self._version = version
+        self._loaded = True
+        self.reloads += 1
+
+    def ensure_fresh(self, db: Session, check_now: bool = False):
+        """Reload if never loaded, invalidated locally, or bumped by another worker"""
+        if self._loaded and not check_now and time.monotonic() - self._checked_at < VERSION_CHECK_SECONDS:
+            return
+
+        # Never wait on the lock: in async mode the holder may be suspended on the same
+        # event loop. If another request is already refreshing, keep serving this copy.
+        acquired = self._lock.acquire(blocking=False)
+        if not acquired and self._loaded and not check_now:
+            return
+        try:
+            if self._loaded and not check_now and time.monotonic() - self._checked_at < VERSION_CHECK_SECONDS:
+                return
+            # The refill serves every request in the worker, so no single request's
+            # query budget is charged for it
+            with querystats.untracked():
+                version = db.scalar(select(CacheVersion.version).where(CacheVersion.name == VERSION_KEY)) or 0
+                if not self._loaded or version != self._version:
+                    self._reload(db, version)
+            self._checked_at = time.monotonic()
+        finally:
+            if acquired:
+                self._lock.release()
+
+    def lookup(self, db: Session, table: str, item_id: Optional[int]):
+        """Get one row by ID from memory, rechecking the version once on a miss"""
+        if item_id is None:
+            return None
+
+        self.ensure_fresh(db)
+        item = getattr(self, table).get(item_id)
+        if item is not None:
+            self.hits += 1
+            return item
+
+        # The row may have been created by another worker since the last check
+        self.misses += 1
+        self.ensure_fresh(db, check_now=True)
+        return getattr(self, table).get(item_id)
+
+    @property
+    def version(self) -> Optional[int]:
+        """Version of the loaded copy; anything derived from it is stale once this changes"""
+        return self._version
+
+    def invalidate_local(self):
+        """Force the next lookup in this worker to reload"""
+        self._loaded = False
+
+    def stats(self) -> dict:
+        """Counters and sizes for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "reloads": self.reloads,
+            "version": self._version,
+            "classes": len(self.classes),
+            "subjects": len(self.subjects),
+            "terms": len(self.terms),
+            "grading_schemes": len(self.grading_schemes),
+            "active_term_id": self.active_term.id if self.active_term else None
+        }
+
+
+cache = ReferenceDataCache()
+
+
+def get_class(db: Session, class_id: Optional[int]) -> Optional[ClassResponse]:
+    """Get a class by ID from the cache"""
+    return cache.lookup(db, "classes", class_id)
+
+
+def get_subject(db: Session, subject_id: Optional[int]) -> Optional[SubjectResponse]:
+    """Get a subject by ID from the cache"""
+    return cache.lookup(db, "subjects", subject_id)
+
+
+def get_term(db: Session, term_id: Optional[int]) -> Optional[TermResponse]:
+    """Get a term by ID from the cache"""
+    return cache.lookup(db, "terms", term_id)
+
+
+def get_active_term(db: Session) -> Optional[TermResponse]:
+    """Get the currently active term from the cache"""
+    cache.ensure_fresh(db)
+    if cache.active_term is not None:
+        cache.hits += 1
+        return cache.active_term
+
+    # Another worker may have just activated a term
+    cache.misses += 1
+    cache.ensure_fresh(db, check_now=True)
+    return cache.active_term
+
+
+def get_grading_scheme(db: Session, level: Optional[int], subject_id: Optional[int]) -> grading.CompiledScheme:
+    """Get the compiled scheme that grades a subject at a class level"""
+    cache.ensure_fresh(db)
+    return grading.resolve_scheme(cache.grading_schemes, level, subject_id)
+
+
+def list_classes(db: Session) -> List[ClassResponse]:
+    """All classes ordered by level"""
+    cache.ensure_fresh(db)
+    return sorted(cache.classes.values(), key=lambda item: (item.level, item.id))
+
+
+def list_subjects(db: Session) -> List[SubjectResponse]:
+    """All subjects ordered by name"""
+    cache.ensure_fresh(db)
+    return sorted(cache.subjects.values(), key=lambda item: (item.name, item.id))
+
+
+def list_terms(db: Session) -> List[TermResponse]:
+    """All terms, newest first"""
+    cache.ensure_fresh(db)
+    return sorted(cache.terms.values(), key=lambda item: (-item.year, -item.term_number, item.id))
+
+
+def invalidate(db: Session):
+    """Mark reference data as changed in the caller's transaction (call before commit)"""
+    # One upsert, so two first-time writers cannot both insert the row
+    _, insert = dialect_insert(db)
+    db.execute(insert(CacheVersion).values(name=VERSION_KEY, version=1).on_conflict_do_update(
+        index_elements=[CacheVersion.name],
+        set_={"version": CacheVersion.version + 1}
+    ))
+
+    # This worker drops its copy as soon as the change is committed
+    db.info["refdata_stale"] = True
+
+
+def cache_stats() -> dict:
+    """Hit/miss counters for this worker"""
+    return cache.stats()
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_cache_after_commit(session: Session):
+    """Drop this worker's copy once an invalidating transaction has committed"""
+    if session.info.pop("refdata_stale", False):
+        cache.invalidate_local()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_invalidation_after_rollback(session: Session):
+    """A rolled back change leaves the cached data valid"""
+    session.info.pop("refdata_stale", None)
@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
-from app.database import get_db
-from app.models import User, Class, Subject, Term, Teacher, Student, TeacherAssignment
-from app.auth import get_current_user, get_password_hash
-from app.schemas import UserResponse, ClassCreate, ClassUpdate, ClassResponse, SubjectCreate ,SubjectUpdate,SubjectResponse, TermCreate, TermUpdate, TermResponse, TeacherCreate, TeacherUpdate, TeacherResponse, StudentCreate, StudentUpdate, StudentResponse, TeacherAssignmentCreate, TeacherAssignmentResponse
+from app.database import fetch_all, get_db, get_read_db, get_read_session, run_in_session
+from app.models import User, Class, Subject, Term, Teacher, Student, TeacherAssignment, Result, GradingScheme, GradeBoundary, ClassStanding
+from app.auth import Principal, get_current_user, get_password_hash, invalidate_principal, password_check_stats, principal_cache
+from app import analytics, grading, refdata, summaries
+from app.gradebook import build_gradebook, check_layout, class_assignments, resolve_class_and_term
+from app.querystats import query_budget
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from app.profiling import profiler
+from app.responses import FastJSONResponse
+from app.onboarding import onboard_students, onboard_teachers
+from app.standings import refresh_class_standings, refresh_moved_student
+from app.schemas import Page, UserResponse, ClassCreate, ClassUpdate, ClassResponse, SubjectCreate ,SubjectUpdate,SubjectResponse, TermCreate, TermUpdate, TermResponse, TeacherCreate, TeacherUpdate, TeacherResponse, StudentCreate, StudentUpdate, StudentResponse, TeacherAssignmentCreate, TeacherAssignmentResponse, ProfileStart, GradingSchemeCreate, GradingSchemeUpdate, GradingSchemeResponse
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -13,7 +24,7 @@ router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
 def require_role(required_role: str):
     """Dependency to check if user has required role."""
-    def role_checker(current_user: User = Depends(get_current_user)):
+    async def role_checker(current_user: Principal = Depends(get_current_user)):
         if current_user.role != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -23,7 +34,7 @@ def require_role(required_role: str):
     return role_checker
 
 
-def require_admin(current_user: User = Depends(get_current_user)):
+async def require_admin(current_user: Principal = Depends(get_current_user)):
     """Dependency to check if user is admin."""
     if current_user.role != "admin":
         raise HTTPException(
@@ -35,20 +46,132 @@ def require_admin(current_user: User = Depends(get_current_user)):
 
 # ============= DASHBOARD =============
 @router.get("/dashboard")
-def admin_dashboard(current_user: User = Depends(require_role("admin"))):
+def admin_dashboard(current_user: Principal = Depends(require_role("admin"))):
     return {
         "message": f"Welcome to admin dashboard, {current_user.email}!",
         "role": current_user.role
     }
 
 
-@router.get("/users", response_model=List[UserResponse])
-def get_all_users(
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+@router.get("/cache/stats")
+def get_cache_stats(current_user: Principal = Depends(require_role("admin"))):
+    """Hit/miss counters for this worker's in-process caches"""
+    return {
+        "refdata": refdata.cache_stats(),
+        "principals": principal_cache.stats(),
+        "analytics": analytics.cache_stats(),
+        "summaries": summaries.cache_stats()
+    }
+
+
+@router.get("/auth/stats")
+def get_auth_stats(current_user: Principal = Depends(require_role("admin"))):
+    """Queue depth and timing of password checks in this worker"""
+    return {
+        "password_checks": password_check_stats()
+    }
+
+
+@router.get("/users", response_model=Page[UserResponse], dependencies=[Depends(query_budget(2))])
+async def get_all_users(
+    role: Optional[str] = None,
+    email: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
+):
+    """Get users one page at a time, optionally filtered by role or email prefix"""
+    query = select(User)
+    
+    if role:
+        query = query.where(User.role == role)
+    if email:
+        query = query.where(User.email.istartswith(email, autoescape=True))
+    
+    rows, next_cursor, total = await run_in_session(
+        db, paginate, query, sort, {"id": User.id, "email": User.email}, User.id,
+        cursor=cursor, limit=limit, include_total=include_total
+    )
+    
+    # Rows go straight to JSON; the response model only documents the shape
+    items = [
+        {"email": user.email, "role": user.role, "id": user.id, "created_at": user.created_at}
+        for user in (row.User for row in rows)
+    ]
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor, "total": total})
+
+
+# ============= ANALYTICS =============
+
+@router.get("/analytics", dependencies=[Depends(query_budget(1))])
+async def get_analytics(
+    term_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    level: Optional[int] = None,
+    subject_id: Optional[int] = None,
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
 ):
-    users = db.query(User).all()
-    return users
+    """Mark statistics for the whole school, a level or a class in a term, optionally for one subject"""
+    return await run_in_session(db, build_admin_analytics, term_id, class_id, level, subject_id)
+
+
+def build_admin_analytics(
+    db: Session,
+    term_id: Optional[int],
+    class_id: Optional[int],
+    level: Optional[int],
+    subject_id: Optional[int]
+) -> dict:
+    """Resolve the filters and get the slice's statistics"""
+    term, class_ids, description = analytics.resolve_scope(db, term_id, class_id, level, subject_id)
+    return analytics.build_analytics(db, term.id, class_ids, subject_id, description)
+
+
+# ============= PROFILING =============
+# Sessions run in the worker that receives the start call; with several workers,
+# download from the same worker (the status response includes its pid)
+
+@router.post("/profiling/start")
+async def start_profiling(
+    settings: ProfileStart,
+    current_user: Principal = Depends(require_role("admin"))
+):
+    """Start sampling the stacks of requests whose path matches the pattern"""
+    profiler.start(settings.pattern, settings.sample_rate, settings.interval_ms, settings.seconds)
+    return profiler.status()
+
+
+@router.post("/profiling/stop")
+async def stop_profiling(current_user: Principal = Depends(require_role("admin"))):
+    """Stop sampling and keep the collected stacks for download"""
+    profiler.stop()
+    return profiler.status()
+
+
+@router.get("/profiling")
+async def get_profiling_status(current_user: Principal = Depends(require_role("admin"))):
+    """Current session settings and sample counts"""
+    return profiler.status()
+
+
+@router.get("/profiling/collapsed", response_class=PlainTextResponse)
+async def download_profile(current_user: Principal = Depends(require_role("admin"))):
+    """Collapsed stacks for flamegraph.pl, speedscope or inferno"""
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"Content-Disposition": 'attachment; filename="profile.collapsed"'}
+    )
+
+
+@router.delete("/profiling")
+async def clear_profile(current_user: Principal = Depends(require_role("admin"))):
+    """Discard the collected stacks"""
+    profiler.clear()
+    return profiler.status()
 
 
 # ============= CLASSES MANAGEMENT =============
@@ -56,7 +179,7 @@ def get_all_users(
 @router.post("/classes", response_model=ClassResponse, status_code=status.HTTP_201_CREATED)
 def create_class(
     class_data: ClassCreate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Create a new class"""
@@ -73,6 +196,7 @@ def create_class(
         level=class_data.level
     )
     db.add(new_class)
+    refdata.invalidate(db)
     db.commit()
     db.refresh(new_class)
     
@@ -80,23 +204,22 @@ def create_class(
 
 
 @router.get("/classes", response_model=List[ClassResponse])
-def get_all_classes(
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+async def get_all_classes(
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
 ):
     """Get all classes"""
-    classes = db.query(Class).order_by(Class.level).all()
-    return classes
+    return await run_in_session(db, refdata.list_classes)
 
 
 @router.get("/classes/{class_id}", response_model=ClassResponse)
 def get_class(
     class_id: int,
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific class by ID"""
-    class_obj = db.query(Class).filter(Class.id == class_id).first()
+    class_obj = refdata.get_class(db, class_id)
     if not class_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -105,11 +228,32 @@ def get_class(
     return class_obj
 
 
+@router.get("/classes/{class_id}/gradebook", dependencies=[Depends(query_budget(2))])
+async def get_class_gradebook(
+    class_id: int,
+    term_id: Optional[int] = None,
+    layout: str = "columnar",
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
+):
+    """Get every student's marks in a class as a students x subjects matrix with totals and positions"""
+    check_layout(layout)
+    content = await run_in_session(db, build_class_gradebook, class_id, term_id, layout)
+    return FastJSONResponse(content)
+
+
+def build_class_gradebook(db: Session, class_id: int, term_id: Optional[int], layout: str) -> dict:
+    """Build a class's gradebook with a column for every subject taught to it in the term"""
+    class_obj, term = resolve_class_and_term(db, class_id, term_id)
+    subject_ids = [assignment.subject_id for assignment in class_assignments(db, class_id, term.id)]
+    return build_gradebook(db, class_obj, term, subject_ids).encode(layout)
+
+
 @router.put("/classes/{class_id}", response_model=ClassResponse)
 def update_class(
     class_id: int,
     class_data: ClassUpdate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Update a class"""
@@ -126,6 +270,7 @@ def update_class(
     if class_data.level is not None:
         class_obj.level = class_data.level
     
+    refdata.invalidate(db)
     db.commit()
     db.refresh(class_obj)
     
@@ -135,7 +280,7 @@ def update_class(
 @router.delete("/classes/{class_id}")
 def delete_class(
     class_id: int,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Delete a class"""
@@ -147,6 +292,7 @@ def delete_class(
         )
     
     db.delete(class_obj)
+    refdata.invalidate(db)
     db.commit()
     
     return {"message": f"Class '{class_obj.name}' deleted successfully"}
@@ -156,7 +302,7 @@ def delete_class(
 @router.post("/subjects", response_model=SubjectResponse, status_code=status.HTTP_201_CREATED)
 def create_subject(
     subject_data: SubjectCreate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Create a new subject"""
@@ -182,6 +328,7 @@ def create_subject(
         code=subject_data.code
     )
     db.add(new_subject)
+    refdata.invalidate(db)
     db.commit()
     db.refresh(new_subject)
     
@@ -189,23 +336,22 @@ def create_subject(
 
 
 @router.get("/subjects", response_model=List[SubjectResponse])
-def get_all_subjects(
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+async def get_all_subjects(
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
 ):
     """Get all subjects"""
-    subjects = db.query(Subject).order_by(Subject.name).all()
-    return subjects
+    return await run_in_session(db, refdata.list_subjects)
 
 
 @router.get("/subjects/{subject_id}", response_model=SubjectResponse)
 def get_subject(
     subject_id: int,
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific subject by ID"""
-    subject = db.query(Subject).filter(Subject.id == subject_id).first()
+    subject = refdata.get_subject(db, subject_id)
     if not subject:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -218,7 +364,7 @@ def get_subject(
 def update_subject(
     subject_id: int,
     subject_data: SubjectUpdate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Update a subject"""
@@ -235,6 +381,7 @@ def update_subject(
     if subject_data.code is not None:
         subject.code = subject_data.code
     
+    refdata.invalidate(db)
     db.commit()
     db.refresh(subject)
     
@@ -244,7 +391,7 @@ def update_subject(
 @router.delete("/subjects/{subject_id}")
 def delete_subject(
     subject_id: int,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Delete a subject"""
@@ -256,15 +403,179 @@ def delete_subject(
         )
     
     db.delete(subject)
+    refdata.invalidate(db)
     db.commit()
     
     return {"message": f"Subject '{subject.name}' deleted successfully"}
 
+# ============= GRADING SCHEMES =============
+# Lookup order for a subject at a class level: level and subject, level, subject, school-wide,
+# then the built-in A-F scale
+
+def check_grading_scheme(db: Session, level: Optional[int], subject_id: Optional[int], boundaries, scheme_id: Optional[int] = None):
+    """Validate a scheme's boundaries and make sure no other scheme covers the same level and subject"""
+    try:
+        grading.check_boundaries([(boundary.min_marks, boundary.grade) for boundary in boundaries])
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if subject_id is not None and not refdata.get_subject(db, subject_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Subject with ID {subject_id} not found"
+        )
+    
+    existing = db.query(GradingScheme).filter(
+        GradingScheme.level == level,
+        GradingScheme.subject_id == subject_id,
+        GradingScheme.id != scheme_id
+    ).first()
+    if existing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Grading scheme '{existing.name}' already covers this level and subject"
+        )
+
+
+def duplicate_grading_scheme(db: Session) -> HTTPException:
+    """Roll back a write that lost the race for a level and subject to a concurrent one"""
+    db.rollback()
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Another grading scheme already covers this level and subject"
+    )
+
+
+@router.post("/grading-schemes", response_model=GradingSchemeResponse, status_code=status.HTTP_201_CREATED)
+def create_grading_scheme(
+    scheme_data: GradingSchemeCreate,
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    """Create a grading scheme for a class level and/or subject"""
+    check_grading_scheme(db, scheme_data.level, scheme_data.subject_id, scheme_data.boundaries)
+    
+    new_scheme = GradingScheme(
+        name=scheme_data.name,
+        level=scheme_data.level,
+        subject_id=scheme_data.subject_id,
+        boundaries=[
+            GradeBoundary(min_marks=boundary.min_marks, grade=boundary.grade.strip())
+            for boundary in scheme_data.boundaries
+        ]
+    )
+    db.add(new_scheme)
+    try:
+        # Grades are derived from cached schemes, so every worker reloads them
+        refdata.invalidate(db)
+        db.commit()
+    except IntegrityError:
+        raise duplicate_grading_scheme(db)
+    db.refresh(new_scheme)
+    
+    return new_scheme
+
+
+@router.get("/grading-schemes", response_model=List[GradingSchemeResponse])
+def get_all_grading_schemes(
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_read_db)
+):
+    """Get all grading schemes"""
+    return db.query(GradingScheme).options(selectinload(GradingScheme.boundaries)).order_by(
+        GradingScheme.level, GradingScheme.subject_id, GradingScheme.id
+    ).all()
+
+
+@router.get("/grading-schemes/{scheme_id}", response_model=GradingSchemeResponse)
+def get_grading_scheme(
+    scheme_id: int,
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_read_db)
+):
+    """Get a specific grading scheme by ID"""
+    scheme = db.query(GradingScheme).filter(GradingScheme.id == scheme_id).first()
+    if not scheme:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Grading scheme with ID {scheme_id} not found"
+        )
+    return scheme
+
+
+@router.put("/grading-schemes/{scheme_id}", response_model=GradingSchemeResponse)
+def update_grading_scheme(
+    scheme_id: int,
+    scheme_data: GradingSchemeUpdate,
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    """Update a grading scheme; boundaries, when given, replace the old ones"""
+    scheme = db.query(GradingScheme).filter(GradingScheme.id == scheme_id).first()
+    if not scheme:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Grading scheme with ID {scheme_id} not found"
+        )
+    
+    # level and subject_id may be set back to null (every level / every subject), so
+    # only fields present in the request are applied
+    provided = scheme_data.model_fields_set
+    level = scheme_data.level if "level" in provided else scheme.level
+    subject_id = scheme_data.subject_id if "subject_id" in provided else scheme.subject_id
+    boundaries = scheme_data.boundaries if scheme_data.boundaries is not None else scheme.boundaries
+    check_grading_scheme(db, level, subject_id, boundaries, scheme_id=scheme.id)
+    
+    if scheme_data.name is not None:
+        scheme.name = scheme_data.name
+    scheme.level = level
+    scheme.subject_id = subject_id
+    try:
+        if scheme_data.boundaries is not None:
+            scheme.boundaries.clear()
+            db.flush()
+            scheme.boundaries.extend(
+                GradeBoundary(min_marks=boundary.min_marks, grade=boundary.grade.strip())
+                for boundary in scheme_data.boundaries
+            )
+        
+        refdata.invalidate(db)
+        db.commit()
+    except IntegrityError:
+        raise duplicate_grading_scheme(db)
+    db.refresh(scheme)
+    
+    return scheme
+
+
+@router.delete("/grading-schemes/{scheme_id}")
+def delete_grading_scheme(
+    scheme_id: int,
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_db)
+):
+    """Delete a grading scheme; its level and subject fall back to the next broader scheme"""
+    scheme = db.query(GradingScheme).filter(GradingScheme.id == scheme_id).first()
+    if not scheme:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Grading scheme with ID {scheme_id} not found"
+        )
+    
+    db.delete(scheme)
+    refdata.invalidate(db)
+    db.commit()
+    
+    return {"message": f"Grading scheme '{scheme.name}' deleted successfully"}
+
 # TERMS MANAGEMENT
 @router.post("/terms", response_model=TermResponse, status_code=status.HTTP_201_CREATED)
 def create_term(
     term_data: TermCreate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Create a new term"""
@@ -293,6 +604,7 @@ def create_term(
         is_active=term_data.is_active
     )
     db.add(new_term)
+    refdata.invalidate(db)
     db.commit()
     db.refresh(new_term)
     
@@ -300,22 +612,21 @@ def create_term(
 
 
 @router.get("/terms", response_model=List[TermResponse])
-def get_all_terms(
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+async def get_all_terms(
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
 ):
     """Get all terms"""
-    terms = db.query(Term).order_by(Term.year.desc(), Term.term_number.desc()).all()
-    return terms
+    return await run_in_session(db, refdata.list_terms)
 
 
 @router.get("/terms/active", response_model=TermResponse)
-def get_active_term(
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+async def get_active_term(
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
 ):
     """Get the currently active term"""
-    term = db.query(Term).filter(Term.is_active == True).first()
+    term = await run_in_session(db, refdata.get_active_term)
     if not term:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -327,11 +638,11 @@ def get_active_term(
 @router.get("/terms/{term_id}", response_model=TermResponse)
 def get_term(
     term_id: int,
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific term by ID"""
-    term = db.query(Term).filter(Term.id == term_id).first()
+    term = refdata.get_term(db, term_id)
     if not term:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -344,7 +655,7 @@ def get_term(
 def update_term(
     term_id: int,
     term_data: TermUpdate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Update a term"""
@@ -373,6 +684,7 @@ def update_term(
     if term_data.is_active is not None:
         term.is_active = term_data.is_active
     
+    refdata.invalidate(db)
     db.commit()
     db.refresh(term)
     
@@ -382,7 +694,7 @@ def update_term(
 @router.put("/terms/{term_id}/activate")
 def activate_term(
     term_id: int,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Activate a term (deactivates all others)"""
@@ -398,6 +710,7 @@ def activate_term(
     
     # Activate this term
     term.is_active = True
+    refdata.invalidate(db)
     db.commit()
     db.refresh(term)
     
@@ -407,7 +720,7 @@ def activate_term(
 @router.delete("/terms/{term_id}")
 def delete_term(
     term_id: int,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Delete a term"""
@@ -419,6 +732,7 @@ def delete_term(
         )
     
     db.delete(term)
+    refdata.invalidate(db)
     db.commit()
     
     return {"message": f"Term '{term.name}' deleted successfully"}
@@ -428,7 +742,7 @@ def delete_term(
 @router.post("/teachers", response_model=TeacherResponse, status_code=status.HTTP_201_CREATED)
 def create_teacher(
     teacher_data: TeacherCreate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Create a new teacher (creates user account and teacher profile)"""
@@ -475,35 +789,86 @@ def create_teacher(
     return response
 
 
-@router.get("/teachers", response_model=List[TeacherResponse])
-def get_all_teachers(
-    current_user: User = Depends(require_role("admin")),
+@router.post("/teachers/bulk", status_code=status.HTTP_201_CREATED)
+def create_teachers_bulk(
+    teachers_data: List[TeacherCreate],
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
-    """Get all teachers"""
-    teachers = db.query(Teacher).join(User).all()
+    """Create many teachers at once from a JSON array (invalid rows are reported and skipped)"""
+    report = onboard_teachers(db, teachers_data)
+    db.commit()
+    return report
+
+
+@router.get("/teachers", response_model=Page[TeacherResponse], dependencies=[Depends(query_budget(2))])
+async def get_all_teachers(
+    name: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
+):
+    """Get teachers one page at a time, optionally filtered by first or last name prefix"""
+    # Each teacher's assignment count rides along in the same statement
+    assignment_count = select(func.count(TeacherAssignment.id)).where(
+        TeacherAssignment.teacher_id == Teacher.id
+    ).correlate(Teacher).scalar_subquery()
+    query = select(Teacher, User.email, assignment_count.label("assignment_count")).join(
+        User, User.id == Teacher.user_id
+    )
     
-    # Build response with email from user
-    response = []
-    for teacher in teachers:
-        response.append(TeacherResponse(
-            id=teacher.id,
-            user_id=teacher.user_id,
-            first_name=teacher.first_name,
-            last_name=teacher.last_name,
-            phone=teacher.phone,
-            email=teacher.user.email,
-            created_at=teacher.created_at
+    if name:
+        query = query.where(or_(
+            Teacher.first_name.istartswith(name, autoescape=True),
+            Teacher.last_name.istartswith(name, autoescape=True)
         ))
     
-    return response
+    rows, next_cursor, total = await run_in_session(
+        db, paginate, query, sort,
+        {"id": Teacher.id, "first_name": Teacher.first_name, "last_name": Teacher.last_name},
+        Teacher.id,
+        cursor=cursor, limit=limit, include_total=include_total
+    )
+    
+    # Build response with email from user, straight to JSON
+    response = []
+    for row in rows:
+        teacher = row.Teacher
+        response.append({
+            "first_name": teacher.first_name,
+            "last_name": teacher.last_name,
+            "phone": teacher.phone,
+            "id": teacher.id,
+            "email": row.email,
+            "created_at": teacher.created_at,
+            "assignment_count": row.assignment_count
+        })
+    
+    return FastJSONResponse({"items": response, "next_cursor": next_cursor, "total": total})
+
+
+@router.get("/teachers/stats", dependencies=[Depends(query_budget(1))])
+async def get_teacher_stats(
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
+):
+    """Count teachers, and those with at least one assignment, without listing them"""
+    query = select(
+        select(func.count(Teacher.id)).scalar_subquery().label("total"),
+        select(func.count(TeacherAssignment.teacher_id.distinct())).scalar_subquery().label("with_assignments")
+    )
+    row = (await run_in_session(db, fetch_all, query))[0]
+    return {"total": row.total, "with_assignments": row.with_assignments}
 
 
 @router.get("/teachers/{teacher_id}", response_model=TeacherResponse)
 def get_teacher(
     teacher_id: int,
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific teacher by ID"""
     teacher = db.query(Teacher).filter(Teacher.id == teacher_id).first()
@@ -530,7 +895,7 @@ def get_teacher(
 def update_teacher(
     teacher_id: int,
     teacher_data: TeacherUpdate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Update a teacher"""
@@ -549,6 +914,8 @@ def update_teacher(
     if teacher_data.phone is not None:
         teacher.phone = teacher_data.phone
     
+    # Drop the cached principal in every worker so the new name is picked up
+    invalidate_principal(db, teacher.user.email)
     db.commit()
     db.refresh(teacher)
     
@@ -568,7 +935,7 @@ def update_teacher(
 @router.delete("/teachers/{teacher_id}")
 def delete_teacher(
     teacher_id: int,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Delete a teacher (also deletes their user account)"""
@@ -580,9 +947,11 @@ def delete_teacher(
         )
     
     teacher_name = f"{teacher.first_name} {teacher.last_name}"
+    teacher_email = teacher.user.email
     
     # Delete teacher (user will be deleted automatically due to CASCADE)
     db.delete(teacher)
+    invalidate_principal(db, teacher_email)
     db.commit()
     
     return {"message": f"Teacher '{teacher_name}' deleted successfully"}
@@ -592,7 +961,7 @@ def delete_teacher(
 @router.post("/students", response_model=StudentResponse, status_code=status.HTTP_201_CREATED)
 def create_student(
     student_data: StudentCreate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Create a new student (creates user account and student profile)"""
@@ -616,7 +985,7 @@ def create_student(
     
     # Check if class exists (if provided)
     if student_data.class_id:
-        class_exists = db.query(Class).filter(Class.id == student_data.class_id).first()
+        class_exists = refdata.get_class(db, student_data.class_id)
         if not class_exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -648,10 +1017,8 @@ def create_student(
     db.refresh(new_student)
     
     # Build response
-    class_name = None
-    if new_student.class_id:
-        class_obj = db.query(Class).filter(Class.id == new_student.class_id).first()
-        class_name = class_obj.name if class_obj else None
+    class_obj = refdata.get_class(db, new_student.class_id)
+    class_name = class_obj.name if class_obj else None
     
     response = StudentResponse(
         id=new_student.id,
@@ -670,50 +1037,106 @@ def create_student(
     return response
 
 
-@router.get("/students", response_model=List[StudentResponse])
-def get_all_students(
-    class_id: int = None,
-    current_user: User = Depends(require_role("admin")),
+@router.post("/students/bulk", status_code=status.HTTP_201_CREATED)
+def create_students_bulk(
+    students_data: List[StudentCreate],
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
-    """Get all students, optionally filter by class"""
-    query = db.query(Student).join(User)
+    """Create many students at once from a JSON array (invalid rows are reported and skipped)"""
+    report = onboard_students(db, students_data)
+    db.commit()
+    return report
+
+
+@router.get("/students", response_model=Page[StudentResponse], dependencies=[Depends(query_budget(3))])
+async def get_all_students(
+    class_id: int = None,
+    unassigned: bool = False,
+    level: Optional[int] = None,
+    gender: Optional[str] = None,
+    name: Optional[str] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
+):
+    """Get students one page at a time, filtered by class (or no class), level, gender or name prefix"""
+    query = select(Student, User.email, Class.name.label("class_name")).join(
+        User, User.id == Student.user_id
+    ).outerjoin(Class, Class.id == Student.class_id)
     
     if class_id:
-        query = query.filter(Student.class_id == class_id)
+        query = query.where(Student.class_id == class_id)
+    if unassigned:
+        query = query.where(Student.class_id.is_(None))
+    if level is not None:
+        query = query.where(Class.level == level)
+    if gender:
+        query = query.where(Student.gender.ilike(gender))
+    if name:
+        query = query.where(or_(
+            Student.first_name.istartswith(name, autoescape=True),
+            Student.last_name.istartswith(name, autoescape=True)
+        ))
     
-    students = query.all()
+    rows, next_cursor, total = await run_in_session(
+        db, paginate, query, sort,
+        {
+            "id": Student.id,
+            "first_name": Student.first_name,
+            "last_name": Student.last_name,
+            "admission_number": Student.admission_number
+        },
+        Student.id,
+        cursor=cursor, limit=limit, include_total=include_total
+    )
     
-    # Build response
+    # Build response straight to JSON
     response = []
-    for student in students:
-        class_name = None
-        if student.class_id:
-            class_obj = db.query(Class).filter(Class.id == student.class_id).first()
-            class_name = class_obj.name if class_obj else None
-        
-        response.append(StudentResponse(
-            id=student.id,
-            user_id=student.user_id,
-            first_name=student.first_name,
-            last_name=student.last_name,
-            admission_number=student.admission_number,
-            date_of_birth=student.date_of_birth,
-            gender=student.gender,
-            class_id=student.class_id,
-            email=student.user.email,
-            class_name=class_name,
-            created_at=student.created_at
-        ))
+    for row in rows:
+        student = row.Student
+        response.append({
+            "first_name": student.first_name,
+            "last_name": student.last_name,
+            "admission_number": student.admission_number,
+            "date_of_birth": student.date_of_birth,
+            "gender": student.gender,
+            "class_id": student.class_id,
+            "id": student.id,
+            "user_id": student.user_id,
+            "email": row.email,
+            "class_name": row.class_name,
+            "created_at": student.created_at
+        })
+    
+    return FastJSONResponse({"items": response, "next_cursor": next_cursor, "total": total})
+
+
+@router.get("/students/stats", dependencies=[Depends(query_budget(1))])
+async def get_student_stats(
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
+):
+    """Count students per class, and those in no class, without listing them"""
+    query = select(Student.class_id, func.count(Student.id).label("students")).group_by(Student.class_id)
+    rows = await run_in_session(db, fetch_all, query)
     
-    return response
+    by_class = {row.class_id: row.students for row in rows if row.class_id is not None}
+    return {
+        "total": sum(row.students for row in rows),
+        "not_assigned": sum(row.students for row in rows if row.class_id is None),
+        "by_class": by_class
+    }
 
 
 @router.get("/students/{student_id}", response_model=StudentResponse)
 def get_student(
     student_id: int,
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific student by ID"""
     student = db.query(Student).filter(Student.id == student_id).first()
@@ -723,10 +1146,8 @@ def get_student(
             detail=f"Student with ID {student_id} not found"
         )
     
-    class_name = None
-    if student.class_id:
-        class_obj = db.query(Class).filter(Class.id == student.class_id).first()
-        class_name = class_obj.name if class_obj else None
+    class_obj = refdata.get_class(db, student.class_id)
+    class_name = class_obj.name if class_obj else None
     
     response = StudentResponse(
         id=student.id,
@@ -749,7 +1170,7 @@ def get_student(
 def update_student(
     student_id: int,
     student_data: StudentUpdate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Update a student"""
@@ -762,13 +1183,15 @@ def update_student(
     
     # Check if new class exists (if provided)
     if student_data.class_id:
-        class_exists = db.query(Class).filter(Class.id == student_data.class_id).first()
+        class_exists = refdata.get_class(db, student_data.class_id)
         if not class_exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Class with ID {student_data.class_id} not found"
             )
     
+    old_class_id = student.class_id
+    
     # Update fields if provided
     if student_data.first_name is not None:
         student.first_name = student_data.first_name
@@ -783,13 +1206,18 @@ def update_student(
     if student_data.class_id is not None:
         student.class_id = student_data.class_id
     
+    # Moving class changes the standings of both the old and the new class
+    if student.class_id != old_class_id:
+        db.flush()
+        refresh_moved_student(db, student.id, [old_class_id, student.class_id])
+    
+    # Drop the cached principal in every worker so a class move is picked up
+    invalidate_principal(db, student.user.email)
     db.commit()
     db.refresh(student)
     
-    class_name = None
-    if student.class_id:
-        class_obj = db.query(Class).filter(Class.id == student.class_id).first()
-        class_name = class_obj.name if class_obj else None
+    class_obj = refdata.get_class(db, student.class_id)
+    class_name = class_obj.name if class_obj else None
     
     response = StudentResponse(
         id=student.id,
@@ -811,7 +1239,7 @@ def update_student(
 @router.delete("/students/{student_id}")
 def delete_student(
     student_id: int,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Delete a student (also deletes their user account)"""
@@ -823,9 +1251,22 @@ def delete_student(
         )
     
     student_name = f"{student.first_name} {student.last_name}"
+    student_email = student.user.email
+    term_ids = db.query(Result.term_id).filter(Result.student_id == student.id).distinct().all()
+    ranked_in = dict(
+        db.query(ClassStanding.term_id, ClassStanding.class_id).filter(ClassStanding.student_id == student.id).all()
+    )
     
     # Delete student (user will be deleted automatically due to CASCADE)
     db.delete(student)
+    db.flush()
+    
+    # Re-rank the classmates left behind, in whichever class the student was ranked each term
+    for (term_id,) in term_ids:
+        class_id = ranked_in.get(term_id, student.class_id)
+        if class_id:
+            refresh_class_standings(db, class_id, term_id)
+    invalidate_principal(db, student_email)
     db.commit()
     
     return {"message": f"Student '{student_name}' deleted successfully"}
@@ -835,7 +1276,7 @@ def delete_student(
 @router.post("/assignments", response_model=TeacherAssignmentResponse, status_code=status.HTTP_201_CREATED)
 def create_assignment(
     assignment_data: TeacherAssignmentCreate,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Assign a teacher to teach a subject in a class for a term"""
@@ -848,7 +1289,7 @@ def create_assignment(
         )
     
     # Verify subject exists
-    subject = db.query(Subject).filter(Subject.id == assignment_data.subject_id).first()
+    subject = refdata.get_subject(db, assignment_data.subject_id)
     if not subject:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -856,7 +1297,7 @@ def create_assignment(
         )
     
     # Verify class exists
-    class_obj = db.query(Class).filter(Class.id == assignment_data.class_id).first()
+    class_obj = refdata.get_class(db, assignment_data.class_id)
     if not class_obj:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -864,7 +1305,7 @@ def create_assignment(
         )
     
     # Verify term exists
-    term = db.query(Term).filter(Term.id == assignment_data.term_id).first()
+    term = refdata.get_term(db, assignment_data.term_id)
     if not term:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -912,58 +1353,105 @@ def create_assignment(
     return response
 
 
-@router.get("/assignments", response_model=List[TeacherAssignmentResponse])
-def get_all_assignments(
+@router.get("/assignments", response_model=Page[TeacherAssignmentResponse], dependencies=[Depends(query_budget(2))])
+async def get_all_assignments(
     teacher_id: Optional[int] = None,
     class_id: Optional[int] = None,
     term_id: Optional[int] = None,
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+    subject_id: Optional[int] = None,
+    level: Optional[int] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    include_total: bool = False,
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
 ):
-    """Get all assignments, with optional filters"""
-    query = db.query(TeacherAssignment)
+    """Get assignments one page at a time, with optional filters"""
+    # Inner joins skip assignments whose related records are missing
+    query = select(
+        TeacherAssignment,
+        Teacher.first_name,
+        Teacher.last_name,
+        Subject.name.label("subject_name"),
+        Class.name.label("class_name"),
+        Term.name.label("term_name")
+    ).join(Teacher, Teacher.id == TeacherAssignment.teacher_id).join(
+        Subject, Subject.id == TeacherAssignment.subject_id
+    ).join(Class, Class.id == TeacherAssignment.class_id).join(
+        Term, Term.id == TeacherAssignment.term_id
+    )
     
     if teacher_id:
-        query = query.filter(TeacherAssignment.teacher_id == teacher_id)
+        query = query.where(TeacherAssignment.teacher_id == teacher_id)
     if class_id:
-        query = query.filter(TeacherAssignment.class_id == class_id)
+        query = query.where(TeacherAssignment.class_id == class_id)
     if term_id:
-        query = query.filter(TeacherAssignment.term_id == term_id)
-    
-    assignments = query.all()
+        query = query.where(TeacherAssignment.term_id == term_id)
+    if subject_id:
+        query = query.where(TeacherAssignment.subject_id == subject_id)
+    if level is not None:
+        query = query.where(Class.level == level)
+    
+    rows, next_cursor, total = await run_in_session(
+        db, paginate, query, sort, {"id": TeacherAssignment.id}, TeacherAssignment.id,
+        cursor=cursor, limit=limit, include_total=include_total
+    )
     
-    # Build response with names
+    # Build response with names, straight to JSON
     response = []
-    for assignment in assignments:
-        # Safely get related records
-        teacher = db.query(Teacher).filter(Teacher.id == assignment.teacher_id).first()
-        subject = db.query(Subject).filter(Subject.id == assignment.subject_id).first()
-        class_obj = db.query(Class).filter(Class.id == assignment.class_id).first()
-        term = db.query(Term).filter(Term.id == assignment.term_id).first()
-        
-        # Skip this assignment if any related record is missing
-        if not teacher or not subject or not class_obj or not term:
-            continue
-        
-        response.append(TeacherAssignmentResponse(
-            id=assignment.id,
-            teacher_id=assignment.teacher_id,
-            subject_id=assignment.subject_id,
-            class_id=assignment.class_id,
-            term_id=assignment.term_id,
-            teacher_name=f"{teacher.first_name} {teacher.last_name}",
-            subject_name=subject.name,
-            class_name=class_obj.name,
-            term_name=term.name
-        ))
+    for row in rows:
+        assignment = row.TeacherAssignment
+        response.append({
+            "teacher_id": assignment.teacher_id,
+            "subject_id": assignment.subject_id,
+            "class_id": assignment.class_id,
+            "term_id": assignment.term_id,
+            "id": assignment.id,
+            "teacher_name": f"{row.first_name} {row.last_name}",
+            "subject_name": row.subject_name,
+            "class_name": row.class_name,
+            "term_name": row.term_name
+        })
+    
+    return FastJSONResponse({"items": response, "next_cursor": next_cursor, "total": total})
+
+
+@router.get("/assignments/stats", dependencies=[Depends(query_budget(1))])
+async def get_assignment_stats(
+    teacher_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    term_id: Optional[int] = None,
+    subject_id: Optional[int] = None,
+    current_user: Principal = Depends(require_role("admin")),
+    db=Depends(get_read_session)
+):
+    """Count assignments and the teachers, subjects and classes they cover, with the list's filters"""
+    query = select(
+        func.count(TeacherAssignment.id).label("total"),
+        func.count(TeacherAssignment.teacher_id.distinct()).label("teachers"),
+        func.count(TeacherAssignment.subject_id.distinct()).label("subjects"),
+        func.count(TeacherAssignment.class_id.distinct()).label("classes")
+    )
     
-    return response
+    if teacher_id:
+        query = query.where(TeacherAssignment.teacher_id == teacher_id)
+    if class_id:
+        query = query.where(TeacherAssignment.class_id == class_id)
+    if term_id:
+        query = query.where(TeacherAssignment.term_id == term_id)
+    if subject_id:
+        query = query.where(TeacherAssignment.subject_id == subject_id)
+    
+    row = (await run_in_session(db, fetch_all, query))[0]
+    return {"total": row.total, "teachers": row.teachers, "subjects": row.subjects, "classes": row.classes}
+
 
 @router.get("/assignments/{assignment_id}", response_model=TeacherAssignmentResponse)
 def get_assignment(
     assignment_id: int,
-    current_user: User = Depends(require_role("admin")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("admin")),
+    db: Session = Depends(get_read_db)
 ):
     """Get a specific assignment by ID"""
     assignment = db.query(TeacherAssignment).filter(TeacherAssignment.id == assignment_id).first()
@@ -974,9 +1462,9 @@ def get_assignment(
         )
     
     teacher = db.query(Teacher).filter(Teacher.id == assignment.teacher_id).first()
-    subject = db.query(Subject).filter(Subject.id == assignment.subject_id).first()
-    class_obj = db.query(Class).filter(Class.id == assignment.class_id).first()
-    term = db.query(Term).filter(Term.id == assignment.term_id).first()
+    subject = refdata.get_subject(db, assignment.subject_id)
+    class_obj = refdata.get_class(db, assignment.class_id)
+    term = refdata.get_term(db, assignment.term_id)
     
     response = TeacherAssignmentResponse(
         id=assignment.id,
@@ -996,7 +1484,7 @@ def get_assignment(
 @router.delete("/assignments/{assignment_id}")
 def delete_assignment(
     assignment_id: int,
-    current_user: User = Depends(require_role("admin")),
+    current_user: Principal = Depends(require_role("admin")),
     db: Session = Depends(get_db)
 ):
     """Delete a teacher assignment"""
@@ -5,9 +5,11 @@ from datetime import timedelta
 from app.database import get_db
 from app.models import User
 from app.schemas import UserCreate, UserResponse, Token
+from starlette.concurrency import run_in_threadpool
 from app.auth import (
+    Principal,
     get_password_hash,
-    verify_password,
+    verify_password_async,
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     get_current_user
@@ -66,11 +68,21 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
         )
 
 
+def find_user_by_email(db: Session, email: str):
+    user = db.query(User).filter(User.email == email).first()
+    if user is not None:
+        # Detach so the loaded columns survive the rollback below
+        db.expunge(user)
+    # Release the connection before the slow password check, not after it
+    db.rollback()
+    return user
+
+
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     try:
-        # Find user by email
-        user = db.query(User).filter(User.email == form_data.username).first()
+        # Find user by email (blocking query runs in the thread pool)
+        user = await run_in_threadpool(find_user_by_email, db, form_data.username)
         
         if not user:
             raise HTTPException(
@@ -79,8 +91,8 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Verify password
-        if not verify_password(form_data.password, user.password_hash):
+        # Verify password on the bounded bcrypt pool
+        if not await verify_password_async(form_data.password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect email or password",
@@ -106,5 +118,5 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+def get_current_user_info(current_user: Principal = Depends(get_current_user)):
     return current_user
\ No newline at end of file
@@ -1,10 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import and_, func, select
 from typing import List, Optional
-from app.database import get_db
-from app.models import User, Student, Result, Subject, Term, Class
-from app.auth import get_current_user, require_role
+from app.database import fetch_all, get_read_db, get_read_session, run_in_session
+from app.models import User, Student, Result, Subject, Term, Class, ClassStanding
+from app.auth import Principal, get_current_user, require_role
+from app import refdata, summaries, transcript
+from app.querystats import query_budget
+from app.projections import result_projection_query, result_row_dict
+from app.responses import FastJSONResponse
 from app.schemas import ResultResponse
 
 router = APIRouter(prefix="/api/student", tags=["Student"])
@@ -12,107 +16,115 @@ router = APIRouter(prefix="/api/student", tags=["Student"])
 
 # ============= VIEW RESULTS =============
 
-@router.get("/results", response_model=List[ResultResponse])
-def get_my_results(
+@router.get("/results", response_model=List[ResultResponse], dependencies=[Depends(query_budget(2))])
+async def get_my_results(
     term_id: Optional[int] = None,
-    current_user: User = Depends(require_role("student")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("student")),
+    db=Depends(get_read_session)
 ):
     """Get results for the logged-in student"""
-    # Get student record
-    student = db.query(Student).filter(Student.user_id == current_user.id).first()
-    if not student:
+    # Student profile ID comes with the authenticated principal
+    if current_user.student_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Student profile not found"
         )
     
-    # Query results
-    query = db.query(Result).filter(Result.student_id == student.id)
+    # Query results with subject and term names in one statement
+    query = result_projection_query().where(Result.student_id == current_user.student_id)
     
     # Filter by term if provided, otherwise get active term results
     if term_id:
-        query = query.filter(Result.term_id == term_id)
+        query = query.where(Result.term_id == term_id)
     else:
         # Get active term
-        active_term = db.query(Term).filter(Term.is_active == True).first()
+        active_term = await run_in_session(db, refdata.get_active_term)
         if active_term:
-            query = query.filter(Result.term_id == active_term.id)
-    
-    results = query.all()
-    
-    # Build response
-    response = []
-    for result in results:
-        subject = db.query(Subject).filter(Subject.id == result.subject_id).first()
-        term = db.query(Term).filter(Term.id == result.term_id).first()
-        
-        response.append(ResultResponse(
-            id=result.id,
-            student_id=result.student_id,
-            subject_id=result.subject_id,
-            term_id=result.term_id,
-            marks=result.marks,
-            teacher_id=result.teacher_id,
-            student_name=f"{student.first_name} {student.last_name}",
-            subject_name=subject.name if subject else "Unknown",
-            term_name=term.name if term else "Unknown",
-            uploaded_at=result.uploaded_at
-        ))
+            query = query.where(Result.term_id == active_term.id)
     
-    return response
+    # Rows go straight to JSON; the response model only documents the shape
+    rows = await run_in_session(db, fetch_all, query)
+    return FastJSONResponse([result_row_dict(row) for row in rows])
 
 
-@router.get("/results/summary")
-def get_results_summary(
+@router.get("/results/summary", dependencies=[Depends(query_budget(2))])
+async def get_results_summary(
     term_id: Optional[int] = None,
-    current_user: User = Depends(require_role("student")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("student")),
+    db=Depends(get_read_session)
 ):
     """Get results summary with total marks, average, and position in class"""
-    # Get student record
-    student = db.query(Student).filter(Student.user_id == current_user.id).first()
-    if not student:
+    header, class_id, term_id, versions, sheet = await run_in_session(
+        db, resolve_results_summary, current_user.student_id, term_id
+    )
+    # Every student in the class reads the same sheet; concurrent misses build it once
+    sheet = await summaries.get_class_sheet(db, class_id, term_id, versions, sheet)
+    return build_results_summary(header, sheet.get(header["student_id"]))
+
+
+def resolve_results_summary(db: Session, student_id: Optional[int], term_id: Optional[int]) -> tuple:
+    """Look up the student, term and class name, and the class's cached sheet if this worker has it"""
+    # Reference data is cached, so the term costs no statement here
+    term = refdata.get_term(db, term_id) if term_id else refdata.get_active_term(db)
+    
+    # Get student record by primary key from the authenticated principal, along with the class
+    # their standing records for the term: a student who has since moved is summarized there
+    row = None
+    if student_id:
+        row = db.execute(
+            select(Student, ClassStanding.class_id)
+            .outerjoin(
+                ClassStanding,
+                and_(ClassStanding.student_id == Student.id, ClassStanding.term_id == (term.id if term else None))
+            )
+            .where(Student.id == student_id)
+        ).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Student profile not found"
         )
+    student, class_id = row
+    class_id = class_id or student.class_id
     
-    if not student.class_id:
+    if not class_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Student is not assigned to any class"
         )
     
-    # Determine which term to use
-    if term_id:
-        term = db.query(Term).filter(Term.id == term_id).first()
-        if not term:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Term with ID {term_id} not found"
-            )
-    else:
-        # Get active term
-        term = db.query(Term).filter(Term.is_active == True).first()
-        if not term:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="No active term found"
-            )
+    if not term:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Term with ID {term_id} not found" if term_id else "No active term found"
+        )
+    
+    class_obj = refdata.get_class(db, class_id)
+    class_name = class_obj.name if class_obj else "Unknown"
     
-    # Get student's results for this term
-    student_results = db.query(Result).filter(
-        Result.student_id == student.id,
-        Result.term_id == term.id
-    ).all()
+    header = {
+        "student_id": student.id,
+        "student_name": f"{student.first_name} {student.last_name}",
+        "admission_number": student.admission_number,
+        "class_name": class_name,
+        "term_name": term.name
+    }
+    versions, sheet = summaries.cache.lookup(db, class_id, term.id)
     
-    if not student_results:
+    # Hand the connection back before waiting on a sheet another request may be building
+    db.rollback()
+    return header, class_id, term.id, versions, sheet
+
+
+def build_results_summary(header: dict, entry: Optional[dict]) -> dict:
+    """Build the summary response from the student's entry in the class sheet"""
+    # Totals and position come from class_standings, which is kept up to date on every result write
+    if entry is None:
         return {
-            "student_id": student.id,
-            "student_name": f"{student.first_name} {student.last_name}",
-            "class_name": student.class_.name if student.class_ else "Unknown",
-            "term_name": term.name,
+            "student_id": header["student_id"],
+            "student_name": header["student_name"],
+            "class_name": header["class_name"],
+            "term_name": header["term_name"],
             "results": [],
             "total_marks": 0,
             "average_marks": 0,
@@ -121,95 +133,62 @@ def get_results_summary(
             "message": "No results uploaded yet for this term"
         }
     
-    # Calculate student's total
-    student_total = sum([r.marks for r in student_results])
-    student_average = student_total / len(student_results)
-    
-    # Get all students in the same class
-    classmates = db.query(Student).filter(Student.class_id == student.class_id).all()
-    
-    # Calculate totals for all students in class
-    student_totals = []
-    for classmate in classmates:
-        classmate_results = db.query(Result).filter(
-            Result.student_id == classmate.id,
-            Result.term_id == term.id
-        ).all()
-        
-        if classmate_results:
-            total = sum([r.marks for r in classmate_results])
-            student_totals.append({
-                "student_id": classmate.id,
-                "total": total
-            })
-    
-    # Sort by total marks (descending)
-    student_totals.sort(key=lambda x: x["total"], reverse=True)
-    
-    # Find position
-    position = None
-    for idx, st in enumerate(student_totals, start=1):
-        if st["student_id"] == student.id:
-            position = idx
-            break
+    return {
+        **header,
+        "results": entry["results"],
+        "total_marks": entry["total_marks"],
+        "average_marks": entry["average_marks"],
+        "position": entry["position"],
+        "total_students": entry["total_students"]
+    }
+
+
+@router.get("/results/transcript", dependencies=[Depends(query_budget(2))])
+async def get_transcript(
+    current_user: Principal = Depends(require_role("student")),
+    db=Depends(get_read_session)
+):
+    """Get marks, grades, totals and positions for every term, with the change from term to term"""
+    return await run_in_session(db, build_transcript, current_user.student_id)
+
+
+def build_transcript(db: Session, student_id: Optional[int]) -> dict:
+    """Build the transcript response; all terms come from one query"""
+    student = db.get(Student, student_id) if student_id else None
+    if not student:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Student profile not found"
+        )
     
-    # Build detailed results
-    detailed_results = []
-    for result in student_results:
-        subject = db.query(Subject).filter(Subject.id == result.subject_id).first()
-        detailed_results.append({
-            "subject_id": result.subject_id,
-            "subject_name": subject.name if subject else "Unknown",
-            "marks": float(result.marks),
-            "grade": get_grade(float(result.marks))
-        })
+    class_obj = refdata.get_class(db, student.class_id)
+    terms = transcript.build_transcript_terms(db, student.id, student.class_id)
     
     return {
         "student_id": student.id,
         "student_name": f"{student.first_name} {student.last_name}",
         "admission_number": student.admission_number,
-        "class_name": student.class_.name if student.class_ else "Unknown",
-        "term_name": term.name,
-        "results": detailed_results,
-        "total_marks": float(student_total),
-        "average_marks": round(student_average, 2),
-        "position": position,
-        "total_students": len(student_totals)
+        "class_name": class_obj.name if class_obj else None,
+        "terms": terms
     }
 
 
-def get_grade(marks: float) -> str:
-    """Convert marks to grade"""
-    if marks >= 80:
-        return "A"
-    elif marks >= 70:
-        return "B"
-    elif marks >= 60:
-        return "C"
-    elif marks >= 50:
-        return "D"
-    else:
-        return "F"
-
-
 @router.get("/profile")
 def get_my_profile(
-    current_user: User = Depends(require_role("student")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("student")),
+    db: Session = Depends(get_read_db)
 ):
     """Get student's own profile information"""
-    # Get student record
-    student = db.query(Student).filter(Student.user_id == current_user.id).first()
+    # Get student record by primary key from the authenticated principal
+    student = db.get(Student, current_user.student_id) if current_user.student_id else None
     if not student:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Student profile not found"
         )
     
-    class_name = None
-    if student.class_id:
-        class_obj = db.query(Class).filter(Class.id == student.class_id).first()
-        class_name = class_obj.name if class_obj else None
+    class_obj = refdata.get_class(db, student.class_id)
+    class_name = class_obj.name if class_obj else None
     
     return {
         "id": student.id,
@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from typing import List, Optional
+from app.database import fetch_all, get_db, get_read_db, get_read_session, run_in_session
 from app.models import User, Teacher, TeacherAssignment, Class, Subject, Term, Student, Result
-from app.auth import get_current_user, require_role
+from app.auth import Principal, get_current_user, require_role
+from app.bulk_results import filter_class_members, upsert_results, validate_bulk_items
+from app.mark_sheets import MarkSheetError, import_mark_sheet, iter_mark_sheet_rows
+from app import analytics, refdata
+from app.gradebook import build_gradebook, check_layout, class_assignments, resolve_class_and_term
+from app.querystats import query_budget
+from app.projections import result_projection_query, result_row_dict, to_result_response
+from app.responses import FastJSONResponse
+from app.standings import refresh_student_standings
 from app.schemas import TeacherAssignmentResponse, ResultCreate, ResultUpdate, ResultResponse, BulkResultCreate
 
 router = APIRouter(prefix="/api/teacher", tags=["Teacher"])
@@ -11,30 +20,34 @@ router = APIRouter(prefix="/api/teacher", tags=["Teacher"])
 
 # ============= VIEW ASSIGNMENTS =============
 
-@router.get("/my-assignments", response_model=List[TeacherAssignmentResponse])
-def get_my_assignments(
+@router.get("/my-assignments", response_model=List[TeacherAssignmentResponse], dependencies=[Depends(query_budget(2))])
+async def get_my_assignments(
     term_id: int = None,
-    current_user: User = Depends(require_role("teacher")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("teacher")),
+    db=Depends(get_read_session)
 ):
     """Get assignments for the logged-in teacher"""
-    # Get teacher record
-    teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-    if not teacher:
+    # Teacher profile ID comes with the authenticated principal
+    if current_user.teacher_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Teacher profile not found"
         )
     
+    return await run_in_session(db, build_assignment_list, current_user, term_id)
+
+
+def build_assignment_list(db: Session, current_user: Principal, term_id: Optional[int]) -> List[TeacherAssignmentResponse]:
+    """Load a teacher's assignments with names from the reference-data cache"""
     # Query assignments
-    query = db.query(TeacherAssignment).filter(TeacherAssignment.teacher_id == teacher.id)
+    query = db.query(TeacherAssignment).filter(TeacherAssignment.teacher_id == current_user.teacher_id)
     
     # Filter by term if provided, otherwise get active term assignments
     if term_id:
         query = query.filter(TeacherAssignment.term_id == term_id)
     else:
         # Get active term
-        active_term = db.query(Term).filter(Term.is_active == True).first()
+        active_term = refdata.get_active_term(db)
         if active_term:
             query = query.filter(TeacherAssignment.term_id == active_term.id)
     
@@ -43,9 +56,9 @@ def get_my_assignments(
     # Build response
     response = []
     for assignment in assignments:
-        subject = db.query(Subject).filter(Subject.id == assignment.subject_id).first()
-        class_obj = db.query(Class).filter(Class.id == assignment.class_id).first()
-        term = db.query(Term).filter(Term.id == assignment.term_id).first()
+        subject = refdata.get_subject(db, assignment.subject_id)
+        class_obj = refdata.get_class(db, assignment.class_id)
+        term = refdata.get_term(db, assignment.term_id)
         
         # Skip assignments with missing related records
         if not subject or not class_obj or not term:
@@ -57,23 +70,24 @@ def get_my_assignments(
             subject_id=assignment.subject_id,
             class_id=assignment.class_id,
             term_id=assignment.term_id,
-            teacher_name=f"{teacher.first_name} {teacher.last_name}",
+            teacher_name=f"{current_user.first_name} {current_user.last_name}",
             subject_name=subject.name,
             class_name=class_obj.name,
             term_name=term.name
         ))
     
     return response
-@router.get("/classes/{class_id}/students", response_model=List[dict])
+
+
+@router.get("/classes/{class_id}/students", response_model=List[dict], dependencies=[Depends(query_budget(3))])
 def get_students_in_class(
     class_id: int,
-    current_user: User = Depends(require_role("teacher")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("teacher")),
+    db: Session = Depends(get_read_db)
 ):
     """Get all students in a specific class (for teachers to see who they teach)"""
-    # Get teacher record
-    teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-    if not teacher:
+    # Teacher profile ID comes with the authenticated principal
+    if current_user.teacher_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Teacher profile not found"
@@ -81,7 +95,7 @@ def get_students_in_class(
     
     # Verify teacher is assigned to this class
     assignment = db.query(TeacherAssignment).filter(
-        TeacherAssignment.teacher_id == teacher.id,
+        TeacherAssignment.teacher_id == current_user.teacher_id,
         TeacherAssignment.class_id == class_id
     ).first()
     
@@ -91,34 +105,127 @@ def get_students_in_class(
             detail="You are not assigned to teach this class"
         )
     
-    # Get students in this class
-    students = db.query(Student).filter(Student.class_id == class_id).all()
+    # Get students in this class with their emails in the same query
+    students = db.query(Student, User.email).join(User, User.id == Student.user_id).filter(
+        Student.class_id == class_id
+    ).all()
     
     # Build response
     response = []
-    for student in students:
+    for student, email in students:
         response.append({
             "id": student.id,
             "first_name": student.first_name,
             "last_name": student.last_name,
             "admission_number": student.admission_number,
-            "email": student.user.email
+            "email": email
         })
     
     return response
 
+
+@router.get("/classes/{class_id}/gradebook", dependencies=[Depends(query_budget(2))])
+async def get_class_gradebook(
+    class_id: int,
+    term_id: Optional[int] = None,
+    layout: str = "columnar",
+    current_user: Principal = Depends(require_role("teacher")),
+    db=Depends(get_read_session)
+):
+    """Get every student's marks in a class as a students x subjects matrix with totals and positions"""
+    # Teacher profile ID comes with the authenticated principal
+    if current_user.teacher_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Teacher profile not found"
+        )
+    check_layout(layout)
+    
+    content = await run_in_session(db, build_teacher_gradebook, current_user.teacher_id, class_id, term_id, layout)
+    return FastJSONResponse(content)
+
+
+def build_teacher_gradebook(db: Session, teacher_id: int, class_id: int, term_id: Optional[int], layout: str) -> dict:
+    """Build the gradebook of a class the teacher teaches in the term"""
+    class_obj, term = resolve_class_and_term(db, class_id, term_id)
+    
+    # The class's assignments both authorize the teacher and list the subject columns
+    assignments = class_assignments(db, class_id, term.id)
+    if teacher_id not in {assignment.teacher_id for assignment in assignments}:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not assigned to teach this class in this term"
+        )
+    
+    gradebook = build_gradebook(db, class_obj, term, [assignment.subject_id for assignment in assignments])
+    return gradebook.encode(layout)
+
+
+@router.get("/analytics", dependencies=[Depends(query_budget(2))])
+async def get_analytics(
+    term_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    level: Optional[int] = None,
+    subject_id: Optional[int] = None,
+    current_user: Principal = Depends(require_role("teacher")),
+    db=Depends(get_read_session)
+):
+    """Mark statistics for the classes and subjects the teacher teaches in a term"""
+    # Teacher profile ID comes with the authenticated principal
+    if current_user.teacher_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Teacher profile not found"
+        )
+    
+    return await run_in_session(db, build_teacher_analytics, current_user.teacher_id, term_id, class_id, level, subject_id)
+
+
+def build_teacher_analytics(
+    db: Session,
+    teacher_id: int,
+    term_id: Optional[int],
+    class_id: Optional[int],
+    level: Optional[int],
+    subject_id: Optional[int]
+) -> dict:
+    """Limit the requested slice to the (class, subject) pairs the teacher is assigned in the term"""
+    term, class_ids, description = analytics.resolve_scope(db, term_id, class_id, level, subject_id)
+    
+    assigned = db.execute(
+        select(TeacherAssignment.class_id, TeacherAssignment.subject_id).where(
+            TeacherAssignment.teacher_id == teacher_id,
+            TeacherAssignment.term_id == term.id
+        )
+    ).all()
+    class_set = set(class_ids)
+    pairs = {
+        (row.class_id, row.subject_id)
+        for row in assigned
+        if row.class_id in class_set and (subject_id is None or row.subject_id == subject_id)
+    }
+    
+    if not pairs:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not assigned to teach this class or subject in this term"
+        )
+    
+    return analytics.build_analytics(
+        db, term.id, [pair[0] for pair in pairs], subject_id, description, pairs=pairs
+    )
+
 # ============= UPLOAD RESULTS =============
 
 @router.post("/results", response_model=ResultResponse, status_code=status.HTTP_201_CREATED)
 def upload_result(
     result_data: ResultCreate,
-    current_user: User = Depends(require_role("teacher")),
+    current_user: Principal = Depends(require_role("teacher")),
     db: Session = Depends(get_db)
 ):
     """Upload a single result for a student"""
-    # Get teacher record
-    teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-    if not teacher:
+    # Teacher profile ID comes with the authenticated principal
+    if current_user.teacher_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Teacher profile not found"
@@ -133,7 +240,7 @@ def upload_result(
         )
     
     # Verify subject exists
-    subject = db.query(Subject).filter(Subject.id == result_data.subject_id).first()
+    subject = refdata.get_subject(db, result_data.subject_id)
     if not subject:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -141,7 +248,7 @@ def upload_result(
         )
     
     # Verify term exists
-    term = db.query(Term).filter(Term.id == result_data.term_id).first()
+    term = refdata.get_term(db, result_data.term_id)
     if not term:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -150,7 +257,7 @@ def upload_result(
     
     # Verify teacher is assigned to teach this subject to this student's class
     assignment = db.query(TeacherAssignment).filter(
-        TeacherAssignment.teacher_id == teacher.id,
+        TeacherAssignment.teacher_id == current_user.teacher_id,
         TeacherAssignment.subject_id == result_data.subject_id,
         TeacherAssignment.class_id == student.class_id,
         TeacherAssignment.term_id == result_data.term_id
@@ -188,9 +295,11 @@ def upload_result(
         subject_id=result_data.subject_id,
         term_id=result_data.term_id,
         marks=result_data.marks,
-        teacher_id=teacher.id
+        teacher_id=current_user.teacher_id
     )
     db.add(new_result)
+    db.flush()
+    refresh_student_standings(db, [new_result.student_id], new_result.term_id)
     db.commit()
     db.refresh(new_result)
     
@@ -211,16 +320,16 @@ def upload_result(
     return response
 
 
-@router.post("/results/bulk", status_code=status.HTTP_201_CREATED)
+# One more than SQLite needs: PostgreSQL also takes the standings lock
+@router.post("/results/bulk", status_code=status.HTTP_201_CREATED, dependencies=[Depends(query_budget(11))])
 def upload_bulk_results(
     bulk_data: BulkResultCreate,
-    current_user: User = Depends(require_role("teacher")),
+    current_user: Principal = Depends(require_role("teacher")),
     db: Session = Depends(get_db)
 ):
     """Upload multiple results at once (e.g., for entire class)"""
-    # Get teacher record
-    teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-    if not teacher:
+    # Teacher profile ID comes with the authenticated principal
+    if current_user.teacher_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Teacher profile not found"
@@ -228,7 +337,7 @@ def upload_bulk_results(
     
     # Verify teacher is assigned to teach this subject to this class
     assignment = db.query(TeacherAssignment).filter(
-        TeacherAssignment.teacher_id == teacher.id,
+        TeacherAssignment.teacher_id == current_user.teacher_id,
         TeacherAssignment.subject_id == bulk_data.subject_id,
         TeacherAssignment.class_id == bulk_data.class_id,
         TeacherAssignment.term_id == bulk_data.term_id
@@ -240,127 +349,136 @@ def upload_bulk_results(
             detail="You are not assigned to teach this subject to this class"
         )
     
-    # Process each result
-    created_count = 0
-    updated_count = 0
-    errors = []
-    
-    for result_item in bulk_data.results:
-        try:
-            student_id = result_item.get("student_id")
-            marks = result_item.get("marks")
-            
-            # Validate
-            if not student_id or marks is None:
-                errors.append(f"Missing student_id or marks in result item")
-                continue
-            
-            if marks < 0 or marks > 100:
-                errors.append(f"Student {student_id}: Marks must be between 0 and 100")
-                continue
-            
-            # Check if result exists
-            existing_result = db.query(Result).filter(
-                Result.student_id == student_id,
-                Result.subject_id == bulk_data.subject_id,
-                Result.term_id == bulk_data.term_id
-            ).first()
-            
-            if existing_result:
-                # Update existing result
-                existing_result.marks = marks
-                existing_result.teacher_id = teacher.id
-                updated_count += 1
-            else:
-                # Create new result
-                new_result = Result(
-                    student_id=student_id,
-                    subject_id=bulk_data.subject_id,
-                    term_id=bulk_data.term_id,
-                    marks=marks,
-                    teacher_id=teacher.id
-                )
-                db.add(new_result)
-                created_count += 1
-        
-        except Exception as e:
-            errors.append(f"Error processing student {student_id}: {str(e)}")
+    # Validate the whole payload in memory
+    marks_by_student, errors = validate_bulk_items(bulk_data.results)
+    
+    # Verify every student belongs to this class with one query
+    class_members = filter_class_members(db, bulk_data.class_id, marks_by_student.keys())
+    for student_id in list(marks_by_student):
+        if student_id not in class_members:
+            errors.append(f"Student {student_id}: Not a student in this class")
+            del marks_by_student[student_id]
+    
+    # Write every valid row with INSERT ... ON CONFLICT DO UPDATE
+    statuses = upsert_results(
+        db,
+        bulk_data.subject_id,
+        bulk_data.term_id,
+        current_user.teacher_id,
+        marks_by_student
+    )
     
+    # Refresh class standings once for the whole batch
+    refresh_student_standings(db, statuses.keys(), bulk_data.term_id)
     db.commit()
     
+    created_count = sum(1 for result_status in statuses.values() if result_status == "created")
+    
     return {
         "message": "Bulk upload completed",
         "created": created_count,
-        "updated": updated_count,
-        "errors": errors
+        "updated": len(statuses) - created_count,
+        "errors": errors,
+        "rows": [
+            {"student_id": student_id, "status": result_status}
+            for student_id, result_status in statuses.items()
+        ]
     }
 
 
-@router.get("/results", response_model=List[ResultResponse])
-def get_my_results(
+@router.post("/results/import", status_code=status.HTTP_201_CREATED)
+def import_results(
+    subject_id: int = Form(...),
+    term_id: int = Form(...),
+    class_id: int = Form(...),
+    file: UploadFile = File(...),
+    current_user: Principal = Depends(require_role("teacher")),
+    db: Session = Depends(get_db)
+):
+    """Import marks for a class from a CSV or XLSX mark sheet (admission_number, marks columns)"""
+    # Teacher profile ID comes with the authenticated principal
+    if current_user.teacher_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Teacher profile not found"
+        )
+    
+    # Verify teacher is assigned to teach this subject to this class
+    assignment = db.query(TeacherAssignment).filter(
+        TeacherAssignment.teacher_id == current_user.teacher_id,
+        TeacherAssignment.subject_id == subject_id,
+        TeacherAssignment.class_id == class_id,
+        TeacherAssignment.term_id == term_id
+    ).first()
+    
+    if not assignment:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not assigned to teach this subject to this class"
+        )
+    
+    # Stream the sheet row by row, writing valid rows in chunks
+    try:
+        rows = iter_mark_sheet_rows(file.filename, file.file)
+        report = import_mark_sheet(db, rows, class_id, subject_id, term_id, current_user.teacher_id)
+    except MarkSheetError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Refresh class standings once for the whole sheet
+    refresh_student_standings(db, report.pop("student_ids"), term_id)
+    db.commit()
+    
+    return {
+        "message": "Mark sheet imported",
+        **report
+    }
+
+
+@router.get("/results", response_model=List[ResultResponse], dependencies=[Depends(query_budget(2))])
+async def get_my_results(
     class_id: int = None,
     subject_id: int = None,
     term_id: int = None,
-    current_user: User = Depends(require_role("teacher")),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(require_role("teacher")),
+    db=Depends(get_read_session)
 ):
     """Get results uploaded by the logged-in teacher"""
-    # Get teacher record
-    teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-    if not teacher:
+    # Teacher profile ID comes with the authenticated principal
+    if current_user.teacher_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Teacher profile not found"
         )
     
-    # Query results
-    query = db.query(Result).filter(Result.teacher_id == teacher.id)
+    # Query results with student, subject and term names in one statement
+    query = result_projection_query().where(Result.teacher_id == current_user.teacher_id)
     
     if subject_id:
-        query = query.filter(Result.subject_id == subject_id)
+        query = query.where(Result.subject_id == subject_id)
     if term_id:
-        query = query.filter(Result.term_id == term_id)
-    
-    results = query.all()
-    
-    # Filter by class if provided
+        query = query.where(Result.term_id == term_id)
     if class_id:
-        results = [r for r in results if r.student.class_id == class_id]
+        query = query.where(Student.class_id == class_id)
     
-    # Build response
-    response = []
-    for result in results:
-        student = db.query(Student).filter(Student.id == result.student_id).first()
-        subject = db.query(Subject).filter(Subject.id == result.subject_id).first()
-        term = db.query(Term).filter(Term.id == result.term_id).first()
-        
-        response.append(ResultResponse(
-            id=result.id,
-            student_id=result.student_id,
-            subject_id=result.subject_id,
-            term_id=result.term_id,
-            marks=result.marks,
-            teacher_id=result.teacher_id,
-            student_name=f"{student.first_name} {student.last_name}" if student else "Unknown",
-            subject_name=subject.name if subject else "Unknown",
-            term_name=term.name if term else "Unknown",
-            uploaded_at=result.uploaded_at
-        ))
-    
-    return response
+    # Rows go straight to JSON; the response model only documents the shape
+    rows = await run_in_session(db, fetch_all, query)
+    return FastJSONResponse([result_row_dict(row) for row in rows])
 
 
 @router.put("/results/{result_id}", response_model=ResultResponse)
 def update_result(
     result_id: int,
     result_data: ResultUpdate,
-    current_user: User = Depends(require_role("teacher")),
+    current_user: Principal = Depends(require_role("teacher")),
     db: Session = Depends(get_db)
 ):
     """Update a result (change marks)"""
-    # Get teacher record
-    teacher = db.query(Teacher).filter(Teacher.user_id == current_user.id).first()
-    if not teacher:
+    # Teacher profile ID comes with the authenticated principal
+    if current_user.teacher_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Teacher profile not found"
@@ -375,7 +493,7 @@ def update_result(
         )
     
     # Verify teacher owns this result
-    if result.teacher_id != teacher.id:
+    if result.teacher_id != current_user.teacher_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="You can only update results you uploaded"
@@ -390,25 +508,10 @@ def update_result(
     
     # Update marks
     result.marks = result_data.marks
+    db.flush()
+    refresh_student_standings(db, [result.student_id], result.term_id)
     db.commit()
-    db.refresh(result)
-    
-    # Build response
-    student = db.query(Student).filter(Student.id == result.student_id).first()
-    subject = db.query(Subject).filter(Subject.id == result.subject_id).first()
-    term = db.query(Term).filter(Term.id == result.term_id).first()
-    
-    response = ResultResponse(
-        id=result.id,
-        student_id=result.student_id,
-        subject_id=result.subject_id,
-        term_id=result.term_id,
-        marks=result.marks,
-        teacher_id=result.teacher_id,
-        student_name=f"{student.first_name} {student.last_name}",
-        subject_name=subject.name,
-        term_name=term.name,
-        uploaded_at=result.uploaded_at
-    )
     
-    return response
\ No newline at end of file
+    # Build response from the updated row
+    row = db.execute(result_projection_query().where(Result.id == result_id)).one()
+    return to_result_response(row)
\ No newline at end of file
@@ -1,8 +1,19 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Generic, List, Optional, TypeVar
 from datetime import date, datetime
 
 
+T = TypeVar("T")
+
+
+# Pagination
+class Page(BaseModel, Generic[T]):
+    """One page of a keyset-paginated list"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
 # User schemas
 class UserBase(BaseModel):
     email: EmailStr
@@ -113,6 +124,7 @@ class TeacherResponse(TeacherBase):
     id: int
     email: EmailStr
     created_at: datetime
+    assignment_count: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -196,4 +208,48 @@ class BulkResultCreate(BaseModel):
     term_id: int
     class_id: int
     results: list[dict] # list of {studen_id: int, marks: float}
-    
\ No newline at end of file
+
+
+# Grading scheme schemas
+class GradeBoundarySchema(BaseModel):
+    """Marks at or above min_marks (up to the next boundary) earn this grade"""
+    min_marks: float = Field(ge=0, le=100)
+    grade: str = Field(min_length=1, max_length=10)
+    
+    class Config:
+        from_attributes = True
+
+
+class GradingSchemeBase(BaseModel):
+    name: str
+    level: Optional[int] = Field(None, description="Class level this scheme grades; omit for every level")
+    subject_id: Optional[int] = Field(None, description="Subject this scheme grades; omit for every subject")
+    boundaries: List[GradeBoundarySchema]
+
+
+class GradingSchemeCreate(GradingSchemeBase):
+    pass
+
+
+class GradingSchemeUpdate(BaseModel):
+    name: Optional[str] = None
+    level: Optional[int] = None
+    subject_id: Optional[int] = None
+    boundaries: Optional[List[GradeBoundarySchema]] = None
+
+
+class GradingSchemeResponse(GradingSchemeBase):
+    id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+# Profiling schemas
+class ProfileStart(BaseModel):
+    """Which requests to sample, how often, and for how long"""
+    pattern: str = Field(min_length=1, description="Request path glob, e.g. /api/student/results*")
+    sample_rate: float = Field(1.0, gt=0, le=1, description="Fraction of matching requests to profile")
+    interval_ms: float = Field(5, ge=1, le=1000, description="Milliseconds between stack samples")
+    seconds: float = Field(60, gt=0, description="Stop automatically after this long")
@@ -0,0 +1,191 @@
+import argparse
+import sys
+from typing import Iterable, List, Optional
+from sqlalchemy import delete, exists, func, select, true
+from sqlalchemy.orm import Session
+from app import mark_versions, refdata
+from app.bulk_results import dialect_insert
+from app.models import Class, ClassStanding, Result, Student, Term
+from app.ranking import class_ranking_query, term_ranking_query
+
+STANDING_COLUMNS = [
+    "student_id",
+    "class_id",
+    "term_id",
+    "total_marks",
+    "average_marks",
+    "subject_count",
+    "position",
+    "total_students",
+]
+
+
+def _upsert_ranked(db: Session, ranking_query):
+    """Write ranking rows into class_standings with a single INSERT ... SELECT, updating existing rows"""
+    # Rows are updated in place rather than deleted first: the ranking reads the class each
+    # standing records, which is how earlier terms keep the class a student was in at the time
+    ranked = ranking_query.subquery()
+    # SQLite needs a WHERE on the SELECT to tell its ON CONFLICT apart from a join's ON
+    source = select(*[ranked.c[name] for name in STANDING_COLUMNS], func.now()).where(true())
+    _, insert = dialect_insert(db)
+    statement = insert(ClassStanding).from_select(STANDING_COLUMNS + ["updated_at"], source)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=["student_id", "term_id"],
+        set_={name: statement.excluded[name] for name in STANDING_COLUMNS[1:] + ["updated_at"]}
+    ))
+
+
+def _without_results(term_id: int):
+    """Standings of a term whose student has no marks left in it"""
+    return ~exists().where(Result.student_id == ClassStanding.student_id, Result.term_id == term_id)
+
+
+def lock_class_term(db: Session, class_id: int, term_id: int):
+    """Hold off other standings writers for this class and term until the transaction ends"""
+    # Without it two concurrent refreshes can each write a ranking computed before the other's rows.
+    # SQLite already serializes writers on its database lock
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(class_id, term_id)))
+
+
+def refresh_class_standings(db: Session, class_id: int, term_id: int, tie_policy: Optional[str] = None):
+    """Recompute the standings of one class for one term (does not commit)"""
+    lock_class_term(db, class_id, term_id)
+    _upsert_ranked(db, class_ranking_query(class_id, term_id, tie_policy))
+    db.execute(
+        delete(ClassStanding).where(
+            ClassStanding.class_id == class_id,
+            ClassStanding.term_id == term_id,
+            _without_results(term_id)
+        )
+    )
+    # Every change to a class's marks for a term comes through here
+    mark_versions.invalidate(db, term_id, [class_id])
+
+
+def refresh_student_standings(db: Session, student_ids: Iterable[int], term_id: int):
+    """Refresh the standings of every class touched by a change to these students' marks"""
+    student_ids = set(student_ids)
+    if not student_ids:
+        return
+
+    # Students may still have a stale row under a class they have left
+    class_ids = set(db.scalars(
+        select(Student.class_id).where(Student.id.in_(student_ids), Student.class_id.isnot(None))
+    ))
+    class_ids.update(db.scalars(
+        select(ClassStanding.class_id).where(
+            ClassStanding.student_id.in_(student_ids),
+            ClassStanding.term_id == term_id
+        )
+    ))
+
+    # Locks are always taken in class order so two writers cannot deadlock
+    for class_id in sorted(class_ids):
+        refresh_class_standings(db, class_id, term_id)
+
+
+def refresh_moved_student(db: Session, student_id: int, class_ids: Iterable[int]):
+    """Move a student's active-term standing to their current class and re-rank the classes involved"""
+    # Earlier terms stay ranked in the class the student was in at the time
+    term = refdata.get_active_term(db)
+    if term is None:
+        return
+
+    class_ids = sorted({class_id for class_id in class_ids if class_id is not None})
+    for class_id in class_ids:
+        lock_class_term(db, class_id, term.id)
+    # With the recorded row gone the ranking falls back to the student's current class
+    db.execute(
+        delete(ClassStanding).where(ClassStanding.student_id == student_id, ClassStanding.term_id == term.id)
+    )
+    for class_id in class_ids:
+        refresh_class_standings(db, class_id, term.id)
+
+
+def rebuild_term_standings(db: Session, term_id: int, tie_policy: Optional[str] = None):
+    """Recompute the standings of every class for a term (does not commit)"""
+    class_ids = db.scalars(select(Class.id).order_by(Class.id)).all()
+    for class_id in class_ids:
+        lock_class_term(db, class_id, term_id)
+    _upsert_ranked(db, term_ranking_query(term_id, tie_policy))
+    db.execute(delete(ClassStanding).where(ClassStanding.term_id == term_id, _without_results(term_id)))
+    mark_versions.invalidate(db, term_id, class_ids)
+
+
+def check_term_standings(db: Session, term_id: int, tie_policy: Optional[str] = None) -> List[dict]:
+    """Compare stored standings against live results and return every difference"""
+    expected = {row.student_id: row for row in db.execute(term_ranking_query(term_id, tie_policy))}
+    actual = {
+        row.student_id: row
+        for row in db.scalars(select(ClassStanding).where(ClassStanding.term_id == term_id))
+    }
+
+    problems = []
+    for student_id in sorted(expected.keys() | actual.keys()):
+        live = expected.get(student_id)
+        stored = actual.get(student_id)
+        if stored is None:
+            problems.append({"student_id": student_id, "term_id": term_id, "problem": "missing"})
+            continue
+        if live is None:
+            problems.append({"student_id": student_id, "term_id": term_id, "problem": "unexpected"})
+            continue
+
+        for name in STANDING_COLUMNS[1:]:
+            live_value = getattr(live, name)
+            stored_value = getattr(stored, name)
+            if name in ("total_marks", "average_marks"):
+                mismatch = abs(float(live_value) - float(stored_value)) > 0.005
+            else:
+                mismatch = live_value != stored_value
+            if mismatch:
+                problems.append({
+                    "student_id": student_id,
+                    "term_id": term_id,
+                    "problem": "mismatch",
+                    "field": name,
+                    "expected": float(live_value) if name.endswith("_marks") else live_value,
+                    "actual": float(stored_value) if name.endswith("_marks") else stored_value
+                })
+
+    return problems
+
+
+def main(argv=None):
+    """Command line entry point: python -m app.standings {rebuild,check}"""
+    parser = argparse.ArgumentParser(description="Rebuild or check the class_standings table")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--term-id", type=int, help="Only this term (default: all terms)")
+    parser.add_argument("--tie-policy", help="Override RANKING_TIE_POLICY")
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if args.term_id:
+            term_ids = [args.term_id]
+        else:
+            term_ids = db.scalars(select(Term.id).order_by(Term.id)).all()
+
+        if args.command == "rebuild":
+            for term_id in term_ids:
+                rebuild_term_standings(db, term_id, args.tie_policy)
+                print(f"Rebuilt standings for term {term_id}")
+            db.commit()
+            return 0
+
+        problems = []
+        for term_id in term_ids:
+            problems.extend(check_term_standings(db, term_id, args.tie_policy))
+        for problem in problems:
+            print(problem)
+        print(f"{len(problems)} inconsistencies found across {len(term_ids)} term(s)")
+        return 1 if problems else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
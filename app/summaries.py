@@ -0,0 +1,187 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from app import mark_versions, refdata
+from app.database import run_in_session
+from app.models import ClassStanding, Result
+
+# Longest a class's summaries are served from memory; mark and grading scheme changes drop them sooner
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "30"))
+
+# (class, term) pairs kept per worker
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "500"))
+
+
+def class_sheet_query(class_id: int, term_id: int):
+    """Every mark of the students ranked in a class for a term, with their standing: one row per mark"""
+    return (
+        select(
+            Result.student_id,
+            Result.subject_id,
+            Result.marks,
+            ClassStanding.total_marks,
+            ClassStanding.average_marks,
+            ClassStanding.position,
+            ClassStanding.total_students
+        )
+        .join(
+            ClassStanding,
+            and_(ClassStanding.student_id == Result.student_id, ClassStanding.term_id == Result.term_id)
+        )
+        # Standings record the class a student was in that term, which may not be their class now
+        .where(ClassStanding.class_id == class_id, ClassStanding.term_id == term_id)
+        .order_by(Result.id)
+    )
+
+
+def build_class_sheet(db: Session, class_id: int, term_id: int) -> dict:
+    """The summary fields of every ranked student in a class for a term, keyed by student ID"""
+    class_obj = refdata.get_class(db, class_id)
+    level = class_obj.level if class_obj else None
+
+    sheet = {}
+    for row in db.execute(class_sheet_query(class_id, term_id)):
+        entry = sheet.get(row.student_id)
+        if entry is None:
+            entry = sheet[row.student_id] = {
+                "results": [],
+                "total_marks": float(row.total_marks),
+                "average_marks": round(float(row.average_marks), 2),
+                "position": row.position,
+                "total_students": row.total_students
+            }
+        subject = refdata.get_subject(db, row.subject_id)
+        marks = float(row.marks)
+        entry["results"].append({
+            "subject_id": row.subject_id,
+            "subject_name": subject.name if subject else "Unknown",
+            "marks": marks,
+            "grade": refdata.get_grading_scheme(db, level, row.subject_id).grade(marks)
+        })
+    return sheet
+
+
+class ClassSummaryCache:
+    """LRU of class sheets per (class, term) with a time-to-live, tagged with mark and reference data versions"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # (class, term, versions) -> task building that sheet; only touched on the event loop
+        self._loading = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.computations = 0
+        self.coalesced = 0
+
+    def _valid(self, key: tuple, versions: tuple) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic() or entry[1] != versions:
+            return None
+        return entry[2]
+
+    def lookup(self, db: Session, class_id: int, term_id: int) -> Tuple[tuple, Optional[dict]]:
+        """Current versions for the pair and its cached sheet, if still valid"""
+        # Grades depend on the grading schemes, which change with the reference data version
+        versions = (refdata.cache.version,) + mark_versions.current(db, term_id, [class_id])
+        key = (class_id, term_id)
+        with self._lock:
+            sheet = self._valid(key, versions)
+            if sheet is None:
+                if self._entries.pop(key, None) is not None:
+                    self.stale += 1
+                self.misses += 1
+                return versions, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return versions, sheet
+
+    def put(self, class_id: int, term_id: int, versions: tuple, sheet: dict):
+        key = (class_id, term_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, versions, sheet)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def load(
+        self,
+        class_id: int,
+        term_id: int,
+        versions: tuple,
+        build: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        """Build a missing sheet once, however many requests are waiting for it"""
+        flight = (class_id, term_id, versions)
+        task = self._loading.get(flight)
+        if task is None:
+            # A build that finished after this request's lookup has already cached the sheet
+            with self._lock:
+                sheet = self._valid((class_id, term_id), versions)
+            if sheet is not None:
+                self.coalesced += 1
+                return sheet
+            self.computations += 1
+            task = self._loading[flight] = asyncio.ensure_future(self._build(flight, build))
+        else:
+            self.coalesced += 1
+        # Shielded so one cancelled request does not cancel the build the others are waiting on
+        return await asyncio.shield(task)
+
+    async def _build(self, flight: tuple, build: Callable[[], Awaitable[dict]]) -> dict:
+        try:
+            sheet = await build()
+        finally:
+            del self._loading[flight]
+        # Versions were taken before the marks were read, so a concurrent change leaves the entry stale rather than wrong
+        class_id, term_id, versions = flight
+        self.put(class_id, term_id, versions, sheet)
+        return sheet
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Counters and size for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "computations": self.computations,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._loading),
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+cache = ClassSummaryCache(SUMMARY_CACHE_SIZE, SUMMARY_CACHE_TTL_SECONDS)
+
+
+async def get_class_sheet(db, class_id: int, term_id: int, versions: tuple, sheet: Optional[dict]) -> dict:
+    """The sheet from a lookup, or built now (shared with concurrent requests) when the lookup missed"""
+    if sheet is not None:
+        return sheet
+    return await cache.load(
+        class_id, term_id, versions, lambda: run_in_session(db, build_class_sheet, class_id, term_id)
+    )
+
+
+def cache_stats() -> dict:
+    """Hit/miss and coalescing counters for this worker"""
+    return cache.stats()
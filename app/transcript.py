@@ -0,0 +1,109 @@
+from typing import Optional
+from sqlalchemy import and_, select
+from sqlalchemy.orm import Session
+from app import refdata
+from app.models import ClassStanding, Result
+
+
+def transcript_query(student_id: int):
+    """Every mark a student has, with that term's standing alongside: one row per mark"""
+    return (
+        select(
+            Result.term_id,
+            Result.subject_id,
+            Result.marks,
+            ClassStanding.class_id,
+            ClassStanding.total_marks,
+            ClassStanding.average_marks,
+            ClassStanding.position,
+            ClassStanding.total_students
+        )
+        .outerjoin(
+            ClassStanding,
+            and_(ClassStanding.student_id == Result.student_id, ClassStanding.term_id == Result.term_id)
+        )
+        .where(Result.student_id == student_id)
+    )
+
+
+def _change(current: Optional[float], previous: Optional[float]) -> Optional[float]:
+    if current is None or previous is None:
+        return None
+    return round(current - previous, 2)
+
+
+def build_transcript_terms(db: Session, student_id: int, current_class_id: Optional[int]) -> list:
+    """One entry per term with marks, oldest first, each compared with the term before it"""
+    terms = {}
+    for row in db.execute(transcript_query(student_id)):
+        term = terms.get(row.term_id)
+        if term is None:
+            term = terms[row.term_id] = {"standing": row, "marks": {}}
+        term["marks"][row.subject_id] = float(row.marks)
+
+    def term_order(term_id):
+        term = refdata.get_term(db, term_id)
+        return (term.year, term.term_number, term_id) if term else (0, 0, term_id)
+
+    entries = []
+    previous = None
+    previous_marks = {}
+    for term_id in sorted(terms, key=term_order):
+        standing = terms[term_id]["standing"]
+        marks = terms[term_id]["marks"]
+
+        # Grade by the class the student was in that term; standings keep it when they move class
+        class_id = standing.class_id if standing.class_id is not None else current_class_id
+        class_obj = refdata.get_class(db, class_id)
+        level = class_obj.level if class_obj else None
+
+        results = []
+        for subject_id, value in marks.items():
+            subject = refdata.get_subject(db, subject_id)
+            results.append({
+                "subject_id": subject_id,
+                "subject_name": subject.name if subject else "Unknown",
+                "marks": value,
+                "grade": refdata.get_grading_scheme(db, level, subject_id).grade(value),
+                "marks_change": _change(value, previous_marks.get(subject_id))
+            })
+        results.sort(key=lambda item: (item["subject_name"], item["subject_id"]))
+
+        # Totals come from the standings read model; terms it has not covered yet are summed here
+        if standing.total_marks is not None:
+            total = float(standing.total_marks)
+            average = round(float(standing.average_marks), 2)
+        else:
+            total = round(sum(marks.values()), 2)
+            average = round(total / len(marks), 2)
+        term = refdata.get_term(db, term_id)
+
+        entry = {
+            "term_id": term_id,
+            "term_name": term.name if term else "Unknown",
+            "year": term.year if term else None,
+            "term_number": term.term_number if term else None,
+            "class_id": class_id,
+            "class_name": class_obj.name if class_obj else None,
+            "results": results,
+            "total_marks": total,
+            "average_marks": average,
+            "subject_count": len(marks),
+            "position": standing.position,
+            "total_students": standing.total_students,
+            # Against the previous term with marks; a positive position change means moving up
+            "changes": {
+                "total_marks": _change(total, previous["total_marks"]),
+                "average_marks": _change(average, previous["average_marks"]),
+                "position": (
+                    previous["position"] - standing.position
+                    if previous["position"] is not None and standing.position is not None
+                    else None
+                )
+            } if previous else None
+        }
+        entries.append(entry)
+        previous = entry
+        previous_marks = marks
+
+    return entries
@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import httpx
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of latencies"""
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, samples: List[float]):
+    """Print count and latency percentiles in milliseconds"""
+    if not samples:
+        print(f"{name:<18} no samples")
+        return
+    print(
+        f"{name:<18} n={len(samples):<5} "
+        f"p50={percentile(samples, 50) * 1000:8.1f}ms "
+        f"p99={percentile(samples, 99) * 1000:8.1f}ms "
+        f"max={max(samples) * 1000:8.1f}ms "
+        f"mean={statistics.mean(samples) * 1000:8.1f}ms"
+    )
+
+
+async def poll_health(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> List[float]:
+    """Hit /health at a fixed interval until stopped, recording latencies"""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str, latencies: List[float], failures: List[int]):
+    """Log in once and record the latency"""
+    started = time.perf_counter()
+    response = await client.post("/api/auth/login", data={"username": email, "password": password})
+    latencies.append(time.perf_counter() - started)
+    if response.status_code != 200:
+        failures.append(response.status_code)
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.logins + 10)
+    async with httpx.AsyncClient(base_url=args.url, timeout=120, limits=limits) as client:
+        # Baseline: /health on an idle server
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_health(client, stop, args.interval))
+        await asyncio.sleep(args.baseline_seconds)
+        stop.set()
+        baseline = await poller
+
+        # Burst: every login fired at once while /health keeps being polled
+        stop = asyncio.Event()
+        poller = asyncio.create_task(poll_health(client, stop, args.interval))
+        login_latencies: List[float] = []
+        failures: List[int] = []
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            login(client, args.email, args.password, login_latencies, failures)
+            for _ in range(args.logins)
+        ])
+        elapsed = time.perf_counter() - started
+        stop.set()
+        during = await poller
+
+    print(f"{args.logins} logins in {elapsed:.1f}s ({args.logins / elapsed:.1f}/s), {len(failures)} failed")
+    summarize("/health idle", baseline)
+    summarize("/health in burst", during)
+    summarize("login", login_latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure /health latency while a burst of logins is in flight (requires httpx)"
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", required=True, help="An existing account to log in as")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.02, help="Seconds between /health probes")
+    parser.add_argument("--baseline-seconds", type=float, default=3.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
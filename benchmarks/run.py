@@ -0,0 +1,419 @@
+import argparse
+import asyncio
+import contextvars
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import fastapi.routing
+import httpx
+from sqlalchemy import select
+from starlette.responses import Response
+
+from app import database, querystats, summaries
+from app.auth import create_access_token
+from app.main import app
+from app.models import Class, Student, Teacher, TeacherAssignment, Term, User
+from benchmarks.seed import ADMIN_EMAIL, SEED_PASSWORD, UPLOAD_HALL_NAME
+
+
+# Seconds spent turning handler return values into response bytes, per timed request
+_serialize_seconds: contextvars.ContextVar = contextvars.ContextVar("benchmark_serialize_seconds", default=None)
+
+
+def _add_serialize_time(started: float):
+    spent = _serialize_seconds.get()
+    if spent is not None:
+        spent[0] += time.perf_counter() - started
+
+
+def instrument_serialization():
+    """Time response-model serialization and body rendering (JSON encoding) for every response"""
+    serialize_response = fastapi.routing.serialize_response
+    response_init = Response.__init__
+
+    async def timed_serialize_response(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await serialize_response(*args, **kwargs)
+        finally:
+            _add_serialize_time(started)
+
+    def timed_response_init(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            response_init(self, *args, **kwargs)
+        finally:
+            _add_serialize_time(started)
+
+    fastapi.routing.serialize_response = timed_serialize_response
+    Response.__init__ = timed_response_init
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    """Sends requests with bounded concurrency and records latency, status and SQL count"""
+
+    def __init__(self, client: httpx.AsyncClient, concurrency: int):
+        self.client = client
+        self.slots = asyncio.Semaphore(concurrency)
+        self.latencies: List[float] = []
+        self.statements: List[int] = []
+        self.wire_bytes: List[int] = []
+        self.serialize_seconds: List[float] = []
+        self.errors: Dict[int, int] = {}
+        self.elapsed = 0.0
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        async with self.slots:
+            started = time.perf_counter()
+            serialize_spent = [0.0]
+            token = _serialize_seconds.set(serialize_spent)
+            with querystats.track() as stats:
+                try:
+                    response = await self.client.request(method, url, **kwargs)
+                finally:
+                    self.latencies.append(time.perf_counter() - started)
+                    _serialize_seconds.reset(token)
+            self.statements.append(stats.statements)
+            # Body bytes as sent, before httpx decompresses them
+            self.wire_bytes.append(response.num_bytes_downloaded)
+            self.serialize_seconds.append(serialize_spent[0])
+            if response.status_code >= 400:
+                self.errors[response.status_code] = self.errors.get(response.status_code, 0) + 1
+            return response
+
+    def summary(self) -> dict:
+        if not self.latencies:
+            return {"requests": 0}
+        return {
+            "requests": len(self.latencies),
+            "errors": sum(self.errors.values()),
+            "error_codes": self.errors,
+            "seconds": round(self.elapsed, 3),
+            "requests_per_second": round(len(self.latencies) / self.elapsed, 1) if self.elapsed else None,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(self.latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 1),
+            "max_ms": round(max(self.latencies) * 1000, 1),
+            "sql_per_request": round(statistics.mean(self.statements), 2),
+            "sql_max": max(self.statements),
+            "bytes_per_request": round(statistics.mean(self.wire_bytes)),
+            "serialize_ms_per_request": round(statistics.mean(self.serialize_seconds) * 1000, 3)
+        }
+
+
+def bearer(email: str, role: str) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"sub": email, "role": role})}
+
+
+# ============= SCENARIOS =============
+
+async def login_storm(recorder: Recorder, fixtures: dict, args):
+    """Many students logging in at the same moment"""
+    emails = fixtures["student_emails"][: args.logins]
+    await asyncio.gather(*[
+        recorder.request("POST", "/api/auth/login", data={"username": email, "password": SEED_PASSWORD})
+        for email in emails
+    ])
+
+
+async def summary_storm(recorder: Recorder, fixtures: dict, args):
+    """Results release: students open their summary, then their results list"""
+    emails = fixtures["student_emails"][: args.students]
+
+    async def one_student(email: str):
+        headers = bearer(email, "student")
+        await recorder.request("GET", "/api/student/results/summary", headers=headers)
+        await recorder.request("GET", "/api/student/results", headers=headers)
+
+    await asyncio.gather(*[one_student(email) for email in emails])
+
+
+async def results_release(recorder: Recorder, fixtures: dict, args) -> dict:
+    """Results release on a cold cache: a burst of summary requests from a few classes at once"""
+    class_ids = sorted(fixtures["class_emails"])[: args.release_classes]
+    headers = [bearer(email, "student") for class_id in class_ids for email in fixtures["class_emails"][class_id]]
+
+    summaries.cache.clear()
+    before = summaries.cache_stats()
+    await asyncio.gather(*[
+        recorder.request("GET", "/api/student/results/summary", headers=headers[index % len(headers)])
+        for index in range(args.release_requests)
+    ])
+    after = summaries.cache_stats()
+    return {
+        "classes": len(class_ids),
+        "sheet_builds": after["computations"] - before["computations"],
+        "coalesced": after["coalesced"] - before["coalesced"]
+    }
+
+
+async def bulk_upload(recorder: Recorder, fixtures: dict, args):
+    """Teachers uploading a whole class's marks for one subject"""
+    rng = random.Random(args.seed)
+
+    async def one_upload(upload: dict):
+        results = [{"student_id": student_id, "marks": round(rng.uniform(20, 100), 1)} for student_id in upload["student_ids"]]
+        await recorder.request(
+            "POST",
+            "/api/teacher/results/bulk",
+            headers=bearer(upload["teacher_email"], "teacher"),
+            json={
+                "class_id": upload["class_id"],
+                "subject_id": upload["subject_id"],
+                "term_id": upload["term_id"],
+                "results": results
+            }
+        )
+
+    await asyncio.gather(*[one_upload(upload) for upload in fixtures["uploads"][: args.uploads]])
+
+
+async def bulk_upload_large(recorder: Recorder, fixtures: dict, args) -> dict:
+    """One teacher uploading a whole subject for the upload hall, one subject after another"""
+    uploads = fixtures["hall_uploads"][: args.hall_uploads]
+    if not uploads:
+        print("bulk_upload_large needs the upload hall; seed with --upload-hall-size 2000", file=sys.stderr)
+        return {}
+
+    # Load the teacher's principal outside the recorder, so every upload is measured alike
+    await recorder.client.get("/api/teacher/my-assignments", headers=bearer(uploads[0]["teacher_email"], "teacher"))
+
+    rng = random.Random(args.seed)
+    for upload in uploads:
+        results = [{"student_id": student_id, "marks": round(rng.uniform(20, 100), 1)} for student_id in upload["student_ids"]]
+        await recorder.request(
+            "POST",
+            "/api/teacher/results/bulk",
+            headers=bearer(upload["teacher_email"], "teacher"),
+            json={
+                "class_id": upload["class_id"],
+                "subject_id": upload["subject_id"],
+                "term_id": upload["term_id"],
+                "results": results
+            }
+        )
+    return {"rows_per_upload": len(uploads[0]["student_ids"])}
+
+
+async def admin_browse(recorder: Recorder, fixtures: dict, args):
+    """Admins paging through the big lists with and without filters"""
+    headers = bearer(ADMIN_EMAIL, "admin")
+    size = args.page_size
+    term_id = fixtures["active_term_id"]
+    class_id = fixtures["first_class_id"]
+
+    async def walk(url: str):
+        cursor = None
+        for _ in range(args.pages):
+            page_url = url + (f"&cursor={cursor}" if cursor else "")
+            response = await recorder.request("GET", page_url, headers=headers)
+            if response.status_code != 200:
+                return
+            cursor = response.json().get("next_cursor")
+            if not cursor:
+                return
+
+    await asyncio.gather(
+        walk(f"/api/admin/students?limit={size}&include_total=true"),
+        walk(f"/api/admin/students?limit={size}&sort=last_name"),
+        walk(f"/api/admin/students?limit={size}&class_id={class_id}"),
+        walk(f"/api/admin/students?limit={size}&name=A"),
+        walk(f"/api/admin/teachers?limit={size}"),
+        walk(f"/api/admin/assignments?limit={size}&term_id={term_id}"),
+        walk(f"/api/admin/users?limit={size}&role=student"),
+        *[recorder.request("GET", path, headers=headers) for path in ("/api/admin/classes", "/api/admin/subjects", "/api/admin/terms")]
+    )
+
+
+SCENARIOS = {
+    "login_storm": login_storm,
+    "summary_storm": summary_storm,
+    "results_release": results_release,
+    "bulk_upload": bulk_upload,
+    "bulk_upload_large": bulk_upload_large,
+    "admin_browse": admin_browse,
+}
+
+
+def load_fixtures() -> dict:
+    """Read the accounts and assignments the scenarios need from the seeded database"""
+    db = database.SessionLocal()
+    try:
+        active_term = db.scalar(select(Term).where(Term.is_active.is_(True)))
+        if active_term is None:
+            raise SystemExit("No active term found; seed the database first (python -m benchmarks.seed)")
+
+        # The upload hall only serves the large upload scenario
+        hall_id = db.scalar(select(Class.id).where(Class.name == UPLOAD_HALL_NAME))
+
+        class_students: Dict[int, List[int]] = {}
+        class_emails: Dict[int, List[str]] = {}
+        for student_id, class_id, email in db.execute(
+            select(Student.id, Student.class_id, User.email).join(User, User.id == Student.user_id).order_by(Student.id)
+        ):
+            class_students.setdefault(class_id, []).append(student_id)
+            class_emails.setdefault(class_id, []).append(email)
+        hall_students = class_students.pop(hall_id, [])
+        class_emails.pop(hall_id, None)
+        student_emails = [email for emails in class_emails.values() for email in emails]
+
+        uploads, hall_uploads = [], []
+        for row in db.execute(
+            select(User.email, TeacherAssignment.class_id, TeacherAssignment.subject_id, TeacherAssignment.term_id)
+            .join(Teacher, Teacher.id == TeacherAssignment.teacher_id)
+            .join(User, User.id == Teacher.user_id)
+            .where(TeacherAssignment.term_id == active_term.id)
+            .order_by(TeacherAssignment.id)
+        ):
+            upload = {
+                "teacher_email": row.email,
+                "class_id": row.class_id,
+                "subject_id": row.subject_id,
+                "term_id": row.term_id,
+                "student_ids": hall_students if row.class_id == hall_id else class_students.get(row.class_id, [])
+            }
+            (hall_uploads if row.class_id == hall_id else uploads).append(upload)
+
+        # Spread the storms across classes instead of hammering the first one
+        random.Random(0).shuffle(student_emails)
+
+        return {
+            "active_term_id": active_term.id,
+            "first_class_id": min(class_students) if class_students else None,
+            "student_emails": student_emails,
+            "class_emails": class_emails,
+            "uploads": uploads,
+            "hall_uploads": hall_uploads,
+            "students": len(student_emails),
+            "classes": len(class_students)
+        }
+    finally:
+        db.close()
+
+
+async def run(args) -> dict:
+    querystats.instrument_all()
+    instrument_serialization()
+    fixtures = load_fixtures()
+    results = {}
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name in args.scenarios:
+                recorder = Recorder(client, args.concurrency)
+                started = time.perf_counter()
+                details = await SCENARIOS[name](recorder, fixtures, args)
+                recorder.elapsed = time.perf_counter() - started
+                results[name] = recorder.summary()
+                if details:
+                    results[name]["details"] = details
+                print_row(name, results[name])
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "database": database.engine.dialect.name,
+            "database_mode": database.DATABASE_MODE,
+            "students": fixtures["students"],
+            "classes": fixtures["classes"],
+            "concurrency": args.concurrency
+        },
+        "scenarios": results
+    }
+
+
+def print_row(name: str, summary: dict):
+    if not summary.get("requests"):
+        print(f"{name:<17} no requests")
+        return
+    print(
+        f"{name:<17} {summary['requests']:>6} req {summary['errors']:>4} err "
+        f"{summary['requests_per_second'] or 0:>8.1f} req/s  "
+        f"p50 {summary['p50_ms']:>8.1f}  p95 {summary['p95_ms']:>8.1f}  p99 {summary['p99_ms']:>8.1f} ms  "
+        f"sql/req {summary['sql_per_request']:>6.2f} (max {summary['sql_max']})  "
+        f"{summary['bytes_per_request']:>8} B/req  serialize {summary['serialize_ms_per_request']:>7.3f} ms/req"
+    )
+    if summary.get("details"):
+        print(" " * 18 + ", ".join(f"{key} {value}" for key, value in summary["details"].items()))
+
+
+def compare(current: dict, baseline: dict, latency_tolerance: float) -> List[str]:
+    """List regressions against a stored baseline"""
+    regressions = []
+    for name, now in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before or not now.get("requests") or not before.get("requests"):
+            continue
+        # Statement counts do not depend on hardware, so any increase is a regression
+        if now["sql_per_request"] > before["sql_per_request"] + 0.01:
+            regressions.append(f"{name}: sql/request {before['sql_per_request']} -> {now['sql_per_request']}")
+        if now["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {now['errors']}")
+        for key in ("p95_ms", "p99_ms"):
+            if now[key] > before[key] * (1 + latency_tolerance):
+                regressions.append(f"{name}: {key} {before[key]} -> {now[key]}")
+    return regressions
+
+
+def main(argv=None):
+    """Command line entry point: python -m benchmarks.run"""
+    parser = argparse.ArgumentParser(description="Drive app.main:app in-process through load scenarios")
+    parser.add_argument("scenarios", nargs="*", metavar="SCENARIO", help="Scenarios to run (default: all of " + ", ".join(SCENARIOS) + ")")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight at once")
+    parser.add_argument("--logins", type=int, default=50, help="Logins in the login storm")
+    parser.add_argument("--students", type=int, default=300, help="Students in the summary storm")
+    parser.add_argument("--release-requests", type=int, default=1000, help="Summary requests in the results release burst")
+    parser.add_argument("--release-classes", type=int, default=10, help="Classes the results release burst comes from")
+    parser.add_argument("--uploads", type=int, default=40, help="Class uploads in the bulk upload scenario")
+    parser.add_argument("--hall-uploads", type=int, default=5, help="Upload hall subjects in the large bulk upload scenario")
+    parser.add_argument("--pages", type=int, default=10, help="Pages walked per admin list")
+    parser.add_argument("--page-size", type=int, default=50, help="Items per admin list page")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Store the results as the new baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="Compare with a stored baseline and fail on regressions")
+    parser.add_argument(
+        "--latency-tolerance", type=float, default=0.5,
+        help="Allowed p95/p99 growth over the baseline before failing (0.5 = +50%%)"
+    )
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error("unknown scenario(s): " + ", ".join(unknown))
+    args.scenarios = args.scenarios or list(SCENARIOS)
+
+    report = asyncio.run(run(args))
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.latency_tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        print(f"{len(regressions)} regression(s) against {args.baseline}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+import argparse
+import random
+import sys
+import time
+from datetime import date
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.auth import get_password_hash
+from app.database import Base, SessionLocal, engine
+from app.models import (
+    CacheVersion, Class, ClassStanding, GradeBoundary, GradingScheme, Result, Student, Subject, Teacher,
+    TeacherAssignment, Term, User
+)
+from app.standings import rebuild_term_standings
+
+# Every seeded account shares this password; it is hashed once, not per account
+SEED_PASSWORD = "password"
+ADMIN_EMAIL = "admin@bench.school"
+
+# Rows per executemany batch
+BATCH_SIZE = 5000
+
+# One class far larger than the rest, for the large bulk upload scenario; it has no marks
+# and the other scenarios leave it out
+UPLOAD_HALL_NAME = "Upload Hall"
+
+SUBJECT_NAMES = [
+    "Mathematics", "English", "Kiswahili", "Biology", "Chemistry", "Physics", "History",
+    "Geography", "Civics", "Commerce", "Bookkeeping", "Computer Studies", "Literature", "French"
+]
+FIRST_NAMES = ["Amani", "Baraka", "Neema", "Juma", "Rehema", "Faraja", "Zawadi", "Imani", "Saida", "Hamisi", "Upendo", "Musa"]
+LAST_NAMES = ["Mollel", "Mushi", "Kimaro", "Massawe", "Mwakyusa", "Lyimo", "Shirima", "Swai", "Temba", "Minja"]
+
+
+def student_email(class_index: int, seat: int) -> str:
+    return f"student.{class_index}.{seat}@bench.school"
+
+
+def teacher_email(index: int) -> str:
+    return f"teacher.{index}@bench.school"
+
+
+def _insert_returning_ids(db: Session, model, rows: list) -> list:
+    """Bulk insert rows in batches, returning the new IDs in input order"""
+    ids = []
+    for start in range(0, len(rows), BATCH_SIZE):
+        ids.extend(db.scalars(
+            insert(model).returning(model.id, sort_by_parameter_order=True),
+            rows[start:start + BATCH_SIZE]
+        ).all())
+    return ids
+
+
+def _insert(db: Session, model, rows: list):
+    """Bulk insert rows in batches without reading anything back"""
+    for start in range(0, len(rows), BATCH_SIZE):
+        db.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def reset(db: Session):
+    """Delete every row the seeder creates, children first"""
+    for model in (
+        ClassStanding, Result, TeacherAssignment, Student, Teacher, User, GradeBoundary, GradingScheme,
+        Term, Subject, Class, CacheVersion
+    ):
+        db.execute(delete(model))
+
+
+def seed(
+    db: Session,
+    classes: int,
+    students_per_class: int,
+    subjects: int,
+    teachers: int,
+    terms: int,
+    seed_value: int = 42,
+    upload_hall_size: int = 0
+) -> dict:
+    """Create a synthetic school with bulk inserts (does not commit)"""
+    rng = random.Random(seed_value)
+    password_hash = get_password_hash(SEED_PASSWORD)
+    started = time.perf_counter()
+
+    class_ids = _insert_returning_ids(db, Class, [
+        {"name": f"Form {index // 4 + 1}{'ABCD'[index % 4]}", "level": index // 4 + 1}
+        for index in range(classes)
+    ])
+    subject_ids = _insert_returning_ids(db, Subject, [
+        {
+            "name": SUBJECT_NAMES[index] if index < len(SUBJECT_NAMES) else f"Subject {index + 1}",
+            "code": f"S{index + 1:03d}"
+        }
+        for index in range(subjects)
+    ])
+
+    # Terms run oldest to newest; the newest is the active one
+    current_year = date.today().year
+    term_rows = []
+    for index in range(terms):
+        year = current_year - (terms - 1 - index) // 3
+        term_number = (index % 3) + 1
+        term_rows.append({
+            "name": f"Term {term_number} {year}",
+            "year": year,
+            "term_number": term_number,
+            "is_active": index == terms - 1
+        })
+    term_ids = _insert_returning_ids(db, Term, term_rows)
+
+    # Accounts: one admin, the teachers, then every student
+    admin_ids = _insert_returning_ids(db, User, [{"email": ADMIN_EMAIL, "password_hash": password_hash, "role": "admin"}])
+    teacher_user_ids = _insert_returning_ids(db, User, [
+        {"email": teacher_email(index), "password_hash": password_hash, "role": "teacher"}
+        for index in range(teachers)
+    ])
+    teacher_ids = _insert_returning_ids(db, Teacher, [
+        {"user_id": user_id, "first_name": rng.choice(FIRST_NAMES), "last_name": rng.choice(LAST_NAMES)}
+        for user_id in teacher_user_ids
+    ])
+
+    seats = [(class_index, seat) for class_index in range(classes) for seat in range(students_per_class)]
+    student_user_ids = _insert_returning_ids(db, User, [
+        {"email": student_email(class_index, seat), "password_hash": password_hash, "role": "student"}
+        for class_index, seat in seats
+    ])
+    student_ids = _insert_returning_ids(db, Student, [
+        {
+            "user_id": user_id,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "admission_number": f"ADM{class_index:03d}{seat:04d}",
+            "gender": rng.choice(["Male", "Female"]),
+            "class_id": class_ids[class_index]
+        }
+        for user_id, (class_index, seat) in zip(student_user_ids, seats)
+    ])
+
+    # Each class/subject pair is taught by one teacher, the same one every term
+    teacher_for = {
+        (class_id, subject_id): teacher_ids[(class_index * subjects + subject_index) % teachers]
+        for class_index, class_id in enumerate(class_ids)
+        for subject_index, subject_id in enumerate(subject_ids)
+    }
+    _insert(db, TeacherAssignment, [
+        {"teacher_id": teacher_id, "subject_id": subject_id, "class_id": class_id, "term_id": term_id}
+        for term_id in term_ids
+        for (class_id, subject_id), teacher_id in teacher_for.items()
+    ])
+
+    # Marks for every student in every subject and term, except the active term is left
+    # partly empty so uploads have something to create
+    student_classes = [class_ids[class_index] for class_index, _ in seats]
+    ability = [rng.gauss(60, 12) for _ in student_ids]
+    result_rows = []
+    for term_index, term_id in enumerate(term_ids):
+        graded_subjects = subject_ids if term_index < len(term_ids) - 1 else subject_ids[: max(1, len(subject_ids) // 2)]
+        for student_id, class_id, skill in zip(student_ids, student_classes, ability):
+            for subject_id in graded_subjects:
+                marks = min(100.0, max(0.0, round(rng.gauss(skill, 10), 1)))
+                result_rows.append({
+                    "student_id": student_id,
+                    "subject_id": subject_id,
+                    "term_id": term_id,
+                    "marks": marks,
+                    "teacher_id": teacher_for[(class_id, subject_id)]
+                })
+    _insert(db, Result, result_rows)
+
+    hall_students = 0
+    if upload_hall_size:
+        hall_students = len(_seed_upload_hall(db, rng, password_hash, upload_hall_size, subject_ids, term_ids[-1], teacher_ids[0]))
+    db.flush()
+
+    for term_id in term_ids:
+        rebuild_term_standings(db, term_id)
+
+    return {
+        "classes": len(class_ids),
+        "subjects": len(subject_ids),
+        "terms": len(term_ids),
+        "teachers": len(teacher_ids),
+        "students": len(student_ids),
+        "upload_hall": hall_students,
+        "assignments": len(teacher_for) * len(term_ids),
+        "results": len(result_rows),
+        "admin_user_id": admin_ids[0],
+        "seconds": round(time.perf_counter() - started, 2)
+    }
+
+
+def _seed_upload_hall(db: Session, rng: random.Random, password_hash: str, size: int, subject_ids: list, term_id: int, teacher_id: int) -> list:
+    """Add the upload hall: one class of `size` students taught every subject by one teacher in the active term"""
+    class_id = _insert_returning_ids(db, Class, [{"name": UPLOAD_HALL_NAME, "level": 1}])[0]
+    user_ids = _insert_returning_ids(db, User, [
+        {"email": f"student.hall.{seat}@bench.school", "password_hash": password_hash, "role": "student"}
+        for seat in range(size)
+    ])
+    student_ids = _insert_returning_ids(db, Student, [
+        {
+            "user_id": user_id,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "admission_number": f"HALL{seat:05d}",
+            "gender": rng.choice(["Male", "Female"]),
+            "class_id": class_id
+        }
+        for seat, user_id in enumerate(user_ids)
+    ])
+    _insert(db, TeacherAssignment, [
+        {"teacher_id": teacher_id, "subject_id": subject_id, "class_id": class_id, "term_id": term_id}
+        for subject_id in subject_ids
+    ])
+    return student_ids
+
+
+def main(argv=None):
+    """Command line entry point: python -m benchmarks.seed"""
+    parser = argparse.ArgumentParser(description="Fill the configured database with a synthetic school")
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--students-per-class", type=int, default=40)
+    parser.add_argument("--subjects", type=int, default=10)
+    parser.add_argument("--teachers", type=int, default=30)
+    parser.add_argument("--terms", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42, help="Random seed, for repeatable data")
+    parser.add_argument(
+        "--upload-hall-size", type=int, default=2000,
+        help="Students in the extra class the large bulk upload scenario writes to (0 to skip it)"
+    )
+    parser.add_argument("--reset", action="store_true", help="Delete existing rows first")
+    parser.add_argument(
+        "--create-schema",
+        action="store_true",
+        help="Create missing tables from the models (for throwaway databases; otherwise run alembic upgrade head)"
+    )
+    args = parser.parse_args(argv)
+
+    if args.create_schema:
+        Base.metadata.create_all(engine)
+
+    db = SessionLocal()
+    try:
+        if db.scalar(select(User.id).limit(1)) is not None and not args.reset:
+            print("Database already has users; pass --reset to replace them", file=sys.stderr)
+            return 1
+        if args.reset:
+            reset(db)
+        summary = seed(
+            db, args.classes, args.students_per_class, args.subjects, args.teachers, args.terms, args.seed,
+            args.upload_hall_size
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    for key, value in summary.items():
+        print(f"{key:>14}: {value}")
+    print(f"All accounts use the password '{SEED_PASSWORD}'; admin is {ADMIN_EMAIL}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
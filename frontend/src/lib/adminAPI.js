@@ -1,5 +1,26 @@
 import api from './api.js';
 
+// Rows the admin lists fetch at a time; more are loaded on demand
+export const LIST_PAGE_SIZE = 50;
+
+// Build a query string, dropping empty values
+function toQuery(params = {}) {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== null && value !== undefined && value !== '') {
+      query.append(key, value);
+    }
+  });
+  const text = query.toString();
+  return text ? `?${text}` : '';
+}
+
+// Fetch one page of a paginated list: { items, next_cursor, total }
+async function fetchPage(endpoint, params = {}) {
+  const response = await api.get(`${endpoint}${toQuery(params)}`);
+  return response.data;
+}
+
 // Classes API
 export const classesAPI = {
   getAll: async () => {
@@ -81,8 +102,14 @@ export const termsAPI = {
 
 // Teachers API
 export const teachersAPI = {
-  getAll: async () => {
-    const response = await api.get('/admin/teachers');
+  // params: { name, sort, cursor, limit, include_total }
+  getPage: async (params = {}) => {
+    return fetchPage('/admin/teachers', params);
+  },
+  
+  // { total, with_assignments }
+  getStats: async () => {
+    const response = await api.get('/admin/teachers/stats');
     return response.data;
   },
   
@@ -104,9 +131,14 @@ export const teachersAPI = {
 
 // Students API
 export const studentsAPI = {
-  getAll: async (classId = null) => {
-    const url = classId ? `/admin/students?class_id=${classId}` : '/admin/students';
-    const response = await api.get(url);
+  // params: { class_id, unassigned, level, gender, name, sort, cursor, limit, include_total }
+  getPage: async (params = {}) => {
+    return fetchPage('/admin/students', params);
+  },
+  
+  // { total, not_assigned, by_class: { [class_id]: count } }
+  getStats: async () => {
+    const response = await api.get('/admin/students/stats');
     return response.data;
   },
   
@@ -128,10 +160,14 @@ export const studentsAPI = {
 
 // Assignments API
 export const assignmentsAPI = {
-  getAll: async (filters = {}) => {
-    const params = new URLSearchParams(filters).toString();
-    const url = params ? `/admin/assignments?${params}` : '/admin/assignments';
-    const response = await api.get(url);
+  // params: { teacher_id, class_id, term_id, subject_id, level, sort, cursor, limit, include_total }
+  getPage: async (params = {}) => {
+    return fetchPage('/admin/assignments', params);
+  },
+  
+  // filters: { teacher_id, class_id, term_id, subject_id } -> { total, teachers, subjects, classes }
+  getStats: async (filters = {}) => {
+    const response = await api.get(`/admin/assignments/stats${toQuery(filters)}`);
     return response.data;
   },
   
@@ -144,4 +180,12 @@ export const assignmentsAPI = {
     const response = await api.delete(`/admin/assignments/${id}`);
     return response.data;
   },
-};
\ No newline at end of file
+};
+
+// Users API
+export const usersAPI = {
+  // params: { role, email, sort, cursor, limit, include_total }
+  getPage: async (params = {}) => {
+    return fetchPage('/admin/users', params);
+  },
+};
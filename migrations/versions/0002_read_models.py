@@ -0,0 +1,65 @@
+"""Class standings read model, cache version counters and the single-active-term index
+
+Revision ID: 0002_read_models
+Revises: 0001_initial_schema
+Create Date: 2026-10-18 09:05:00
+
+After upgrading, fill class_standings with `python -m app.standings rebuild`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_read_models'
+down_revision: Union[str, Sequence[str], None] = '0001_initial_schema'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'class_standings',
+        sa.Column('student_id', sa.Integer(), nullable=False),
+        sa.Column('term_id', sa.Integer(), nullable=False),
+        sa.Column('class_id', sa.Integer(), nullable=False),
+        sa.Column('total_marks', sa.DECIMAL(precision=7, scale=2), nullable=False),
+        sa.Column('average_marks', sa.DECIMAL(precision=5, scale=2), nullable=False),
+        sa.Column('subject_count', sa.Integer(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('total_students', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['class_id'], ['classes.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['term_id'], ['terms.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id', 'term_id')
+    )
+    op.create_index('ix_class_standings_class_term', 'class_standings', ['class_id', 'term_id'])
+
+    op.create_table(
+        'cache_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+    # Fails if more than one term is currently active; deactivate the extras first
+    op.create_index(
+        'uq_terms_single_active',
+        'terms',
+        ['is_active'],
+        unique=True,
+        postgresql_where=sa.text('is_active'),
+        sqlite_where=sa.text('is_active')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_terms_single_active', table_name='terms')
+    op.drop_table('cache_versions')
+    op.drop_index('ix_class_standings_class_term', table_name='class_standings')
+    op.drop_table('class_standings')
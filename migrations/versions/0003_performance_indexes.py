@@ -0,0 +1,45 @@
+"""Indexes for the foreign keys and filters used on every hot request path
+
+Revision ID: 0003_performance_indexes
+Revises: 0002_read_models
+Create Date: 2026-10-18 09:10:00
+
+On PostgreSQL the indexes are built CONCURRENTLY so writes to large tables are
+not blocked while they build.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_performance_indexes'
+down_revision: Union[str, Sequence[str], None] = '0002_read_models'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, table, columns, extra keyword arguments)
+INDEXES = [
+    ('ix_students_user_id', 'students', ['user_id'], {}),
+    ('ix_students_class_id', 'students', ['class_id'], {}),
+    ('ix_teachers_user_id', 'teachers', ['user_id'], {}),
+    ('ix_users_role_id', 'users', ['role', 'id'], {}),
+    ('ix_results_term_student', 'results', ['term_id', 'student_id'], {'postgresql_include': ['subject_id', 'marks']}),
+    ('ix_results_teacher_term', 'results', ['teacher_id', 'term_id'], {}),
+    ('ix_teacher_assignments_teacher_term', 'teacher_assignments', ['teacher_id', 'term_id'], {}),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kwargs)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
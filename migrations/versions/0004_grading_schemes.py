@@ -0,0 +1,62 @@
+"""Grading schemes per class level and subject
+
+Revision ID: 0004_grading_schemes
+Revises: 0003_performance_indexes
+Create Date: 2026-10-18 09:20:00
+
+Until a scheme is created, grades keep following the built-in A-F scale.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_grading_schemes'
+down_revision: Union[str, Sequence[str], None] = '0003_performance_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'grading_schemes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('level', sa.Integer(), nullable=True),
+        sa.Column('subject_id', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['subject_id'], ['subjects.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_grading_schemes_id', 'grading_schemes', ['id'])
+    # One scheme per level and subject; null (every level / every subject) counts as a value
+    op.create_index(
+        'ux_grading_schemes_scope',
+        'grading_schemes',
+        [sa.text('coalesce(level, -1)'), sa.text('coalesce(subject_id, -1)')],
+        unique=True
+    )
+
+    op.create_table(
+        'grade_boundaries',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('scheme_id', sa.Integer(), nullable=False),
+        sa.Column('min_marks', sa.DECIMAL(precision=5, scale=2), nullable=False),
+        sa.Column('grade', sa.String(length=10), nullable=False),
+        sa.ForeignKeyConstraint(['scheme_id'], ['grading_schemes.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('scheme_id', 'min_marks')
+    )
+    op.create_index('ix_grade_boundaries_id', 'grade_boundaries', ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_grade_boundaries_id', table_name='grade_boundaries')
+    op.drop_table('grade_boundaries')
+    op.drop_index('ux_grading_schemes_scope', table_name='grading_schemes')
+    op.drop_index('ix_grading_schemes_id', table_name='grading_schemes')
+    op.drop_table('grading_schemes')
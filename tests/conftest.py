@@ -0,0 +1,128 @@
+import os
+import tempfile
+
+# Settings are read when app is imported, so they must be in place first
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='school-tests-')}/test.db"
+os.environ["DATABASE_MODE"] = "sync"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+# Requests over their query budget, or with an N+1 shape, answer 500
+os.environ["SQL_STATS_STRICT"] = "true"
+
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from app import analytics, mark_versions, refdata, summaries
+from app.auth import create_access_token, principal_cache
+from app.database import Base, SessionLocal, engine
+from app.main import app
+from app.models import Class, Result, Student, Subject, Teacher, TeacherAssignment, Term, User
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    """A fresh schema and empty in-process caches for every test"""
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    refdata.cache.invalidate_local()
+    principal_cache.clear()
+    analytics.cache.clear()
+    summaries.cache.clear()
+    mark_versions.versions.check_now()
+
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def auth_headers(email: str, role: str) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"sub": email, "role": role})}
+
+
+def add_class_members(db, class_id: int, count: int) -> list:
+    """Bulk insert students into a class, returning their IDs"""
+    user_ids = db.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{"email": f"member{index}@test.school", "password_hash": "-", "role": "student"} for index in range(count)]
+    ).all()
+    student_ids = db.scalars(
+        insert(Student).returning(Student.id, sort_by_parameter_order=True),
+        [
+            {"user_id": user_id, "first_name": "Member", "last_name": f"{index:04d}", "admission_number": f"BIG{index:04d}", "class_id": class_id}
+            for index, user_id in enumerate(user_ids)
+        ]
+    ).all()
+    db.commit()
+    return student_ids
+
+
+@pytest.fixture
+def school(db):
+    """One teacher, two classes, ten subjects, a closed and an active term, and ten students in the first class"""
+    teacher_user = User(email="teacher@test.school", password_hash="-", role="teacher")
+    db.add(teacher_user)
+    db.flush()
+    teacher = Teacher(user_id=teacher_user.id, first_name="Tiwonge", last_name="Banda")
+    classes = [Class(name="Form 1A", level=1), Class(name="Form 2A", level=2)]
+    subjects = [Subject(name=f"Subject {index}", code=f"S{index}") for index in range(10)]
+    closed_term = Term(name="Term 3", year=2025, term_number=3, is_active=False)
+    active_term = Term(name="Term 1", year=2026, term_number=1, is_active=True)
+    db.add_all([teacher, *classes, *subjects, closed_term, active_term])
+    db.flush()
+
+    students = []
+    for index in range(10):
+        user = User(email=f"student{index}@test.school", password_hash="-", role="student")
+        db.add(user)
+        db.flush()
+        students.append(Student(
+            user_id=user.id,
+            first_name=f"Student{index}",
+            last_name="Phiri",
+            admission_number=f"ADM{index:03d}",
+            class_id=classes[0].id
+        ))
+    db.add_all(students)
+    db.add_all([
+        TeacherAssignment(teacher_id=teacher.id, subject_id=subject.id, class_id=class_obj.id, term_id=term.id)
+        for subject in subjects
+        for class_obj in classes
+        for term in (closed_term, active_term)
+    ])
+    db.commit()
+
+    return SimpleNamespace(
+        teacher=teacher,
+        teacher_headers=auth_headers(teacher_user.email, "teacher"),
+        classes=classes,
+        subjects=subjects,
+        closed_term=closed_term,
+        active_term=active_term,
+        students=students,
+        student_headers=[auth_headers(f"student{index}@test.school", "student") for index in range(10)]
+    )
+
+
+@pytest.fixture
+def add_results(db, school):
+    """Record marks for students in subjects; marks may be a number or a function of (student, subject)"""
+    def add(students, subjects, term, marks=60):
+        db.add_all([
+            Result(
+                student_id=student.id,
+                subject_id=subject.id,
+                term_id=term.id,
+                marks=marks(student, subject) if callable(marks) else marks,
+                teacher_id=school.teacher.id
+            )
+            for student in students
+            for subject in subjects
+        ])
+        db.commit()
+    return add
@@ -0,0 +1,50 @@
+from app.auth import create_access_token
+from app.models import Student, User
+
+ADMIN_HEADERS = {"Authorization": "Bearer " + create_access_token({"sub": "admin@test.school", "role": "admin"})}
+
+
+def get(client, url):
+    """GET as the admin, failing on errors and on statements over the route's budget"""
+    response = client.get(url, headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
+    assert int(response.headers["X-DB-Statements"]) <= int(response.headers["X-DB-Budget"])
+    return response.json()
+
+
+def test_admin_list_counts_come_from_the_server(client, db, school):
+    db.add(User(email="admin@test.school", password_hash="-", role="admin"))
+    user = User(email="unassigned@test.school", password_hash="-", role="student")
+    db.add(user)
+    db.flush()
+    db.add(Student(user_id=user.id, first_name="Thoko", last_name="Mwale", admission_number="ADM100"))
+    db.commit()
+    form_1a = school.classes[0].id
+
+    # The first request also loads the principal
+    client.get("/api/admin/students/stats", headers=ADMIN_HEADERS)
+
+    assert get(client, "/api/admin/students/stats") == {
+        "total": 11,
+        "not_assigned": 1,
+        "by_class": {str(form_1a): 10}
+    }
+    unassigned = get(client, "/api/admin/students?unassigned=true&include_total=true")
+    assert [student["admission_number"] for student in unassigned["items"]] == ["ADM100"]
+
+    first = get(client, "/api/admin/students?class_id=%d&sort=last_name&limit=4&include_total=true" % form_1a)
+    rest = get(client, "/api/admin/students?class_id=%d&sort=last_name&limit=10&cursor=%s" % (form_1a, first["next_cursor"]))
+    assert first["total"] == 10
+    assert len(first["items"]) + len(rest["items"]) == 10
+    assert rest["next_cursor"] is None
+
+    assert get(client, "/api/admin/teachers/stats") == {"total": 1, "with_assignments": 1}
+    teachers = get(client, "/api/admin/teachers?name=ban")
+    assert [teacher["assignment_count"] for teacher in teachers["items"]] == [40]
+
+    assert get(client, f"/api/admin/assignments/stats?term_id={school.active_term.id}") == {
+        "total": 20,
+        "teachers": 1,
+        "subjects": 10,
+        "classes": 2
+    }
@@ -0,0 +1,49 @@
+from sqlalchemy import select
+from app.models import Result, User
+from app.standings import rebuild_term_standings
+from tests.conftest import auth_headers
+
+ADMIN_HEADERS = auth_headers("admin@test.school", "admin")
+
+
+def analytics(client, headers, role, **filters) -> dict:
+    query = "&".join(f"{name}={value}" for name, value in filters.items())
+    response = client.get(f"/api/{role}/analytics?{query}", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_closed_term_analytics_count_a_moved_student_in_their_old_class(client, db, school, add_results):
+    db.add(User(email="admin@test.school", password_hash="-", role="admin"))
+    db.commit()
+    for term in (school.closed_term, school.active_term):
+        add_results(school.students, school.subjects[:2], term, marks=lambda student, subject: 40 + student.id)
+        rebuild_term_standings(db, term.id)
+    db.commit()
+
+    moved = school.students[-1]
+    old_class, new_class = school.classes
+    response = client.put(f"/api/admin/students/{moved.id}", json={"class_id": new_class.id}, headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
+    # The move cleared the cached principals, so the first requests reload them
+    client.get("/api/admin/terms", headers=ADMIN_HEADERS)
+    client.get("/api/teacher/my-assignments", headers=school.teacher_headers)
+
+    closed = school.closed_term.id
+    old = analytics(client, ADMIN_HEADERS, "admin", term_id=closed, class_id=old_class.id)
+    assert (old["count"], old["students"], old["max"]) == (20, 10, 40.0 + moved.id)
+    assert analytics(client, ADMIN_HEADERS, "admin", term_id=closed, level=new_class.level)["count"] == 0
+    teacher = analytics(client, school.teacher_headers, "teacher", term_id=closed, class_id=new_class.id)
+    assert teacher["count"] == 0
+
+    # The active term follows the move
+    active = analytics(client, ADMIN_HEADERS, "admin", term_id=school.active_term.id, class_id=new_class.id)
+    assert (active["count"], active["students"]) == (2, 1)
+
+    # A closed-term correction to the moved student's marks refreshes the old class's cached statistics
+    result_id = db.scalar(select(Result.id).where(
+        Result.student_id == moved.id, Result.term_id == closed, Result.subject_id == school.subjects[0].id
+    ))
+    response = client.put(f"/api/teacher/results/{result_id}", json={"marks": 99}, headers=school.teacher_headers)
+    assert response.status_code == 200, response.text
+    assert analytics(client, ADMIN_HEADERS, "admin", term_id=closed, class_id=old_class.id)["max"] == 99.0
@@ -0,0 +1,48 @@
+from sqlalchemy import select
+from app import bulk_results
+from app.models import Result, Student
+from tests.conftest import add_class_members
+
+
+def test_bulk_upload_across_upsert_batches(client, db, school, add_results):
+    class_obj, other_class = school.classes
+    subject, term = school.subjects[0], school.active_term
+    student_ids = [student.id for student in school.students] + add_class_members(db, class_obj.id, 1490)
+    assert len(student_ids) > bulk_results.UPSERT_BATCH_SIZE
+
+    # The school's ten students already have a mark, so they are updated; the rest are created
+    add_results(school.students, [subject], term, marks=10)
+    outsider = Student(first_name="Other", last_name="Class", admission_number="OUT001", class_id=other_class.id)
+    db.add(outsider)
+    db.commit()
+
+    items = [{"student_id": student_id, "marks": 50 + index % 50} for index, student_id in enumerate(student_ids)]
+    items += [{"student_id": outsider.id, "marks": 70}, {"student_id": student_ids[0], "marks": 80}, {"student_id": student_ids[1], "marks": 101}]
+    client.get("/api/teacher/my-assignments", headers=school.teacher_headers)
+    response = client.post(
+        "/api/teacher/results/bulk",
+        json={"class_id": class_obj.id, "subject_id": subject.id, "term_id": term.id, "results": items},
+        headers=school.teacher_headers
+    )
+
+    assert response.status_code == 201, response.text
+    assert int(response.headers["X-DB-Statements"]) <= int(response.headers["X-DB-Budget"])
+    body = response.json()
+    assert (body["created"], body["updated"]) == (1490, 10)
+    assert body["errors"] == [
+        f"Student {student_ids[0]}: Appears more than once in this upload",
+        f"Student {student_ids[1]}: Marks must be between 0 and 100",
+        f"Student {outsider.id}: Not a student in this class"
+    ]
+    statuses = {row["student_id"]: row["status"] for row in body["rows"]}
+    assert statuses == {
+        student_id: "updated" if index < 10 else "created" for index, student_id in enumerate(student_ids)
+    }
+
+    db.expire_all()
+    stored = dict(db.execute(
+        select(Result.student_id, Result.marks).where(Result.subject_id == subject.id, Result.term_id == term.id)
+    ).all())
+    assert len(stored) == 1500
+    assert float(stored[student_ids[2]]) == 52
+    assert float(stored[student_ids[-1]]) == 50 + (len(student_ids) - 1) % 50
@@ -0,0 +1,20 @@
+from sqlalchemy import text
+from app import explain_check
+from app.database import engine
+
+
+def test_key_queries_use_indexes(db, school):
+    failures = explain_check.run_check(engine)
+
+    assert failures == []
+
+
+def test_dropped_index_is_reported(db):
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_class_standings_class_term"))
+    # Pooled connections cache the EXPLAIN statements, plan included, from the previous test
+    engine.dispose()
+
+    failures = explain_check.run_check(engine)
+
+    assert {"query": "standings: class table", "tables": ["class_standings"]} in failures
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app.models import GradingScheme, User
+from app.routers import admin
+from tests.conftest import auth_headers
+
+ADMIN_HEADERS = auth_headers("admin@test.school", "admin")
+BOUNDARIES = [{"min_marks": 0, "grade": "F"}, {"min_marks": 50, "grade": "P"}]
+
+
+def test_database_allows_one_scheme_per_level_and_subject(db):
+    db.add_all([GradingScheme(name="School", level=None, subject_id=None), GradingScheme(name="Form 1", level=1)])
+    db.commit()
+
+    db.add(GradingScheme(name="School again", level=None, subject_id=None))
+    with pytest.raises(IntegrityError):
+        db.commit()
+
+
+def test_scheme_that_slips_past_the_check_is_refused(client, db, monkeypatch):
+    db.add(User(email="admin@test.school", password_hash="-", role="admin"))
+    db.commit()
+    scheme = {"name": "Form 1", "level": 1, "subject_id": None, "boundaries": BOUNDARIES}
+    assert client.post("/api/admin/grading-schemes", json=scheme, headers=ADMIN_HEADERS).status_code == 201
+    other = client.post("/api/admin/grading-schemes", json={**scheme, "level": 2}, headers=ADMIN_HEADERS).json()
+
+    # As if a concurrent request had created the same scope between the check and the commit
+    monkeypatch.setattr(admin, "check_grading_scheme", lambda *args, **kwargs: None)
+    response = client.post("/api/admin/grading-schemes", json=scheme, headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+    response = client.put(f"/api/admin/grading-schemes/{other['id']}", json={"level": 1}, headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+
+    names = client.get("/api/admin/grading-schemes", headers=ADMIN_HEADERS).json()
+    assert [(item["level"], item["subject_id"]) for item in names] == [(1, None), (2, None)]
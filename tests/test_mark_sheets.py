@@ -0,0 +1,112 @@
+import io
+import pytest
+from sqlalchemy import func, select
+from app import mark_sheets
+from app.models import Result
+from tests.conftest import add_class_members
+
+
+def import_sheet(client, school, filename: str, content: bytes):
+    return client.post(
+        "/api/teacher/results/import",
+        data={"class_id": school.classes[0].id, "subject_id": school.subjects[0].id, "term_id": school.active_term.id},
+        files={"file": (filename, content)},
+        headers=school.teacher_headers
+    )
+
+
+def stored_marks(db, school) -> dict:
+    db.expire_all()
+    return dict(db.execute(
+        select(Result.student_id, Result.marks).where(
+            Result.subject_id == school.subjects[0].id,
+            Result.term_id == school.active_term.id
+        )
+    ).all())
+
+
+def test_csv_import_reports_bad_rows_and_writes_the_rest(client, db, school, add_results):
+    add_results(school.students[:1], school.subjects[:1], school.active_term, marks=10)
+    sheet = "\n".join([
+        "Admission Number,Name,Marks",
+        "ADM000,Student0,75",
+        "adm001,Student1,80.5",
+        "ADM002,Student2,abc",
+        "ADM999,Nobody,60",
+        "",
+        "ADM003,Student3,101",
+        "ADM001,Student1,55",
+        "ADM004,Student4,",
+        "ADM005,Student5,64"
+    ]).encode()
+
+    response = import_sheet(client, school, "marks.csv", sheet)
+
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert (body["rows_read"], body["created"], body["updated"]) == (8, 2, 1)
+    assert [(error["row"], error["error"]) for error in body["errors"]] == [
+        (4, "Marks 'abc' is not a number"),
+        (5, "No student with this admission number in this class"),
+        (7, "Marks must be between 0 and 100"),
+        (8, "Duplicate of row 3"),
+        (9, "Missing marks")
+    ]
+    students = school.students
+    assert {student_id: float(marks) for student_id, marks in stored_marks(db, school).items()} == {
+        students[0].id: 75.0,
+        students[1].id: 80.5,
+        students[5].id: 64.0
+    }
+
+
+def test_csv_import_larger_than_one_chunk(client, db, school):
+    members = add_class_members(db, school.classes[0].id, 1200)
+    assert len(members) > mark_sheets.IMPORT_CHUNK_SIZE
+    sheet = "admission_number,marks\n" + "".join(f"BIG{index:04d},{index % 101}\n" for index in range(1200))
+
+    response = import_sheet(client, school, "marks.csv", sheet.encode())
+
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert (body["rows_read"], body["created"], body["updated"], body["errors"]) == (1200, 1200, 0, [])
+    marks = stored_marks(db, school)
+    assert len(marks) == 1200
+    assert float(marks[members[-1]]) == 1199 % 101
+    db.expire_all()
+    assert db.scalar(select(func.count()).select_from(Result)) == 1200
+
+
+def test_xlsx_import(client, db, school):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["Admission No", "Marks"])
+    sheet.append(["ADM000", 72])
+    sheet.append(["ADM001", 48.5])
+    sheet.append(["ADM002", "absent"])
+    sheet.append([None, None])
+    content = io.BytesIO()
+    workbook.save(content)
+
+    response = import_sheet(client, school, "marks.xlsx", content.getvalue())
+
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert (body["rows_read"], body["created"]) == (3, 2)
+    assert [(error["row"], error["error"]) for error in body["errors"]] == [(4, "Marks 'absent' is not a number")]
+    students = school.students
+    assert {student_id: float(marks) for student_id, marks in stored_marks(db, school).items()} == {
+        students[0].id: 72.0,
+        students[1].id: 48.5
+    }
+
+
+def test_xlsx_import_without_openpyxl_is_a_clear_400(client, db, school, monkeypatch):
+    monkeypatch.setattr(mark_sheets, "load_workbook", None)
+
+    response = import_sheet(client, school, "marks.xlsx", b"PK\x03\x04")
+
+    assert response.status_code == 400
+    assert "openpyxl" in response.json()["detail"]
+    assert stored_marks(db, school) == {}
@@ -0,0 +1,30 @@
+from prometheus_client import REGISTRY
+from app.auth import principal_cache
+
+
+def scrape(client):
+    """Serve /metrics, which refreshes the counters on the event loop"""
+    assert client.get("/metrics").status_code == 200
+
+
+def principal_lookups(result: str) -> float:
+    return REGISTRY.get_sample_value("cache_lookups_total", {"cache": "principals", "result": result}) or 0
+
+
+def test_cache_lookups_only_ever_go_up(client, monkeypatch):
+    scrape(client)
+    hits, misses = principal_lookups("hit"), principal_lookups("miss")
+
+    principal_cache.put("counted@test.school", "cached")
+    principal_cache.get("counted@test.school")
+    principal_cache.get("counted@test.school")
+    principal_cache.get("missing@test.school")
+    scrape(client)
+    scrape(client)
+    assert (principal_lookups("hit"), principal_lookups("miss")) == (hits + 2, misses + 1)
+
+    # A reset of the cache's own totals must not take the counter back down
+    monkeypatch.setattr(principal_cache, "hits", 1)
+    monkeypatch.setattr(principal_cache, "misses", 0)
+    scrape(client)
+    assert (principal_lookups("hit"), principal_lookups("miss")) == (hits + 3, misses + 1)
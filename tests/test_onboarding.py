@@ -0,0 +1,93 @@
+from sqlalchemy import select
+from app import auth
+from app.models import Student, Teacher, User
+from tests.conftest import auth_headers
+
+ADMIN_HEADERS = auth_headers("admin@test.school", "admin")
+
+
+def student(email: str, admission_number: str, class_id=None) -> dict:
+    return {
+        "email": email,
+        "password": "secret-" + admission_number,
+        "first_name": "New",
+        "last_name": "Student",
+        "admission_number": admission_number,
+        "class_id": class_id
+    }
+
+
+def test_bulk_students_report_bad_rows_and_create_the_rest(client, db, school):
+    db.add(User(email="admin@test.school", password_hash="-", role="admin"))
+    db.commit()
+    class_id = school.classes[1].id
+
+    rows = [
+        student("new0@test.school", "NEW000", class_id),
+        student("Student1@Test.School", "NEW001", class_id),
+        student("new2@test.school", "ADM002", class_id),
+        student("NEW0@test.school", "NEW003", class_id),
+        student("new4@test.school", "NEW000", class_id),
+        student("new5@test.school", "NEW005", 999),
+        student("new6@test.school", "NEW006")
+    ]
+    response = client.post("/api/admin/students/bulk", json=rows, headers=ADMIN_HEADERS)
+
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert body["created"] == 2
+    assert [(error["index"], error["error"]) for error in body["errors"]] == [
+        (1, "Email is already registered"),
+        (2, "Admission number 'ADM002' already exists"),
+        (3, "Email appears more than once in this upload"),
+        (4, "Admission number 'NEW000' appears more than once in this upload"),
+        (5, "Class with ID 999 not found")
+    ]
+
+    db.expire_all()
+    created = db.execute(
+        select(User.email, User.password_hash, Student.admission_number, Student.class_id)
+        .join(Student, Student.user_id == User.id)
+        .where(Student.id.in_(body["ids"]))
+        .order_by(Student.id)
+    ).all()
+    assert [(row.email, row.admission_number, row.class_id) for row in created] == [
+        ("new0@test.school", "NEW000", class_id),
+        ("new6@test.school", "NEW006", None)
+    ]
+    assert auth.verify_password("secret-NEW000", created[0].password_hash)
+    assert auth.verify_password("secret-NEW006", created[1].password_hash)
+
+
+def test_bulk_teachers_skip_registered_emails_in_any_case(client, db, school):
+    db.add(User(email="admin@test.school", password_hash="-", role="admin"))
+    db.commit()
+
+    rows = [
+        {"email": "TEACHER@test.school", "password": "secret", "first_name": "Same", "last_name": "Person"},
+        {"email": "second@test.school", "password": "secret", "first_name": "Chisomo", "last_name": "Banda"}
+    ]
+    response = client.post("/api/admin/teachers/bulk", json=rows, headers=ADMIN_HEADERS)
+
+    assert response.status_code == 201, response.text
+    body = response.json()
+    assert body["created"] == 1
+    assert body["errors"] == [{"index": 0, "email": "TEACHER@test.school", "error": "Email is already registered"}]
+    db.expire_all()
+    assert db.scalar(select(Teacher.last_name).where(Teacher.id == body["ids"][0])) == "Banda"
+
+
+def test_pooled_hashing_keeps_the_input_order(monkeypatch):
+    monkeypatch.setattr(auth, "PASSWORD_HASH_WORKERS", 2)
+    monkeypatch.setattr(auth, "_hash_pool", None)
+    passwords = [f"password-{index}" for index in range(4)]
+    try:
+        hashes = auth.hash_passwords(passwords)
+        assert auth._hash_pool is not None
+    finally:
+        if auth._hash_pool is not None:
+            auth._hash_pool.shutdown()
+
+    assert len(set(hashes)) == 4
+    assert all(auth.verify_password(password, hashed) for password, hashed in zip(passwords, hashes))
+    assert not auth.verify_password(passwords[0], hashes[1])
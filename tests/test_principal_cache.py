@@ -0,0 +1,50 @@
+from sqlalchemy import delete, insert
+from app import auth
+from app.models import CacheVersion, Student, User
+from tests.conftest import auth_headers
+
+HEADERS = auth_headers("leaver@test.school", "student")
+
+
+def add_student(db) -> Student:
+    user = User(email="leaver@test.school", password_hash="-", role="student")
+    db.add(user)
+    db.flush()
+    student = Student(user_id=user.id, first_name="Chikondi", last_name="Phiri", admission_number="ADM200")
+    db.add(student)
+    db.commit()
+    return student
+
+
+def test_account_deleted_by_another_worker_is_refused(client, db, monkeypatch):
+    student = add_student(db)
+    assert client.get("/api/student/profile", headers=HEADERS).status_code == 200
+    clears = auth.principal_cache.stats()["version_clears"]
+
+    # Another worker deletes the account; nothing in this process is told
+    db.execute(delete(Student).where(Student.id == student.id))
+    db.execute(delete(User).where(User.email == "leaver@test.school"))
+    db.execute(insert(CacheVersion).values(name=auth.PRINCIPAL_VERSION_KEY, version=1))
+    db.commit()
+
+    # Until the next version check the cached principal is still served
+    monkeypatch.setattr(auth, "PRINCIPAL_VERSION_CHECK_SECONDS", 3600)
+    assert client.get("/api/student/profile", headers=HEADERS).status_code != 401
+
+    monkeypatch.setattr(auth, "PRINCIPAL_VERSION_CHECK_SECONDS", 0)
+    assert client.get("/api/student/profile", headers=HEADERS).status_code == 401
+    assert auth.principal_cache.stats()["version_clears"] == clears + 1
+
+
+def test_invalidation_waits_for_commit(db):
+    add_student(db)
+    auth.principal_cache.put("leaver@test.school", "cached")
+
+    auth.invalidate_principal(db, "leaver@test.school")
+    db.rollback()
+    assert auth.principal_cache.get("leaver@test.school") == "cached"
+
+    auth.invalidate_principal(db, "leaver@test.school")
+    db.commit()
+    assert auth.principal_cache.get("leaver@test.school") is None
+    assert auth.principal_cache.version_check_due()
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import profiling
+from app.profiling import Profiler, ProfilingMiddleware
+
+
+def test_stop_does_not_wait_out_the_sample_interval():
+    profiler = Profiler()
+
+    async def session():
+        profiler.start("/api/*", 1.0, 1000, 60)
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        profiler.stop()
+        return time.monotonic() - started
+
+    assert asyncio.run(session()) < 0.5
+    assert not profiler.active
+
+
+def test_failed_samples_are_counted(monkeypatch):
+    profiler = Profiler()
+
+    def fail():
+        raise RuntimeError("frame went away")
+
+    monkeypatch.setattr(profiler, "_sample_once", fail)
+
+    async def session():
+        profiler.start("/api/*", 1.0, 1, 60)
+        await asyncio.sleep(0.05)
+        profiler.stop()
+
+    asyncio.run(session())
+    status = profiler.status()
+    assert status["sample_errors"] > 0
+    assert status["last_sample_error"] == "RuntimeError: frame went away"
+
+
+def test_sync_endpoint_work_is_charged_to_its_request():
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.post("/start")
+    async def start():
+        profiling.profiler.start("/slow", 1.0, 1, 60)
+
+    @app.get("/slow")
+    def slow():
+        # Runs on a threadpool thread, not the event loop
+        started = time.monotonic()
+        while time.monotonic() - started < 0.2:
+            pass
+
+    with TestClient(app) as client:
+        client.post("/start")
+        try:
+            client.get("/slow")
+        finally:
+            profiling.profiler.stop()
+
+    stacks = profiling.profiler.collapsed().splitlines()
+    charged = [line for line in stacks if line.startswith("GET /slow;") and "slow" in line.rsplit(";", 1)[-1]]
+    assert charged, stacks
+    assert not profiling.profiler.worker_threads
+
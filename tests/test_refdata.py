@@ -0,0 +1,27 @@
+from sqlalchemy import select
+from app import refdata
+from app.database import SessionLocal
+from app.models import CacheVersion
+
+
+def stored_version(db) -> int:
+    return db.scalar(select(CacheVersion.version).where(CacheVersion.name == refdata.VERSION_KEY))
+
+
+def test_invalidate_upserts_the_version_row(db):
+    # Two sessions that both start before the row exists; the second must bump, not collide
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        assert stored_version(first) is None and stored_version(second) is None
+        refdata.invalidate(first)
+        first.commit()
+        refdata.invalidate(second)
+        second.commit()
+    finally:
+        first.close()
+        second.close()
+    assert stored_version(db) == 2
+
+    refdata.invalidate(db)
+    db.rollback()
+    assert stored_version(db) == 2
@@ -0,0 +1,46 @@
+import pytest
+from app import querystats
+from app.models import Result
+from app.projections import result_projection_query
+
+
+def statements(response) -> int:
+    """Statements the request ran; strict mode has already failed it if it went over budget"""
+    assert response.status_code == 200, response.text
+    count = int(response.headers["X-DB-Statements"])
+    assert count <= int(response.headers["X-DB-Budget"])
+    return count
+
+
+@pytest.mark.parametrize("role, url, expected", [
+    ("student", "/api/student/results", 10),
+    ("teacher", "/api/teacher/results", 100),
+])
+def test_result_listing_statements_do_not_grow_with_rows(client, db, school, add_results, role, url, expected):
+    headers = school.student_headers[0] if role == "student" else school.teacher_headers
+    student = school.students[0]
+    add_results([student], school.subjects[:1], school.active_term)
+
+    # The first request also loads the principal and the reference data cache
+    client.get(url, headers=headers)
+    one = client.get(url, headers=headers)
+
+    add_results([student], school.subjects[1:], school.active_term)
+    if role == "teacher":
+        add_results(school.students[1:], school.subjects, school.active_term)
+    many = client.get(url, headers=headers)
+
+    assert len(one.json()) == 1
+    assert len(many.json()) == expected
+    assert statements(one) == statements(many)
+
+
+def test_result_projection_is_one_statement(db, school, add_results):
+    add_results(school.students, school.subjects, school.active_term)
+    term_id = school.active_term.id
+
+    with querystats.assert_max_queries(1):
+        rows = db.execute(result_projection_query().where(Result.term_id == term_id)).all()
+
+    assert len(rows) == 100
+    assert {row.subject_name for row in rows} == {subject.name for subject in school.subjects}
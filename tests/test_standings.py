@@ -0,0 +1,93 @@
+from sqlalchemy import select
+from app.auth import create_access_token
+from app.models import ClassStanding, User
+from app.standings import check_term_standings, rebuild_term_standings
+
+ADMIN_HEADERS = {"Authorization": "Bearer " + create_access_token({"sub": "admin@test.school", "role": "admin"})}
+
+
+def standings(db, term) -> dict:
+    db.expire_all()
+    return {
+        row.student_id: (row.class_id, row.position, row.total_students)
+        for row in db.scalars(select(ClassStanding).where(ClassStanding.term_id == term.id))
+    }
+
+
+def test_moving_a_student_leaves_earlier_terms_alone(client, db, school, add_results):
+    db.add(User(email="admin@test.school", password_hash="-", role="admin"))
+    db.commit()
+
+    for term in (school.closed_term, school.active_term):
+        add_results(school.students, school.subjects, term, marks=lambda student, subject: 40 + student.id)
+        rebuild_term_standings(db, term.id)
+    db.commit()
+
+    moved = school.students[-1]
+    old_class, new_class = school.classes
+    closed_before = standings(db, school.closed_term)
+    transcript_before = client.get("/api/student/results/transcript", headers=school.student_headers[-1]).json()
+    assert closed_before[moved.id] == (old_class.id, 1, 10)
+
+    response = client.put(f"/api/admin/students/{moved.id}", json={"class_id": new_class.id}, headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
+
+    # The closed term keeps the student ranked first of ten in the class they were in
+    assert standings(db, school.closed_term) == closed_before
+    assert client.get("/api/student/results/transcript", headers=school.student_headers[-1]).json() == transcript_before
+
+    # The active term ranks them alone in the new class and the old class closes up behind them
+    active = standings(db, school.active_term)
+    assert active[moved.id] == (new_class.id, 1, 1)
+    assert active[school.students[0].id] == (old_class.id, 9, 9)
+
+    # A rebuild keeps both, and the closed-term summary is still served from the old class
+    for term in (school.closed_term, school.active_term):
+        rebuild_term_standings(db, term.id)
+        assert check_term_standings(db, term.id) == []
+    db.commit()
+    assert standings(db, school.closed_term) == closed_before
+    assert standings(db, school.active_term) == active
+
+    summary = client.get(
+        f"/api/student/results/summary?term_id={school.closed_term.id}",
+        headers=school.student_headers[-1]
+    ).json()
+    assert (summary["class_name"], summary["position"], summary["total_students"]) == (old_class.name, 1, 10)
+
+
+def gradebook_positions(client, class_obj, term) -> dict:
+    response = client.get(
+        f"/api/admin/classes/{class_obj.id}/gradebook?term_id={term.id}&layout=records",
+        headers=ADMIN_HEADERS
+    )
+    assert response.status_code == 200, response.text
+    return {student["student_id"]: student["position"] for student in response.json()["students"]}
+
+
+def test_gradebook_keeps_a_moved_student_in_their_closed_term_class(client, db, school, add_results):
+    db.add(User(email="admin@test.school", password_hash="-", role="admin"))
+    db.commit()
+    for term in (school.closed_term, school.active_term):
+        add_results(school.students, school.subjects, term, marks=lambda student, subject: 40 + student.id)
+        rebuild_term_standings(db, term.id)
+    db.commit()
+
+    moved = school.students[-1]
+    old_class, new_class = school.classes
+    response = client.put(f"/api/admin/students/{moved.id}", json={"class_id": new_class.id}, headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
+
+    # The move cleared the cached principals, so the first request reloads the admin's
+    client.get("/api/admin/terms", headers=ADMIN_HEADERS)
+
+    # The closed-term gradebook ranks exactly as the standings do
+    closed = standings(db, school.closed_term)
+    assert gradebook_positions(client, old_class, school.closed_term) == {
+        student_id: position for student_id, (class_id, position, _) in closed.items() if class_id == old_class.id
+    }
+    assert gradebook_positions(client, new_class, school.closed_term) == {}
+
+    # The active term follows the move
+    assert gradebook_positions(client, new_class, school.active_term) == {moved.id: 1}
+    assert moved.id not in gradebook_positions(client, old_class, school.active_term)